@@ -0,0 +1,36 @@
+"""reservation composite indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_reservations_server_status_time": ["server_id", "status", "start_time", "end_time"],
+    "ix_reservations_user_status": ["user_id", "status"],
+}
+
+def _existing_indexes():
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes("reservations")}
+
+def upgrade():
+    # Databases created by Base.metadata.create_all already have these indexes.
+    existing = _existing_indexes()
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "reservations", columns)
+
+def downgrade():
+    existing = _existing_indexes()
+    for name in INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="reservations")
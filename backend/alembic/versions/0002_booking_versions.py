@@ -0,0 +1,34 @@
+"""booking versions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "gpu_servers": sa.Column("booking_version", sa.Integer(), nullable=False, server_default="0"),
+    "reservations": sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+}
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    return {column["name"] for column in inspector.get_columns(table)}
+
+def upgrade():
+    for table, column in COLUMNS.items():
+        if column.name not in _existing_columns(table):
+            op.add_column(table, column)
+
+def downgrade():
+    for table, column in COLUMNS.items():
+        if column.name in _existing_columns(table):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column(column.name)
\ No newline at end of file
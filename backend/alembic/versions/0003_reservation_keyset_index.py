@@ -0,0 +1,28 @@
+"""reservation keyset index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_reservations_start_id"
+
+def _existing_indexes():
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes("reservations")}
+
+def upgrade():
+    if INDEX not in _existing_indexes():
+        op.create_index(INDEX, "reservations", ["start_time", "id"])
+
+def downgrade():
+    if INDEX in _existing_indexes():
+        op.drop_index(INDEX, table_name="reservations")
\ No newline at end of file
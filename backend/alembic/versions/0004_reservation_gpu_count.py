@@ -0,0 +1,32 @@
+"""reservation gpu count
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COLUMN = "gpu_count"
+
+def _existing_columns():
+    inspector = sa.inspect(op.get_bind())
+    return {column["name"] for column in inspector.get_columns("reservations")}
+
+def upgrade():
+    if COLUMN not in _existing_columns():
+        op.add_column(
+            "reservations",
+            sa.Column(COLUMN, sa.Integer(), nullable=False, server_default="1")
+        )
+
+def downgrade():
+    if COLUMN in _existing_columns():
+        with op.batch_alter_table("reservations") as batch_op:
+            batch_op.drop_column(COLUMN)
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""utilization rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+ROLLUPS = "utilization_rollups"
+ENTRIES = "reservation_rollup_entries"
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+
+def upgrade():
+    tables = _existing_tables()
+    if ROLLUPS not in tables:
+        op.create_table(
+            ROLLUPS,
+            sa.Column("granularity", sa.String(), primary_key=True),
+            sa.Column("dimension", sa.String(), primary_key=True),
+            sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("gpu_hours", sa.Float(), nullable=False, server_default="0"),
+            _counter("reservations"),
+            _counter("confirmed"),
+            _counter("rejected"),
+            _counter("cancelled"),
+            _counter("contended"),
+            _counter("priority_sum"),
+        )
+    if ENTRIES not in tables:
+        # Rows are filled by the application on startup (rollup rebuild).
+        op.create_table(
+            ENTRIES,
+            sa.Column("reservation_id", sa.Integer(), sa.ForeignKey("reservations.id"), primary_key=True),
+            sa.Column("revision", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("server_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("purpose_category", sa.String(), nullable=False),
+            sa.Column("start_time", sa.DateTime(), nullable=False),
+            sa.Column("end_time", sa.DateTime(), nullable=False),
+            sa.Column("gpu_count", sa.Integer(), nullable=False),
+            sa.Column("priority_score", sa.Integer(), nullable=False),
+            sa.Column("contended", sa.Boolean(), nullable=False),
+        )
+
+def downgrade():
+    tables = _existing_tables()
+    if ENTRIES in tables:
+        op.drop_table(ENTRIES)
+    if ROLLUPS in tables:
+        op.drop_table(ROLLUPS)
\ No newline at end of file
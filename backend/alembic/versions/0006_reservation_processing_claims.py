@@ -0,0 +1,36 @@
+"""reservation processing claims
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "processing_owner": sa.String(),
+    "claimed_at": sa.DateTime()
+}
+
+def _existing_columns():
+    inspector = sa.inspect(op.get_bind())
+    return {column["name"] for column in inspector.get_columns("reservations")}
+
+def upgrade():
+    existing = _existing_columns()
+    for name, type_ in COLUMNS.items():
+        if name not in existing:
+            op.add_column("reservations", sa.Column(name, type_, nullable=True))
+
+def downgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table("reservations") as batch_op:
+        for name in COLUMNS:
+            if name in existing:
+                batch_op.drop_column(name)
\ No newline at end of file
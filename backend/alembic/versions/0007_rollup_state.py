@@ -0,0 +1,34 @@
+"""rollup state
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+TABLE = "rollup_state"
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def upgrade():
+    if TABLE not in _existing_tables():
+        state = op.create_table(
+            TABLE,
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("rebuilt_at", sa.DateTime(), nullable=True),
+        )
+        # The single row whose lock serializes rollup writers.
+        op.bulk_insert(state, [{"id": 1, "version": 0}])
+
+def downgrade():
+    if TABLE in _existing_tables():
+        op.drop_table(TABLE)
\ No newline at end of file
@@ -1,11 +1,24 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.models.database import engine, Base
-from app.routes import auth, reservations, servers
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.models.database import engine, Base, SessionLocal
+from app.routes import admin, analytics, auth, reservations, servers
+from app.services.analytics import rollup_updater
+from app.services.availability import availability_index
+from app.services.events import event_bus
+from app.services.interval_index import reservation_index
+from app.utils.config import settings
+from app.utils.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.utils.periodic import PeriodicTask
+from app.utils.profiling import ProfilingMiddleware, capture_sql, request_profiler
+
+logger = logging.getLogger(__name__)
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="GPU Server Reservation System")
+app = FastAPI(title="GPU Server Reservation System", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,16 +26,121 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
 
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+capture_sql(engine)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
 app.include_router(auth.router)
 app.include_router(reservations.router)
 app.include_router(servers.router)
+app.include_router(admin.router)
+app.include_router(analytics.router)
+
+def rebuild_reservation_index():
+    db = SessionLocal()
+    try:
+        reservation_index.rebuild(db)
+    finally:
+        db.close()
+
+reservation_index_refresh = PeriodicTask(
+    "reservation-index-refresh",
+    settings.RESERVATION_INDEX_REFRESH_SECONDS,
+    rebuild_reservation_index
+)
+
+@app.on_event("startup")
+def build_reservation_index():
+    if settings.RESERVATION_INDEX_ENABLED:
+        rebuild_reservation_index()
+        reservation_index_refresh.start()
+
+@app.on_event("shutdown")
+def stop_reservation_index_refresh():
+    reservation_index_refresh.stop()
+
+def rebuild_availability_index():
+    db = SessionLocal()
+    try:
+        availability_index.rebuild(db)
+    finally:
+        db.close()
+
+availability_index_refresh = PeriodicTask(
+    "availability-index-refresh",
+    settings.AVAILABILITY_INDEX_REFRESH_SECONDS,
+    rebuild_availability_index
+)
+
+@app.on_event("startup")
+def build_availability_index():
+    if settings.AVAILABILITY_INDEX_ENABLED:
+        rebuild_availability_index()
+        availability_index_refresh.start()
+
+@app.on_event("shutdown")
+def stop_availability_index_refresh():
+    availability_index_refresh.stop()
+
+@app.on_event("startup")
+def start_rollup_updater():
+    if settings.ANALYTICS_ENABLED:
+        db = SessionLocal()
+        try:
+            if rollup_updater.needs_rebuild(db):
+                rollup_updater.rebuild(db, only_if_needed=True)
+        except Exception:
+            # Rollups are derived data; POST /api/analytics/rebuild can redo this.
+            logger.exception("Failed to rebuild utilization rollups at startup")
+        finally:
+            db.close()
+        rollup_updater.start()
+
+@app.on_event("shutdown")
+def stop_rollup_updater():
+    rollup_updater.stop()
+
+@app.on_event("startup")
+def start_event_bus():
+    if settings.EVENTS_ENABLED:
+        event_bus.start()
+
+@app.on_event("shutdown")
+def stop_event_bus():
+    event_bus.stop()
+
+@app.on_event("startup")
+async def start_reservation_pipeline():
+    if settings.AI_PIPELINE_ENABLED:
+        await reservations.reservation_pipeline.start()
+
+@app.on_event("shutdown")
+async def stop_reservation_pipeline():
+    await reservations.reservation_pipeline.stop()
+
+@app.on_event("startup")
+async def start_reservation_scheduler():
+    if settings.SCHEDULER_ENABLED:
+        await reservations.reservation_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_reservation_scheduler():
+    await reservations.reservation_scheduler.stop()
 
 @app.get("/")
 def read_root():
     return {"message": "GPU Server Reservation System API"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
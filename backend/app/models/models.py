@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Enum as SQLAEnum
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Boolean, Text, Index, Enum as SQLAEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.database import Base
@@ -36,12 +36,18 @@ class GPUServer(Base):
     gpu_type = Column(String)
     gpu_count = Column(Integer, default=1)
     is_active = Column(Boolean, default=True)
+    booking_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     
     reservations = relationship("Reservation", back_populates="server")
 
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        Index("ix_reservations_server_status_time", "server_id", "status", "start_time", "end_time"),
+        Index("ix_reservations_user_status", "user_id", "status"),
+        Index("ix_reservations_start_id", "start_time", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -50,12 +56,18 @@ class Reservation(Base):
     purpose = Column(Text)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
+    gpu_count = Column(Integer, nullable=False, default=1, server_default="1")
     priority_score = Column(Integer, default=50)
     status = Column(SQLAEnum(ReservationStatus), default=ReservationStatus.PENDING)
     ai_judgment_reason = Column(Text)
     rejection_reason = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="1")
+    processing_owner = Column(String)
+    claimed_at = Column(DateTime)
+    
+    __mapper_args__ = {"version_id_col": version}
     
     user = relationship("User", back_populates="reservations")
     server = relationship("GPUServer", back_populates="reservations")
@@ -73,4 +85,42 @@ class ReservationConflict(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     reservation = relationship("Reservation", foreign_keys=[reservation_id], back_populates="conflicts")
-    conflicting_reservation = relationship("Reservation", foreign_keys=[conflicting_reservation_id], back_populates="conflicting_with")
\ No newline at end of file
+    conflicting_reservation = relationship("Reservation", foreign_keys=[conflicting_reservation_id], back_populates="conflicting_with")
+
+class UtilizationRollup(Base):
+    __tablename__ = "utilization_rollups"
+    
+    granularity = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    key = Column(String, primary_key=True)
+    gpu_hours = Column(Float, nullable=False, default=0.0, server_default="0")
+    reservations = Column(Integer, nullable=False, default=0, server_default="0")
+    confirmed = Column(Integer, nullable=False, default=0, server_default="0")
+    rejected = Column(Integer, nullable=False, default=0, server_default="0")
+    cancelled = Column(Integer, nullable=False, default=0, server_default="0")
+    contended = Column(Integer, nullable=False, default=0, server_default="0")
+    priority_sum = Column(Integer, nullable=False, default=0, server_default="0")
+
+class RollupState(Base):
+    """Single row whose lock serializes rollup writers across processes."""
+    __tablename__ = "rollup_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    rebuilt_at = Column(DateTime)
+
+class ReservationRollupEntry(Base):
+    __tablename__ = "reservation_rollup_entries"
+    
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), primary_key=True)
+    revision = Column(Integer, nullable=False, default=1)
+    status = Column(String, nullable=False)
+    server_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    purpose_category = Column(String, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    gpu_count = Column(Integer, nullable=False)
+    priority_score = Column(Integer, nullable=False)
+    contended = Column(Boolean, nullable=False)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from app.models.models import UserRole, ReservationStatus
 
 class UserBase(BaseModel):
@@ -29,6 +29,13 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+class UserRoleUpdate(BaseModel):
+    role: UserRole
+
 class GPUServerBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -46,6 +53,23 @@ class GPUServer(GPUServerBase):
     class Config:
         from_attributes = True
 
+class TimeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class ServerAvailability(BaseModel):
+    server_id: int
+    server_name: str
+    gpu_type: Optional[str] = None
+    free_slots: List[TimeSlot]
+
+class AvailabilityWindow(BaseModel):
+    server_id: int
+    server_name: str
+    gpu_type: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+
 class ReservationBase(BaseModel):
     natural_language_request: str
     server_id: Optional[int] = None
@@ -53,9 +77,33 @@ class ReservationBase(BaseModel):
 class ReservationCreate(BaseModel):
     natural_language_request: str
 
+class ReservationBatchCreate(BaseModel):
+    natural_language_request: str
+    frequency: Optional[Literal["daily", "weekly"]] = None
+    interval: Optional[int] = Field(None, ge=1)
+    occurrences: Optional[int] = Field(None, ge=1)
+
+class ReservationExtraction(BaseModel):
+    purpose: str
+    start_time: str = Field(description="YYYY-MM-DD HH:MM")
+    end_time: str = Field(description="YYYY-MM-DD HH:MM")
+    server_preference: Optional[str] = None
+    gpu_count: int = Field(1, ge=1, description="必要なGPU数")
+    priority_score: int = Field(description="0-100")
+    priority_reason: str
+
+class ConflictDecision(BaseModel):
+    id: int
+    recommend_new: bool
+    reason: str
+
+class ConflictDecisionBatch(BaseModel):
+    decisions: List[ConflictDecision]
+
 class ReservationUpdate(BaseModel):
     status: Optional[ReservationStatus] = None
     rejection_reason: Optional[str] = None
+    version: Optional[int] = None
 
 class Reservation(BaseModel):
     id: int
@@ -65,23 +113,127 @@ class Reservation(BaseModel):
     purpose: Optional[str] = None
     start_time: datetime
     end_time: datetime
+    gpu_count: int
     priority_score: int
     status: ReservationStatus
     ai_judgment_reason: Optional[str] = None
     rejection_reason: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    version: int
     user: User
     server: GPUServer
     
     class Config:
         from_attributes = True
 
+class UserSummary(BaseModel):
+    id: int
+    username: str
+    
+    class Config:
+        from_attributes = True
+
+class GPUServerSummary(BaseModel):
+    id: int
+    name: str
+    gpu_type: Optional[str] = None
+    gpu_count: int
+    
+    class Config:
+        from_attributes = True
+
+class ReservationSummary(BaseModel):
+    id: int
+    user_id: int
+    server_id: int
+    natural_language_request: str
+    purpose: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    gpu_count: int
+    priority_score: int
+    status: ReservationStatus
+    ai_judgment_reason: Optional[str] = None
+    rejection_reason: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    version: int
+    
+    class Config:
+        from_attributes = True
+
+class ReservationPage(BaseModel):
+    reservations: List[ReservationSummary]
+    users: List[UserSummary] = []
+    servers: List[GPUServerSummary] = []
+
+class ReservationProcessingStatus(BaseModel):
+    processing: bool
+    reservation: Reservation
+
 class ReservationConfirmRejection(BaseModel):
     confirm: bool
     reason: Optional[str] = None
+    version: Optional[int] = None
 
 class ConflictingReservation(BaseModel):
     reservation: Reservation
     conflicting_reservation: Reservation
-    ai_recommendation: str
\ No newline at end of file
+    ai_recommendation: str
+
+class ScheduleAssignment(BaseModel):
+    reservation_id: int
+    version: int
+    current_server_id: int
+    proposed_server_id: int
+    current_status: ReservationStatus
+    proposed_status: ReservationStatus
+    weight: float
+
+class SchedulePlan(BaseModel):
+    plan_id: str
+    generated_at: datetime
+    objective: float
+    baseline_objective: float
+    complete: bool
+    elapsed_ms: float
+    confirmed: int
+    rejected: int
+    moved: int
+    bumped: int
+    assignments: List[ScheduleAssignment]
+
+class ScheduleApply(BaseModel):
+    plan_id: str
+
+class UtilizationSummary(BaseModel):
+    key: str
+    label: str
+    gpu_hours: float
+    reservations: int
+    confirmed: int
+    rejected: int
+    cancelled: int
+    contended: int
+    average_priority: Optional[float] = None
+    rejection_rate: Optional[float] = None
+    utilization: Optional[float] = None
+
+class UtilizationBucket(UtilizationSummary):
+    bucket_start: datetime
+
+class ProfilingUpdate(BaseModel):
+    enabled: bool
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    samples: int
+    sql_statements: int
+    sql_ms: float
+    created_at: datetime
\ No newline at end of file
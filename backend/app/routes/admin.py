@@ -0,0 +1,145 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from app.models import models, schemas
+from app.models.database import get_db
+from app.utils import auth
+from app.utils.auth import login_cache, principal_cache
+from app.utils.profiling import request_profiler
+from app.services.ai_service import ai_cache
+from app.services.events import event_bus
+from app.services.fast_parser import fast_parser
+from app.services.interval_index import reservation_index
+from app.services.server_catalog import server_catalog
+from app.services.reservation_service import StaleReservationError
+from app.routes.reservations import reservation_scheduler, reservation_service
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+@router.get("/reservation-index")
+def check_reservation_index(
+    repair: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return reservation_index.check_consistency(db, repair=repair)
+
+@router.get("/ai-cache")
+def get_ai_cache_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return ai_cache.stats()
+
+@router.get("/llm")
+def get_llm_backend_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    backend = reservation_service.ai_service.backend
+    if not hasattr(backend, "stats"):
+        return {"resilience_enabled": False}
+    return {"resilience_enabled": True, **backend.stats()}
+
+@router.get("/events")
+def get_event_bus_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return event_bus.stats()
+
+@router.get("/server-catalog")
+def get_server_catalog_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return server_catalog.stats()
+
+@router.get("/fast-parser")
+def get_fast_parser_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return fast_parser.stats()
+
+@router.post("/schedule/plan", response_model=schemas.SchedulePlan)
+def create_schedule_plan(
+    time_budget: Optional[float] = Query(None, gt=0, le=60),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return reservation_scheduler.plan(db, time_budget=time_budget)
+
+@router.get("/schedule/plan", response_model=schemas.SchedulePlan)
+def get_schedule_plan(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    plan = reservation_scheduler.latest_plan
+    if not plan:
+        raise HTTPException(status_code=404, detail="スケジュール案がありません")
+    return plan
+
+@router.post("/schedule/apply", response_model=List[schemas.Reservation])
+def apply_schedule_plan(
+    schedule_apply: schemas.ScheduleApply,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    try:
+        return reservation_scheduler.apply(db, schedule_apply.plan_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StaleReservationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/profiling")
+def get_profiling_status(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return request_profiler.status()
+
+@router.put("/profiling")
+def update_profiling(
+    profiling_update: schemas.ProfilingUpdate,
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    request_profiler.configure(profiling_update.enabled, profiling_update.sample_rate)
+    return request_profiler.status()
+
+@router.get("/profiles", response_model=List[schemas.ProfileSummary])
+def list_profiles(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return request_profiler.list()
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    profile = request_profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return JSONResponse(
+        profile["speedscope"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'}
+    )
+
+@router.get("/auth-cache")
+def get_auth_cache_stats(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return {**principal_cache.stats(), "login": login_cache.stats()}
+
+@router.put("/users/{user_id}/role", response_model=schemas.User)
+def update_user_role(
+    user_id: int,
+    role_update: schemas.UserRoleUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
+    
+    user.role = role_update.role
+    db.commit()
+    db.refresh(user)
+    principal_cache.invalidate_user(user.id)
+    return user
\ No newline at end of file
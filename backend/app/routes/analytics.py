@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.models import models, schemas
+from app.models.database import get_db
+from app.services.analytics import query_rollups, rollup_updater, summarize
+from app.utils import auth
+from app.utils.config import settings
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+Dimension = Literal["server", "user", "purpose"]
+
+def _window(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    default_days: int
+) -> Tuple[datetime, datetime]:
+    # By default look back and ahead, so upcoming bookings are included.
+    span = timedelta(days=default_days)
+    start = start or (end - 2 * span if end else datetime.now() - span)
+    end = end or start + 2 * span
+    if end <= start:
+        raise HTTPException(status_code=400, detail="終了日時は開始日時より後にしてください")
+    return start, end
+
+@router.get("/utilization", response_model=List[schemas.UtilizationBucket])
+def get_utilization(
+    granularity: Literal["hour", "day"] = "day",
+    dimension: Dimension = "server",
+    key: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    start, end = _window(start, end, 1 if granularity == "hour" else 30)
+    if granularity == "hour" and end - start > timedelta(days=settings.ANALYTICS_MAX_HOURLY_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"時間単位の集計は{settings.ANALYTICS_MAX_HOURLY_DAYS}日以内で指定してください"
+        )
+    return query_rollups(db, granularity, dimension, start, end, key)
+
+@router.get("/summary", response_model=List[schemas.UtilizationSummary])
+def get_utilization_summary(
+    dimension: Dimension = "server",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    start, end = _window(start, end, 30)
+    return summarize(db, dimension, start, end)
+
+@router.post("/rebuild")
+def rebuild_rollups(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return {"reservations": rollup_updater.rebuild(db)}
+
+@router.get("/status")
+def get_rollup_status(
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    return rollup_updater.stats()
\ No newline at end of file
@@ -1,7 +1,9 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.models import models, schemas
 from app.models.database import get_db
 from app.utils import auth
@@ -9,11 +11,34 @@ from app.utils.config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+def _find_user(db: Session, username: str, email: Optional[str] = None) -> Optional[models.User]:
+    query = db.query(models.User)
+    if email is None:
+        return query.filter(models.User.username == username).first()
+    return query.filter((models.User.username == username) | (models.User.email == email)).first()
+
+def _add_user(db: Session, db_user: models.User) -> models.User:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def _update_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+# Database work goes through run_in_threadpool and bcrypt through the
+# dedicated hasher pool, so neither blocks the event loop.
 @router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(
-        (models.User.username == user.username) | (models.User.email == user.email)
-    ).first()
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(_find_user, db, user.username, user.email)
     
     if db_user:
         if db_user.username == user.username:
@@ -27,23 +52,35 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
                 detail="Email already registered"
             )
     
-    hashed_password = auth.get_password_hash(user.password)
+    try:
+        hashed_password = await auth.password_hasher.hash(user.password)
+    except auth.HashingBusyError:
+        raise _hasher_busy()
     db_user = models.User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password,
         role=user.role
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return await run_in_threadpool(_add_user, db, db_user)
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, form_data.username)
+    
+    valid, new_hash = False, None
+    if user:
+        if auth.login_cache.check(user.username, form_data.password, user.hashed_password):
+            valid = True
+        else:
+            try:
+                valid, new_hash = await auth.password_hasher.verify_and_update(
+                    form_data.password, user.hashed_password
+                )
+            except auth.HashingBusyError:
+                raise _hasher_busy()
     
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -52,8 +89,13 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "role": user.role.value}, expires_delta=access_token_expires
     )
+    username = user.username
+    if new_hash:
+        # The configured bcrypt cost changed since this hash was made.
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
+    auth.login_cache.add(username, form_data.password, new_hash or user.hashed_password)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.User)
@@ -1,24 +1,52 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status as http_status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
 from app.models import models, schemas
 from app.models.database import get_db
 from app.utils import auth
-from app.services.reservation_service import ReservationService
+from app.services.events import event_bus
+from app.services.export_service import reservation_exporter
+from app.services.reservation_service import ReservationService, StaleReservationError
+from app.services.reservation_pipeline import ReservationPipeline
+from app.services.scheduler import ReservationScheduler
+from app.utils.config import settings
+from app.utils.http_cache import json_response
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.serializers import ReservationView, reservation_serializer, serialize_reservations
 
 router = APIRouter(prefix="/api/reservations", tags=["reservations"])
 reservation_service = ReservationService()
+reservation_pipeline = ReservationPipeline(reservation_service)
+reservation_scheduler = ReservationScheduler(reservation_service)
 
-@router.get("/", response_model=List[schemas.Reservation])
+@router.get("/", response_model=Union[List[schemas.Reservation], schemas.ReservationPage])
 def get_reservations(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     status: Optional[models.ReservationStatus] = None,
     pending_rejection: bool = False,
+    server_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    view: ReservationView = "full",
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     query = db.query(models.Reservation)
+    if view != "ids":
+        query = query.options(
+            joinedload(models.Reservation.user),
+            joinedload(models.Reservation.server)
+        )
     
     if current_user.role != models.UserRole.ADMIN:
         query = query.filter(models.Reservation.user_id == current_user.id)
@@ -31,34 +59,174 @@ def get_reservations(
             models.Reservation.status == models.ReservationStatus.PENDING_REJECTION
         )
     
-    reservations = query.offset(skip).limit(limit).all()
-    return reservations
+    if server_id is not None:
+        query = query.filter(models.Reservation.server_id == server_id)
+    
+    # Reservations overlapping the [start, end) window.
+    if start:
+        query = query.filter(models.Reservation.end_time > start)
+    if end:
+        query = query.filter(models.Reservation.start_time < end)
+    
+    if cursor:
+        try:
+            cursor_start, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(or_(
+            models.Reservation.start_time > cursor_start,
+            and_(
+                models.Reservation.start_time == cursor_start,
+                models.Reservation.id > cursor_id
+            )
+        ))
+    
+    reservations = query.order_by(
+        models.Reservation.start_time,
+        models.Reservation.id
+    ).offset(skip).limit(limit).all()
+    
+    headers = {}
+    if limit > 0 and len(reservations) == limit:
+        last = reservations[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.start_time, last.id)
+    return json_response(request, serialize_reservations(reservations, view), headers=headers)
+
+@router.get("/export")
+def export_reservations(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[List[models.ReservationStatus]] = Query(None),
+    server_id: Optional[int] = None,
+    current_user: models.User = Depends(auth.get_admin_user)
+):
+    if format == "csv":
+        rows = reservation_exporter.iter_csv(start, end, status, server_id)
+        media_type = "text/csv"
+    else:
+        rows = reservation_exporter.iter_ndjson(start, end, status, server_id)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reservations.{format}"'}
+    )
+
+@router.post("/events/ticket", response_model=schemas.StreamTicket)
+async def create_events_ticket(
+    current_user: schemas.User = Depends(auth.get_current_active_user)
+):
+    return {
+        "ticket": auth.create_stream_ticket(current_user),
+        "expires_in": settings.EVENTS_TICKET_SECONDS
+    }
+
+@router.get("/events")
+async def stream_reservation_events(
+    current_user: schemas.User = Depends(auth.get_stream_user)
+):
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="イベント配信は無効です")
+    subscription = event_bus.subscribe(
+        None if current_user.role == models.UserRole.ADMIN else current_user.id
+    )
+    
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@router.post("/", response_model=schemas.Reservation)
-def create_reservation(
+@router.post("/", response_model=schemas.Reservation, status_code=http_status.HTTP_202_ACCEPTED)
+async def create_reservation(
     reservation: schemas.ReservationCreate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     try:
-        new_reservation = reservation_service.create_reservation(
+        if settings.AI_PIPELINE_ENABLED:
+            return await reservation_pipeline.submit(
+                db,
+                current_user.id,
+                reservation
+            )
+        
+        new_reservation = await run_in_threadpool(
+            reservation_service.create_reservation,
             db,
             current_user.id,
             reservation
         )
+        response.status_code = http_status.HTTP_200_OK
         return new_reservation
+    except StaleReservationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/batch", response_model=List[schemas.Reservation])
+def create_reservation_batch(
+    series: schemas.ReservationBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    try:
+        return reservation_service.create_reservation_series(db, current_user.id, series)
+    except StaleReservationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/{reservation_id}/status", response_model=schemas.ReservationProcessingStatus)
+async def get_reservation_status(
+    reservation_id: int,
+    wait: float = Query(0, ge=0, le=30),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    if wait:
+        await reservation_pipeline.wait(reservation_id, wait)
+    
+    reservation = await run_in_threadpool(
+        reservation_service.get_reservation, db, reservation_id
+    )
+    
+    if not reservation:
+        raise HTTPException(status_code=404, detail="予約が見つかりません")
+    
+    if current_user.role != models.UserRole.ADMIN and reservation.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="アクセス権限がありません")
+    
+    return {
+        "processing": reservation_pipeline.is_processing(reservation_id),
+        "reservation": reservation
+    }
+
 @router.get("/{reservation_id}", response_model=schemas.Reservation)
 def get_reservation(
     reservation_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    reservation = db.query(models.Reservation).filter(
-        models.Reservation.id == reservation_id
-    ).first()
+    reservation = reservation_service.get_reservation(db, reservation_id)
     
     if not reservation:
         raise HTTPException(status_code=404, detail="予約が見つかりません")
@@ -66,7 +234,7 @@ def get_reservation(
     if current_user.role != models.UserRole.ADMIN and reservation.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="アクセス権限がありません")
     
-    return reservation
+    return json_response(request, reservation_serializer.one(reservation))
 
 @router.put("/{reservation_id}", response_model=schemas.Reservation)
 def update_reservation(
@@ -85,13 +253,21 @@ def update_reservation(
     if current_user.role != models.UserRole.ADMIN and reservation.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="アクセス権限がありません")
     
+    if reservation_update.version is not None and reservation_update.version != reservation.version:
+        raise HTTPException(status_code=409, detail="予約が他の操作で更新されています")
+    
     if reservation_update.status:
         reservation.status = reservation_update.status
     if reservation_update.rejection_reason:
         reservation.rejection_reason = reservation_update.rejection_reason
     
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="予約が他の操作で更新されています")
     db.refresh(reservation)
+    reservation_service.notify_changed(reservation)
     return reservation
 
 @router.delete("/{reservation_id}")
@@ -111,7 +287,12 @@ def delete_reservation(
         raise HTTPException(status_code=403, detail="アクセス権限がありません")
     
     reservation.status = models.ReservationStatus.CANCELLED
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="予約が他の操作で更新されています")
+    reservation_service.notify_changed(reservation)
     
     return {"message": "予約をキャンセルしました"}
 
@@ -128,10 +309,13 @@ def confirm_rejection(
             reservation_id,
             current_user.id,
             confirmation.confirm,
-            confirmation.reason
+            confirmation.reason,
+            confirmation.version
         )
         return updated_reservation
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except StaleReservationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,23 +1,26 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from app.models import models, schemas
 from app.models.database import get_db
+from app.services.availability import AvailabilityIndex, availability_index
+from app.services.server_catalog import server_catalog
 from app.utils import auth
+from app.utils.http_cache import json_response
+from app.utils.config import settings
 
 router = APIRouter(prefix="/api/servers", tags=["servers"])
 
 @router.get("/", response_model=List[schemas.GPUServer])
 def get_servers(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    servers = db.query(models.GPUServer).filter(
-        models.GPUServer.is_active == True
-    ).offset(skip).limit(limit).all()
-    return servers
+    return json_response(request, encoded=server_catalog.list_active(db, skip, limit))
 
 @router.post("/", response_model=schemas.GPUServer)
 def create_server(
@@ -36,22 +39,126 @@ def create_server(
     db.add(new_server)
     db.commit()
     db.refresh(new_server)
+    server_catalog.invalidate()
     return new_server
 
+def _availability_window(
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    start = start or datetime.now()
+    end = end or start + timedelta(days=7)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="終了日時は開始日時より後にしてください")
+    # Outside the grid nothing is known; an empty answer would read as fully booked.
+    horizon_start, horizon_end = availability_index.horizon()
+    if start < horizon_start or end > horizon_end:
+        raise HTTPException(
+            status_code=400,
+            detail=f"空き状況は本日から{settings.AVAILABILITY_HORIZON_DAYS}日以内の範囲で指定してください"
+        )
+    return start, end
+
+def _availability_servers(
+    db: Session,
+    gpu_type: Optional[str],
+    server_id: Optional[int]
+) -> List[models.GPUServer]:
+    query = db.query(models.GPUServer).filter(models.GPUServer.is_active == True)
+    if gpu_type:
+        query = query.filter(models.GPUServer.gpu_type.ilike(f"%{gpu_type}%"))
+    if server_id is not None:
+        query = query.filter(models.GPUServer.id == server_id)
+    return query.order_by(models.GPUServer.id).all()
+
+def _availability_index(db: Session) -> AvailabilityIndex:
+    if not settings.AVAILABILITY_INDEX_ENABLED:
+        index = AvailabilityIndex(settings.AVAILABILITY_SLOT_MINUTES, settings.AVAILABILITY_HORIZON_DAYS)
+        index.rebuild(db)
+        return index
+    if not availability_index.ready:
+        availability_index.rebuild(db)
+    return availability_index
+
+@router.get("/availability", response_model=List[schemas.ServerAvailability])
+def get_availability(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gpu_type: Optional[str] = None,
+    server_id: Optional[int] = None,
+    gpus: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    start, end = _availability_window(start, end)
+    servers = _availability_servers(db, gpu_type, server_id)
+    free_slots = _availability_index(db).free_slots(
+        [server.id for server in servers],
+        [server.gpu_count or 1 for server in servers],
+        start,
+        end,
+        gpus
+    )
+    return [
+        {
+            "server_id": server.id,
+            "server_name": server.name,
+            "gpu_type": server.gpu_type,
+            "free_slots": [
+                {"start_time": slot_start, "end_time": slot_end}
+                for slot_start, slot_end in free_slots[server.id]
+            ]
+        }
+        for server in servers
+    ]
+
+@router.get("/availability/first-fit", response_model=schemas.AvailabilityWindow)
+def find_first_fit(
+    hours: float = Query(..., gt=0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gpu_type: Optional[str] = None,
+    gpus: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    start, end = _availability_window(start, end)
+    servers = _availability_servers(db, gpu_type, None)
+    duration = timedelta(hours=hours)
+    found = _availability_index(db).first_fit(
+        [server.id for server in servers],
+        [server.gpu_count or 1 for server in servers],
+        start,
+        end,
+        duration,
+        gpus
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="条件に合う空き時間がありません")
+    
+    server_id, window_start = found
+    server = next(server for server in servers if server.id == server_id)
+    return {
+        "server_id": server.id,
+        "server_name": server.name,
+        "gpu_type": server.gpu_type,
+        "start_time": window_start,
+        "end_time": window_start + duration
+    }
+
 @router.get("/{server_id}", response_model=schemas.GPUServer)
 def get_server(
     server_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    server = db.query(models.GPUServer).filter(
-        models.GPUServer.id == server_id
-    ).first()
+    server = server_catalog.get(db, server_id)
     
     if not server:
         raise HTTPException(status_code=404, detail="サーバーが見つかりません")
     
-    return server
+    return json_response(request, encoded=server)
 
 @router.put("/{server_id}", response_model=schemas.GPUServer)
 def update_server(
@@ -72,6 +179,7 @@ def update_server(
     
     db.commit()
     db.refresh(server)
+    server_catalog.invalidate()
     return server
 
 @router.delete("/{server_id}")
@@ -89,5 +197,6 @@ def delete_server(
     
     server.is_active = False
     db.commit()
+    server_catalog.invalidate()
     
     return {"message": "サーバーを無効化しました"}
\ No newline at end of file
@@ -1,17 +1,246 @@
-import google.generativeai as genai
+import asyncio
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 import re
-from typing import Dict, Any
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from app.models.schemas import ConflictDecisionBatch, ReservationExtraction
+from app.services.fast_parser import fast_parser
+from app.services.llm_backend import LLMBackendError, create_backend
 from app.utils.config import settings
+from app.utils.metrics import record_ai_fallback, timed_ai_call
+
+# Phrases whose meaning depends on the current time rather than just the date.
+_TIME_RELATIVE = re.compile(r"今から|今すぐ|すぐ|直ちに|\d+\s*分後|\d+\s*時間後|\bnow\b")
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+def request_cache_key(natural_language_request: str) -> str:
+    text = normalize_text(natural_language_request)
+    anchor_format = "%Y-%m-%d %H:%M" if _TIME_RELATIVE.search(text) else "%Y-%m-%d"
+    return f"{datetime.now().strftime(anchor_format)}|{text}"
+
+def priority_cache_key(purpose: str, duration: float) -> str:
+    return f"{round(duration, 2)}|{normalize_text(purpose or '')}"
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=lambda v: {"__datetime__": v.isoformat()})
+
+def _decode(raw: str) -> Any:
+    return json.loads(
+        raw,
+        object_hook=lambda d: datetime.fromisoformat(d["__datetime__"]) if "__datetime__" in d else d
+    )
+
+class AICache:
+    """SQLite-backed TTL + LRU cache for model results that survives restarts.
+    
+    An in-memory LRU of ``memory_entries`` sits in front of the SQLite file,
+    and the last_used bumps of hits are written in batches at most every
+    ``touch_flush_seconds``. peek() only reads memory, so the async service
+    methods call it on the event loop and go to aget()/aset(), which run
+    the SQLite work in the thread pool, only on a miss or a write.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        ttl_seconds: int,
+        enabled: bool = True,
+        memory_entries: int = 1024,
+        touch_flush_seconds: float = 30.0
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.memory_entries = memory_entries
+        self.touch_flush_seconds = touch_flush_seconds
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size = 0
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._flushed_at = time.monotonic()
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_last_used ON ai_cache (last_used)")
+            conn.commit()
+            self._size = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+    
+    def _remember(self, entry: Tuple[str, str], raw: str, created_at: float):
+        self._memory[entry] = (raw, created_at)
+        self._memory.move_to_end(entry)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _from_memory(self, entry: Tuple[str, str], ttl: float, now: float) -> Optional[str]:
+        cached = self._memory.get(entry)
+        if cached is None:
+            return None
+        raw, created_at = cached
+        if now - created_at > ttl:
+            # The SQLite row is removed by the next get() that reaches it.
+            del self._memory[entry]
+            return None
+        self._memory.move_to_end(entry)
+        self._touched[entry] = now
+        self.hits[entry[0]] += 1
+        return raw
+    
+    def _write_touched(self, conn: sqlite3.Connection):
+        if self._touched:
+            conn.executemany(
+                "UPDATE ai_cache SET last_used = ? WHERE namespace = ? AND key = ?",
+                [(used, namespace, key) for (namespace, key), used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._flushed_at = time.monotonic()
+    
+    def _flush_due(self, conn: sqlite3.Connection):
+        if time.monotonic() - self._flushed_at >= self.touch_flush_seconds:
+            self._write_touched(conn)
+            conn.commit()
+    
+    def peek(self, namespace: str, key: str, ttl: Optional[int] = None) -> Any:
+        """Look up memory only; never blocks on SQLite."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            raw = self._from_memory((namespace, key), ttl or self.ttl_seconds, time.time())
+        return None if raw is None else _decode(raw)
+    
+    def get(self, namespace: str, key: str, ttl: Optional[int] = None) -> Any:
+        if not self.enabled:
+            return None
+        entry = (namespace, key)
+        ttl = ttl or self.ttl_seconds
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            raw = self._from_memory(entry, ttl, now)
+            if raw is not None:
+                self._flush_due(conn)
+                return _decode(raw)
+            row = conn.execute(
+                "SELECT value, created_at FROM ai_cache WHERE namespace = ? AND key = ?",
+                entry
+            ).fetchone()
+            if row is None or now - row[1] > ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM ai_cache WHERE namespace = ? AND key = ?", entry)
+                    conn.commit()
+                    self._size -= 1
+                self.misses[namespace] += 1
+                return None
+            self._touched[entry] = now
+            self._flush_due(conn)
+            self._remember(entry, row[0], row[1])
+            self.hits[namespace] += 1
+        return _decode(row[0])
+    
+    def set(self, namespace: str, key: str, value: Any):
+        if not self.enabled:
+            return
+        entry = (namespace, key)
+        raw = _encode(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO ai_cache VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, raw, now, now)
+            )
+            if cursor.rowcount:
+                self._size += 1
+            else:
+                conn.execute(
+                    "UPDATE ai_cache SET value = ?, created_at = ?, last_used = ? "
+                    "WHERE namespace = ? AND key = ?",
+                    (raw, now, now, namespace, key)
+                )
+            self._touched.pop(entry, None)
+            # Pending bumps ride along with this commit, and must land before
+            # the LRU eviction below reads last_used.
+            self._write_touched(conn)
+            if self._size > self.max_entries:
+                overflow = self._size - self.max_entries
+                conn.execute(
+                    "DELETE FROM ai_cache WHERE rowid IN "
+                    "(SELECT rowid FROM ai_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= overflow
+            conn.commit()
+            self._remember(entry, raw, now)
+    
+    async def aget(self, namespace: str, key: str, ttl: Optional[int] = None) -> Any:
+        value = self.peek(namespace, key, ttl)
+        if value is not None or not self.enabled:
+            return value
+        return await run_in_threadpool(self.get, namespace, key, ttl)
+    
+    async def aset(self, namespace: str, key: str, value: Any):
+        if self.enabled:
+            await run_in_threadpool(self.set, namespace, key, value)
+    
+    def stats(self) -> Dict[str, Any]:
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            "enabled": self.enabled,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "memory_entries": len(self._memory),
+            "pending_touches": len(self._touched),
+            "namespaces": {
+                namespace: {"hits": self.hits[namespace], "misses": self.misses[namespace]}
+                for namespace in namespaces
+            }
+        }
+
+ai_cache = AICache(
+    settings.AI_CACHE_PATH,
+    settings.AI_CACHE_MAX_ENTRIES,
+    settings.AI_CACHE_TTL_SECONDS,
+    enabled=settings.AI_CACHE_ENABLED,
+    memory_entries=settings.AI_CACHE_MEMORY_ENTRIES,
+    touch_flush_seconds=settings.AI_CACHE_TOUCH_FLUSH_SECONDS
+)
 
 class AIService:
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.backend = create_backend()
+        self.cache = ai_cache
+        self.fast_parser = fast_parser
     
-    def parse_reservation_request(self, natural_language_request: str) -> Dict[str, Any]:
-        prompt = f"""
+    def _fast_parse(self, natural_language_request: str, server_names: Sequence[str]) -> Optional[Dict[str, Any]]:
+        if not settings.FAST_PARSER_ENABLED:
+            return None
+        return self.fast_parser.parse(natural_language_request, server_names)
+    
+    def _parse_prompt(self, natural_language_request: str) -> str:
+        return f"""
         以下の自然言語による予約リクエストから、必要な情報を抽出してください。
         現在の日時: {datetime.now().strftime('%Y-%m-%d %H:%M')}
         
@@ -22,18 +251,18 @@ class AIService:
             "purpose": "利用目的",
             "start_time": "YYYY-MM-DD HH:MM",
             "end_time": "YYYY-MM-DD HH:MM",
-            "server_preference": "希望するサーバー名（もしあれば）"
+            "server_preference": "希望するサーバー名（もしあれば）",
+            "gpu_count": 必要なGPU数
         }}
         
         注意事項：
         - 日付が明記されていない場合は、今日または明日を想定してください
         - 期間が明記されていない場合は、2時間を想定してください
         - 時刻は24時間形式で記載してください
+        - GPU数が明記されていない場合は、1を想定してください
         """
-        
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
-        
+    
+    def _parse_result(self, text: str) -> Optional[Dict[str, Any]]:
         json_match = re.search(r'\{.*\}', text, re.DOTALL)
         if json_match:
             try:
@@ -44,20 +273,73 @@ class AIService:
                 parsed_data["end_time"] = datetime.strptime(
                     parsed_data["end_time"], "%Y-%m-%d %H:%M"
                 )
+                parsed_data["gpu_count"] = max(1, int(parsed_data.get("gpu_count") or 1))
                 return parsed_data
-            except:
+            except (KeyError, TypeError, ValueError):
                 pass
-        
+        return None
+    
+    def _parse_fallback(self, natural_language_request: str) -> Dict[str, Any]:
+        record_ai_fallback()
         now = datetime.now()
         return {
             "purpose": natural_language_request,
             "start_time": now,
             "end_time": now + timedelta(hours=2),
-            "server_preference": None
+            "server_preference": None,
+            "gpu_count": 1
         }
     
-    def calculate_priority(self, purpose: str, duration: float) -> int:
-        prompt = f"""
+    @timed_ai_call("parse")
+    def parse_reservation_request(
+        self, natural_language_request: str, server_names: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        parsed_data = self._fast_parse(natural_language_request, server_names)
+        if parsed_data is not None:
+            return parsed_data
+        
+        key = request_cache_key(natural_language_request)
+        cached = self.cache.get("parse", key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self.backend.generate(self._parse_prompt(natural_language_request))
+            parsed_data = self._parse_result(response.strip())
+        except LLMBackendError:
+            parsed_data = None
+        if parsed_data is None:
+            return self._parse_fallback(natural_language_request)
+        self.cache.set("parse", key, parsed_data)
+        return parsed_data
+    
+    @timed_ai_call("parse")
+    async def aparse_reservation_request(
+        self, natural_language_request: str, server_names: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        parsed_data = self._fast_parse(natural_language_request, server_names)
+        if parsed_data is not None:
+            return parsed_data
+        
+        key = request_cache_key(natural_language_request)
+        cached = await self.cache.aget("parse", key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.backend.agenerate(
+                self._parse_prompt(natural_language_request)
+            )
+            parsed_data = self._parse_result(response.strip())
+        except LLMBackendError:
+            parsed_data = None
+        if parsed_data is None:
+            return self._parse_fallback(natural_language_request)
+        await self.cache.aset("parse", key, parsed_data)
+        return parsed_data
+    
+    def _priority_prompt(self, purpose: str, duration: float) -> str:
+        return f"""
         以下のGPUサーバー利用目的の優先度を0-100のスコアで評価してください。
         
         利用目的: {purpose}
@@ -71,28 +353,176 @@ class AIService:
         
         スコアのみを数値で返してください。
         """
+    
+    def _priority_result(self, text: str) -> int:
+        match = re.search(r'\d+', text)
+        if not match:
+            raise ValueError(f"no score in response: {text!r}")
+        return max(0, min(100, int(match.group())))
+    
+    @timed_ai_call("priority")
+    def calculate_priority(self, purpose: str, duration: float) -> int:
+        key = priority_cache_key(purpose, duration)
+        cached = self.cache.get("priority", key, ttl=settings.AI_CACHE_PRIORITY_TTL_SECONDS)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.model.generate_content(prompt)
-            score_text = response.text.strip()
-            score = int(re.search(r'\d+', score_text).group())
-            return max(0, min(100, score))
-        except:
+            response = self.backend.generate(self._priority_prompt(purpose, duration))
+            score = self._priority_result(response.strip())
+        except (LLMBackendError, ValueError):
+            record_ai_fallback()
             return 50
+        self.cache.set("priority", key, score)
+        return score
     
-    def judge_conflict(self, new_reservation: Any, existing_reservation: Any) -> Dict[str, Any]:
-        prompt = f"""
+    @timed_ai_call("priority")
+    async def acalculate_priority(self, purpose: str, duration: float) -> int:
+        key = priority_cache_key(purpose, duration)
+        cached = await self.cache.aget("priority", key, ttl=settings.AI_CACHE_PRIORITY_TTL_SECONDS)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.backend.agenerate(
+                self._priority_prompt(purpose, duration)
+            )
+            score = self._priority_result(response.strip())
+        except (LLMBackendError, ValueError):
+            record_ai_fallback()
+            return 50
+        await self.cache.aset("priority", key, score)
+        return score
+    
+    def _extract_prompt(self, natural_language_request: str) -> str:
+        schema = json.dumps(ReservationExtraction.model_json_schema(), ensure_ascii=False)
+        return f"""
+        以下の自然言語によるGPUサーバー予約リクエストから予約情報を抽出し、
+        利用目的の優先度を0-100のスコアで評価してください。
+        現在の日時: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+        
+        リクエスト: {natural_language_request}
+        
+        次のJSONスキーマに厳密に従うJSONオブジェクトのみを返してください：
+        {schema}
+        
+        注意事項：
+        - 日付が明記されていない場合は、今日または明日を想定してください
+        - 期間が明記されていない場合は、2時間を想定してください
+        - 時刻は24時間形式で記載してください
+        - server_preference は希望するサーバー名がなければ null にしてください
+        - gpu_count は必要なGPU数です。明記されていなければ 1 にしてください
+        - priority_score は研究の重要性・緊急性、プロジェクトの締め切り、
+          学習やテストの必要性、リソースの効率的な利用を基準に評価してください
+        - priority_reason にはスコアの根拠を簡潔に記載してください
+        """
+    
+    def _extract_result(self, text: str) -> Optional[Dict[str, Any]]:
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        if json_match:
+            try:
+                extraction = ReservationExtraction.model_validate_json(json_match.group())
+                return {
+                    "purpose": extraction.purpose,
+                    "start_time": datetime.strptime(extraction.start_time, "%Y-%m-%d %H:%M"),
+                    "end_time": datetime.strptime(extraction.end_time, "%Y-%m-%d %H:%M"),
+                    "server_preference": extraction.server_preference,
+                    "gpu_count": extraction.gpu_count,
+                    "priority_score": max(0, min(100, extraction.priority_score)),
+                    "priority_reason": extraction.priority_reason
+                }
+            except (ValidationError, ValueError):
+                pass
+        return None
+    
+    def _extract_fallback(self, natural_language_request: str) -> Dict[str, Any]:
+        parsed_data = self._parse_fallback(natural_language_request)
+        parsed_data["priority_score"] = 50
+        parsed_data["priority_reason"] = None
+        return parsed_data
+    
+    def _store_extraction(self, key: str, parsed_data: Dict[str, Any]):
+        self.cache.set("extract", key, parsed_data)
+        self.cache.set(
+            "priority",
+            priority_cache_key(parsed_data["purpose"], self._duration_hours(parsed_data)),
+            parsed_data["priority_score"]
+        )
+    
+    def _duration_hours(self, parsed_data: Dict[str, Any]) -> float:
+        return (parsed_data["end_time"] - parsed_data["start_time"]).total_seconds() / 3600
+    
+    @timed_ai_call("extract")
+    def extract_reservation(
+        self, natural_language_request: str, server_names: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        parsed_data = self._fast_parse(natural_language_request, server_names)
+        if parsed_data is not None:
+            parsed_data["priority_score"] = self.calculate_priority(
+                parsed_data["purpose"], self._duration_hours(parsed_data)
+            )
+            parsed_data["priority_reason"] = None
+            return parsed_data
+        
+        key = request_cache_key(natural_language_request)
+        cached = self.cache.get("extract", key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self.backend.generate(self._extract_prompt(natural_language_request))
+            parsed_data = self._extract_result(response.strip())
+        except LLMBackendError:
+            parsed_data = None
+        if parsed_data is None:
+            return self._extract_fallback(natural_language_request)
+        self._store_extraction(key, parsed_data)
+        return parsed_data
+    
+    @timed_ai_call("extract")
+    async def aextract_reservation(
+        self, natural_language_request: str, server_names: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        parsed_data = self._fast_parse(natural_language_request, server_names)
+        if parsed_data is not None:
+            parsed_data["priority_score"] = await self.acalculate_priority(
+                parsed_data["purpose"], self._duration_hours(parsed_data)
+            )
+            parsed_data["priority_reason"] = None
+            return parsed_data
+        
+        key = request_cache_key(natural_language_request)
+        cached = await self.cache.aget("extract", key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.backend.agenerate(
+                self._extract_prompt(natural_language_request)
+            )
+            parsed_data = self._extract_result(response.strip())
+        except LLMBackendError:
+            parsed_data = None
+        if parsed_data is None:
+            return self._extract_fallback(natural_language_request)
+        await run_in_threadpool(self._store_extraction, key, parsed_data)
+        return parsed_data
+    
+    def _judge_prompt(self, new_reservation: Any, existing_reservation: Any) -> str:
+        return f"""
         2つのGPUサーバー予約が競合しています。どちらを優先すべきか判断してください。
         
         新規予約:
         - 目的: {new_reservation.purpose}
         - 優先度スコア: {new_reservation.priority_score}
         - 利用時間: {new_reservation.start_time} から {new_reservation.end_time}
+        - GPU数: {new_reservation.gpu_count}
         
         既存予約:
         - 目的: {existing_reservation.purpose}
         - 優先度スコア: {existing_reservation.priority_score}
         - 利用時間: {existing_reservation.start_time} から {existing_reservation.end_time}
+        - GPU数: {existing_reservation.gpu_count}
         
         以下のJSON形式で返してください：
         {{
@@ -100,17 +530,142 @@ class AIService:
             "reason": "判断理由"
         }}
         """
+    
+    def _judge_fallback(self, new_reservation: Any, existing_reservation: Any) -> Dict[str, Any]:
+        record_ai_fallback()
+        return {
+            "recommend_new": new_reservation.priority_score > existing_reservation.priority_score,
+            "reason": "優先度スコアに基づいて判断しました"
+        }
+    
+    @timed_ai_call("judge")
+    def judge_conflict(self, new_reservation: Any, existing_reservation: Any) -> Dict[str, Any]:
+        try:
+            response = self.backend.generate(
+                self._judge_prompt(new_reservation, existing_reservation)
+            )
+            text = response.strip()
+            json_match = re.search(r'\{.*\}', text, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+        except (LLMBackendError, ValueError):
+            pass
         
+        return self._judge_fallback(new_reservation, existing_reservation)
+    
+    @timed_ai_call("judge")
+    async def ajudge_conflict(self, new_reservation: Any, existing_reservation: Any) -> Dict[str, Any]:
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
+            response = await self.backend.agenerate(
+                self._judge_prompt(new_reservation, existing_reservation)
+            )
+            text = response.strip()
             json_match = re.search(r'\{.*\}', text, re.DOTALL)
             if json_match:
                 return json.loads(json_match.group())
-        except:
+        except (LLMBackendError, ValueError):
             pass
         
+        return self._judge_fallback(new_reservation, existing_reservation)
+    
+    def _batch_judge_prompt(self, new_reservation: Any, conflicts: Sequence[Any]) -> str:
+        existing = "\n".join(
+            f"""        - id: {conflict.id}
+          目的: {conflict.purpose}
+          優先度スコア: {conflict.priority_score}
+          利用時間: {conflict.start_time} から {conflict.end_time}
+          GPU数: {conflict.gpu_count}"""
+            for conflict in conflicts
+        )
+        return f"""
+        新規のGPUサーバー予約が、以下の既存予約とGPU数の上限を超えて競合しています。
+        既存予約それぞれについて、新規予約を優先すべきか判断してください。
+        
+        新規予約:
+        - 目的: {new_reservation.purpose}
+        - 優先度スコア: {new_reservation.priority_score}
+        - 利用時間: {new_reservation.start_time} から {new_reservation.end_time}
+        - GPU数: {new_reservation.gpu_count}
+        
+        既存予約:
+{existing}
+
+        既存予約ごとに1件ずつ、以下のJSON形式で返してください：
+        {{
+            "decisions": [
+                {{"id": 既存予約のid, "recommend_new": true/false, "reason": "判断理由"}}
+            ]
+        }}
+        """
+    
+    def _batch_judge_result(self, conflicts: Sequence[Any], text: str) -> Dict[int, Dict[str, Any]]:
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        if not json_match:
+            return {}
+        try:
+            batch = ConflictDecisionBatch.model_validate_json(json_match.group())
+        except ValidationError:
+            return {}
+        wanted = {conflict.id for conflict in conflicts}
         return {
-            "recommend_new": new_reservation.priority_score > existing_reservation.priority_score,
-            "reason": "優先度スコアに基づいて判断しました"
-        }
\ No newline at end of file
+            decision.id: {"recommend_new": decision.recommend_new, "reason": decision.reason}
+            for decision in batch.decisions
+            if decision.id in wanted
+        }
+    
+    @timed_ai_call("judge_batch")
+    def judge_conflicts(self, new_reservation: Any, conflicts: Sequence[Any]) -> List[Dict[str, Any]]:
+        if len(conflicts) <= 1 or not settings.AI_BATCH_JUDGE:
+            return self._judge_fan_out(new_reservation, conflicts)
+        
+        try:
+            response = self.backend.generate(
+                self._batch_judge_prompt(new_reservation, conflicts)
+            )
+            decisions = self._batch_judge_result(conflicts, response.strip())
+        except LLMBackendError:
+            decisions = {}
+        
+        missing = [conflict for conflict in conflicts if conflict.id not in decisions]
+        if missing:
+            record_ai_fallback()
+        for conflict, decision in zip(missing, self._judge_fan_out(new_reservation, missing)):
+            decisions[conflict.id] = decision
+        return [decisions[conflict.id] for conflict in conflicts]
+    
+    @timed_ai_call("judge_batch")
+    async def ajudge_conflicts(self, new_reservation: Any, conflicts: Sequence[Any]) -> List[Dict[str, Any]]:
+        if len(conflicts) <= 1 or not settings.AI_BATCH_JUDGE:
+            return await self._ajudge_fan_out(new_reservation, conflicts)
+        
+        try:
+            response = await self.backend.agenerate(
+                self._batch_judge_prompt(new_reservation, conflicts)
+            )
+            decisions = self._batch_judge_result(conflicts, response.strip())
+        except LLMBackendError:
+            decisions = {}
+        
+        missing = [conflict for conflict in conflicts if conflict.id not in decisions]
+        if missing:
+            record_ai_fallback()
+        for conflict, decision in zip(missing, await self._ajudge_fan_out(new_reservation, missing)):
+            decisions[conflict.id] = decision
+        return [decisions[conflict.id] for conflict in conflicts]
+    
+    def _judge_fan_out(self, new_reservation: Any, conflicts: Sequence[Any]) -> List[Dict[str, Any]]:
+        if len(conflicts) <= 1:
+            return [self.judge_conflict(new_reservation, conflict) for conflict in conflicts]
+        with ThreadPoolExecutor(max_workers=settings.AI_JUDGE_CONCURRENCY) as executor:
+            return list(executor.map(
+                lambda conflict: self.judge_conflict(new_reservation, conflict), conflicts
+            ))
+    
+    async def _ajudge_fan_out(self, new_reservation: Any, conflicts: Sequence[Any]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(settings.AI_JUDGE_CONCURRENCY)
+        
+        async def judge(conflict: Any) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.ajudge_conflict(new_reservation, conflict)
+        
+        return list(await asyncio.gather(*(judge(conflict) for conflict in conflicts)))
\ No newline at end of file
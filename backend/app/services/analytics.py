@@ -0,0 +1,444 @@
+import logging
+import queue
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import models
+from app.models.database import SessionLocal
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+DIMENSIONS = ("server", "user", "purpose")
+COUNTERS = ("gpu_hours", "reservations", "confirmed", "rejected", "cancelled", "contended", "priority_sum")
+
+# Purposes are free text; rolling them up needs a bounded set of keys.
+_PURPOSE_CATEGORIES = [
+    ("training", re.compile(r"学習|訓練|ファインチューニング|train|fine.?tun", re.IGNORECASE)),
+    ("inference", re.compile(r"推論|評価|inference|serving|eval", re.IGNORECASE)),
+    ("experiment", re.compile(r"実験|検証|研究|experiment|research", re.IGNORECASE)),
+    ("development", re.compile(r"開発|デバッグ|テスト|debug|test|dev", re.IGNORECASE)),
+]
+
+def purpose_category(purpose: Optional[str]) -> str:
+    for category, pattern in _PURPOSE_CATEGORIES:
+        if purpose and pattern.search(purpose):
+            return category
+    return "other"
+
+class _Snapshot(NamedTuple):
+    status: str
+    server_id: int
+    user_id: int
+    purpose_category: str
+    start_time: datetime
+    end_time: datetime
+    gpu_count: int
+    priority_score: int
+    contended: bool
+
+RollupKey = Tuple[str, str, datetime, str]
+
+def _snapshot(reservation: models.Reservation, contended: bool) -> _Snapshot:
+    return _Snapshot(
+        reservation.status.value,
+        reservation.server_id,
+        reservation.user_id,
+        purpose_category(reservation.purpose),
+        reservation.start_time,
+        reservation.end_time,
+        reservation.gpu_count or 1,
+        reservation.priority_score if reservation.priority_score is not None else 50,
+        contended
+    )
+
+def _entry_snapshot(entry: models.ReservationRollupEntry) -> _Snapshot:
+    return _Snapshot(
+        entry.status,
+        entry.server_id,
+        entry.user_id,
+        entry.purpose_category,
+        entry.start_time,
+        entry.end_time,
+        entry.gpu_count,
+        entry.priority_score,
+        entry.contended
+    )
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _step(granularity: str) -> timedelta:
+    return timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+
+def _overlaps(start_time: datetime, end_time: datetime, granularity: str) -> Iterator[Tuple[datetime, float]]:
+    """Yield (bucket, hours of [start_time, end_time) inside it)."""
+    step = _step(granularity)
+    bucket = bucket_start(start_time, granularity)
+    while bucket < end_time:
+        hours = (min(end_time, bucket + step) - max(start_time, bucket)).total_seconds() / 3600
+        if hours > 0:
+            yield bucket, hours
+        bucket += step
+
+def _contributions(snapshot: _Snapshot) -> Dict[RollupKey, Dict[str, float]]:
+    """What one reservation adds to every rollup row it touches.
+    
+    Counts and priority go to the bucket the reservation starts in; booked
+    GPU-hours (confirmed only) are spread over every bucket it spans.
+    """
+    keys = {
+        "server": str(snapshot.server_id),
+        "user": str(snapshot.user_id),
+        "purpose": snapshot.purpose_category
+    }
+    counts = {
+        "reservations": 1,
+        "confirmed": int(snapshot.status == models.ReservationStatus.CONFIRMED.value),
+        "rejected": int(snapshot.status == models.ReservationStatus.REJECTED.value),
+        "cancelled": int(snapshot.status == models.ReservationStatus.CANCELLED.value),
+        "contended": int(snapshot.contended),
+        "priority_sum": snapshot.priority_score
+    }
+    result: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for granularity in GRANULARITIES:
+        first = bucket_start(snapshot.start_time, granularity)
+        for dimension, key in keys.items():
+            row = result[(granularity, dimension, first, key)]
+            for column, value in counts.items():
+                row[column] += value
+        if snapshot.status != models.ReservationStatus.CONFIRMED.value:
+            continue
+        for bucket, hours in _overlaps(snapshot.start_time, snapshot.end_time, granularity):
+            for dimension, key in keys.items():
+                result[(granularity, dimension, bucket, key)]["gpu_hours"] += hours * snapshot.gpu_count
+    return result
+
+def _delta(old: Optional[_Snapshot], new: Optional[_Snapshot]) -> Dict[RollupKey, Dict[str, float]]:
+    deltas: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for snapshot, sign in ((old, -1), (new, 1)):
+        if snapshot is None:
+            continue
+        for key, row in _contributions(snapshot).items():
+            for column, value in row.items():
+                deltas[key][column] += sign * value
+    return {
+        key: {column: value for column, value in row.items() if abs(value) > 1e-9}
+        for key, row in deltas.items()
+        if any(abs(value) > 1e-9 for value in row.values())
+    }
+
+def _contended_ids(db: Session, reservation_ids: Optional[Iterable[int]] = None) -> Set[int]:
+    conflict = models.ReservationConflict
+    query = select(conflict.reservation_id, conflict.conflicting_reservation_id)
+    if reservation_ids is not None:
+        ids = list(reservation_ids)
+        query = query.where(or_(
+            conflict.reservation_id.in_(ids),
+            conflict.conflicting_reservation_id.in_(ids)
+        ))
+    contended: Set[int] = set()
+    for reservation_id, conflicting_id in db.execute(query):
+        contended.add(reservation_id)
+        contended.add(conflicting_id)
+    return contended
+
+def _increment(db: Session, key: RollupKey, row: Dict[str, float]):
+    rollup = models.UtilizationRollup
+    granularity, dimension, bucket, rollup_key = key
+    # Atomic increments, so concurrent workers never lose each other's updates.
+    result = db.execute(
+        update(rollup)
+        .where(
+            rollup.granularity == granularity,
+            rollup.dimension == dimension,
+            rollup.bucket_start == bucket,
+            rollup.key == rollup_key
+        )
+        .values({column: getattr(rollup, column) + value for column, value in row.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        values = {column: 0 for column in COUNTERS}
+        values.update(row)
+        db.execute(insert(rollup).values(
+            granularity=granularity, dimension=dimension, bucket_start=bucket, key=rollup_key, **values
+        ))
+
+def _lock_rollups(db: Session):
+    # Row lock held until commit; serializes rebuilds and incremental
+    # updates across processes. Must be the first write of the transaction.
+    state = models.RollupState
+    lock = update(state).where(state.id == 1).values(version=state.version + 1)
+    if db.execute(lock).rowcount == 1:
+        return
+    try:
+        db.execute(insert(state).values(id=1, version=1))
+    except IntegrityError:
+        # Another process created the row first; wait for its lock instead.
+        db.rollback()
+        db.execute(lock)
+
+class _LedgerConflict(Exception):
+    pass
+
+class RollupUpdater:
+    """Keeps utilization_rollups in step with reservation changes.
+    
+    ReservationService.notify_changed enqueues ids; a worker thread reloads
+    those reservations, diffs them against the snapshot recorded in
+    reservation_rollup_entries when they were last counted, and applies
+    only the difference. The ledger row is updated under its revision in
+    the same transaction, so several workers never count a change twice,
+    and every write holds the rollup_state row lock, so a rebuild in one
+    process never interleaves with updates (or another rebuild) elsewhere.
+    """
+    
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.applied = 0
+        self.retries = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rollup-updater", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+    
+    def enqueue(self, reservation_ids: Iterable[int]):
+        for reservation_id in reservation_ids:
+            self._queue.put(reservation_id)
+    
+    def _run(self):
+        while True:
+            reservation_id = self._queue.get()
+            if reservation_id is None:
+                return
+            batch = {reservation_id}
+            while len(batch) < self.batch_size:
+                try:
+                    reservation_id = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if reservation_id is None:
+                    self._apply_safely(batch)
+                    return
+                batch.add(reservation_id)
+            self._apply_safely(batch)
+    
+    def _apply_safely(self, reservation_ids: Set[int]):
+        db = SessionLocal()
+        try:
+            self.apply(db, reservation_ids)
+        except Exception:
+            logger.exception("Failed to update utilization rollups for %s", sorted(reservation_ids))
+        finally:
+            db.close()
+    
+    def apply(self, db: Session, reservation_ids: Iterable[int], attempts: int = 3):
+        reservation_ids = set(reservation_ids)
+        for attempt in range(attempts):
+            try:
+                self._apply(db, reservation_ids)
+                return
+            except (IntegrityError, _LedgerConflict):
+                db.rollback()
+                self.retries += 1
+                if attempt == attempts - 1:
+                    raise
+    
+    def _apply(self, db: Session, reservation_ids: Set[int]):
+        if not reservation_ids:
+            return
+        _lock_rollups(db)
+        reservations = db.query(models.Reservation).filter(
+            models.Reservation.id.in_(reservation_ids)
+        ).all()
+        entries = {
+            entry.reservation_id: entry
+            for entry in db.query(models.ReservationRollupEntry).filter(
+                models.ReservationRollupEntry.reservation_id.in_(reservation_ids)
+            )
+        }
+        contended = _contended_ids(db, reservation_ids)
+        ledger = models.ReservationRollupEntry
+        for reservation in reservations:
+            new = _snapshot(reservation, reservation.id in contended)
+            entry = entries.get(reservation.id)
+            old = _entry_snapshot(entry) if entry is not None else None
+            if old == new:
+                continue
+            if entry is None:
+                db.execute(insert(ledger).values(
+                    reservation_id=reservation.id, revision=1, **new._asdict()
+                ))
+            else:
+                result = db.execute(
+                    update(ledger)
+                    .where(ledger.reservation_id == reservation.id, ledger.revision == entry.revision)
+                    .values(revision=entry.revision + 1, **new._asdict())
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    raise _LedgerConflict(reservation.id)
+            for key, row in _delta(old, new).items():
+                _increment(db, key, row)
+            self.applied += 1
+        db.commit()
+        db.expire_all()
+    
+    def rebuild(self, db: Session, only_if_needed: bool = False) -> Optional[int]:
+        """Recompute every rollup from the reservations table.
+        
+        With ``only_if_needed`` the check is repeated under the lock and
+        None is returned when another process has already rebuilt, so
+        workers starting together rebuild once.
+        """
+        _lock_rollups(db)
+        if only_if_needed and not self.needs_rebuild(db):
+            db.commit()
+            return None
+        totals: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        entries = []
+        contended = _contended_ids(db)
+        for reservation in db.query(models.Reservation).yield_per(1000):
+            snapshot = _snapshot(reservation, reservation.id in contended)
+            entries.append({"reservation_id": reservation.id, "revision": 1, **snapshot._asdict()})
+            for key, row in _contributions(snapshot).items():
+                for column, value in row.items():
+                    totals[key][column] += value
+        db.query(models.UtilizationRollup).delete()
+        db.query(models.ReservationRollupEntry).delete()
+        if entries:
+            db.execute(insert(models.ReservationRollupEntry), entries)
+        if totals:
+            db.execute(insert(models.UtilizationRollup), [
+                {
+                    "granularity": granularity,
+                    "dimension": dimension,
+                    "bucket_start": bucket,
+                    "key": key,
+                    **{column: row.get(column, 0) for column in COUNTERS}
+                }
+                for (granularity, dimension, bucket, key), row in totals.items()
+            ])
+        db.query(models.RollupState).filter(models.RollupState.id == 1).update(
+            {"rebuilt_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+        return len(entries)
+    
+    def needs_rebuild(self, db: Session) -> bool:
+        counted = db.query(func.count(models.ReservationRollupEntry.reservation_id)).scalar()
+        return counted != db.query(func.count(models.Reservation.id)).scalar()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "applied": self.applied,
+            "retries": self.retries
+        }
+
+def _labels(db: Session, dimension: str, keys: Set[str]) -> Dict[str, str]:
+    ids = [int(key) for key in keys if key.isdigit()]
+    if dimension == "server" and ids:
+        rows = db.query(models.GPUServer.id, models.GPUServer.name).filter(models.GPUServer.id.in_(ids))
+    elif dimension == "user" and ids:
+        rows = db.query(models.User.id, models.User.username).filter(models.User.id.in_(ids))
+    else:
+        return {key: key for key in keys}
+    return {str(row_id): name for row_id, name in rows}
+
+def _derived(row: Dict, capacity: Optional[int], hours: float) -> Dict:
+    reservations = row["reservations"]
+    row["average_priority"] = row.pop("priority_sum") / reservations if reservations else None
+    row["rejection_rate"] = row["rejected"] / reservations if reservations else None
+    row["utilization"] = row["gpu_hours"] / (capacity * hours) if capacity and hours else None
+    return row
+
+def _capacities(db: Session, dimension: str) -> Dict[str, int]:
+    if dimension != "server":
+        return {}
+    return {
+        str(server_id): gpu_count or 1
+        for server_id, gpu_count in db.query(models.GPUServer.id, models.GPUServer.gpu_count)
+    }
+
+def query_rollups(
+    db: Session,
+    granularity: str,
+    dimension: str,
+    start: datetime,
+    end: datetime,
+    key: Optional[str] = None
+) -> List[Dict]:
+    rollup = models.UtilizationRollup
+    query = db.query(rollup).filter(
+        rollup.granularity == granularity,
+        rollup.dimension == dimension,
+        rollup.bucket_start >= bucket_start(start, granularity),
+        rollup.bucket_start < end
+    )
+    if key is not None:
+        query = query.filter(rollup.key == key)
+    rows = query.order_by(rollup.bucket_start, rollup.key).all()
+    labels = _labels(db, dimension, {row.key for row in rows})
+    capacities = _capacities(db, dimension)
+    hours = _step(granularity).total_seconds() / 3600
+    return [
+        _derived({
+            "bucket_start": row.bucket_start,
+            "key": row.key,
+            "label": labels.get(row.key, row.key),
+            **{column: getattr(row, column) for column in COUNTERS}
+        }, capacities.get(row.key), hours)
+        for row in rows
+    ]
+
+def summarize(db: Session, dimension: str, start: datetime, end: datetime) -> List[Dict]:
+    """Per-key totals over [start, end), from the daily rollups."""
+    rollup = models.UtilizationRollup
+    rows = db.query(
+        rollup.key, *(func.sum(getattr(rollup, column)) for column in COUNTERS)
+    ).filter(
+        rollup.granularity == "day",
+        rollup.dimension == dimension,
+        rollup.bucket_start >= bucket_start(start, "day"),
+        rollup.bucket_start < end
+    ).group_by(rollup.key).all()
+    labels = _labels(db, dimension, {row[0] for row in rows})
+    capacities = _capacities(db, dimension)
+    days = (bucket_start(end - timedelta(microseconds=1), "day") - bucket_start(start, "day")).days + 1
+    return sorted(
+        (
+            _derived({
+                "key": row[0],
+                "label": labels.get(row[0], row[0]),
+                **{column: value or 0 for column, value in zip(COUNTERS, row[1:])}
+            }, capacities.get(row[0]), days * 24)
+            for row in rows
+        ),
+        key=lambda row: -row["gpu_hours"]
+    )
+
+rollup_updater = RollupUpdater(settings.ANALYTICS_BATCH_SIZE)
\ No newline at end of file
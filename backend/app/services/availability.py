@@ -0,0 +1,220 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import models
+from app.services.events import event_bus
+from app.services.interval_index import Entry, event_change, load_active, reservation_change
+from app.utils.config import settings
+
+class AvailabilityIndex:
+    """Per-server slot occupancy held in a single NumPy matrix.
+    
+    Row ``r`` sums the GPUs requested by the CONFIRMED/PENDING reservations
+    covering each slot of one server; a slot is free for a request of ``g``
+    GPUs when that sum plus ``g`` fits the server's capacity. The grid starts at
+    midnight of the current day and spans ``horizon_days``; it is rebuilt
+    from the tracked reservations when the day rolls over, dropping those
+    that ended before it. A reservation occupies every slot it touches, so
+    partial slots count as busy. Windows outside the grid are not answered
+    (see ``horizon``). Like ReservationIndex, the grid follows other workers
+    through on_event() and is rebuilt every AVAILABILITY_INDEX_REFRESH_SECONDS,
+    keeping version tombstones for removed reservations the same way.
+    """
+    
+    def __init__(self, slot_minutes: int, horizon_days: int):
+        self.slot = timedelta(minutes=slot_minutes)
+        self.n_slots = int(timedelta(days=horizon_days) / self.slot)
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Entry] = {}
+        self._versions: Dict[int, int] = {}
+        self._tombstones: Dict[int, int] = {}
+        self._recording: Optional[Dict[int, Tuple[int, Optional[Entry]]]] = None
+        self._rebuild_lock = threading.Lock()
+        self._rows: Dict[int, int] = {}
+        self._counts = np.zeros((0, self.n_slots), dtype=np.int32)
+        self.origin: Optional[datetime] = None
+        self.ready = False
+    
+    def _today(self) -> datetime:
+        return datetime.combine(datetime.now().date(), datetime.min.time())
+    
+    def horizon(self) -> Tuple[datetime, datetime]:
+        """The span the grid covers; queries must fall inside it."""
+        today = self._today()
+        return today, today + self.n_slots * self.slot
+    
+    def _outer_range(self, start_time: datetime, end_time: datetime) -> Tuple[int, int]:
+        lo = (start_time - self.origin) // self.slot
+        hi = -((self.origin - end_time) // self.slot)
+        return max(lo, 0), min(hi, self.n_slots)
+    
+    def _inner_range(self, start_time: datetime, end_time: datetime) -> Tuple[int, int]:
+        lo = -((self.origin - start_time) // self.slot)
+        hi = (end_time - self.origin) // self.slot
+        return max(lo, 0), min(hi, self.n_slots)
+    
+    def _row(self, server_id: int) -> int:
+        row = self._rows.get(server_id)
+        if row is None:
+            row = len(self._rows)
+            self._rows[server_id] = row
+            self._counts = np.vstack([self._counts, np.zeros((1, self.n_slots), dtype=np.int32)])
+        return row
+    
+    def _apply(self, entry: Entry, delta: int):
+        server_id, start_time, end_time, gpu_count = entry
+        lo, hi = self._outer_range(start_time, end_time)
+        if lo < hi:
+            row = self._row(server_id)
+            self._counts[row, lo:hi] += delta * gpu_count
+    
+    def _reset(self, origin: datetime):
+        self.origin = origin
+        ended = [reservation_id for reservation_id, entry in self._entries.items() if entry[2] <= origin]
+        for reservation_id in ended:
+            del self._entries[reservation_id]
+            self._versions.pop(reservation_id, None)
+        self._rows = {}
+        self._counts = np.zeros((0, self.n_slots), dtype=np.int32)
+        for entry in self._entries.values():
+            self._apply(entry, 1)
+    
+    def _roll(self):
+        today = self._today()
+        if self.origin != today:
+            self._reset(today)
+    
+    def rebuild(self, db: Session):
+        with self._rebuild_lock:
+            today = self._today()
+            with self._lock:
+                self._recording = {}
+            try:
+                loaded = load_active(db, today)
+            except Exception:
+                with self._lock:
+                    self._recording = None
+                raise
+            with self._lock:
+                recording, self._recording = self._recording, None
+                for reservation_id, (version, entry) in recording.items():
+                    current = loaded.get(reservation_id)
+                    if current is not None and current[1] > version:
+                        continue
+                    if entry is None or entry[2] <= today:
+                        loaded.pop(reservation_id, None)
+                        self._tombstones[reservation_id] = version
+                    else:
+                        loaded[reservation_id] = (entry, version)
+                self._entries = {reservation_id: entry for reservation_id, (entry, _) in loaded.items()}
+                self._versions = {reservation_id: version for reservation_id, (_, version) in loaded.items()}
+                for reservation_id, version in self._tombstones.items():
+                    if reservation_id not in loaded:
+                        self._versions[reservation_id] = version
+                self._tombstones = {}
+                self._reset(today)
+                self.ready = True
+    
+    def apply(self, reservation_id: int, version: int, entry: Optional[Entry]):
+        with self._lock:
+            if self._recording is not None:
+                self._recording[reservation_id] = (version, entry)
+            if not self.ready or self._versions.get(reservation_id, 0) > version:
+                return
+            previous = self._entries.pop(reservation_id, None)
+            if previous:
+                self._apply(previous, -1)
+            self._versions[reservation_id] = version
+            if entry is not None and entry[2] > self.origin:
+                self._tombstones.pop(reservation_id, None)
+                self._entries[reservation_id] = entry
+                self._apply(entry, 1)
+            else:
+                self._tombstones[reservation_id] = version
+    
+    def sync(self, reservation: models.Reservation):
+        self.apply(*reservation_change(reservation))
+    
+    def on_event(self, event: Dict):
+        change = event_change(event)
+        if change is not None:
+            self.apply(*change)
+    
+    def _occupied(
+        self,
+        server_ids: Sequence[int],
+        capacities: Sequence[int],
+        gpu_count: int,
+        lo: int,
+        hi: int
+    ) -> np.ndarray:
+        rows = np.array([self._rows.get(server_id, -1) for server_id in server_ids], dtype=np.int64)
+        demand = np.zeros((len(rows), max(hi - lo, 0)), dtype=np.int32)
+        known = rows >= 0
+        if hi > lo and known.any():
+            demand[known] = self._counts[rows[known], lo:hi]
+        return demand + gpu_count > np.array(capacities, dtype=np.int32).reshape(-1, 1)
+    
+    def free_slots(
+        self,
+        server_ids: Sequence[int],
+        capacities: Sequence[int],
+        start_time: datetime,
+        end_time: datetime,
+        gpu_count: int = 1
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        with self._lock:
+            self._roll()
+            lo, hi = self._outer_range(start_time, end_time)
+            occupied = self._occupied(server_ids, capacities, gpu_count, lo, hi)
+            origin = self.origin
+        
+        result = {}
+        for server_id, busy in zip(server_ids, occupied):
+            free = np.concatenate(([0], (~busy).view(np.int8), [0]))
+            edges = np.flatnonzero(np.diff(free)).tolist()
+            result[server_id] = [
+                (
+                    max(origin + (lo + a) * self.slot, start_time),
+                    min(origin + (lo + b) * self.slot, end_time)
+                )
+                for a, b in zip(edges[::2], edges[1::2])
+            ]
+        return result
+    
+    def first_fit(
+        self,
+        server_ids: Sequence[int],
+        capacities: Sequence[int],
+        start_time: datetime,
+        end_time: datetime,
+        duration: timedelta,
+        gpu_count: int = 1
+    ) -> Optional[Tuple[int, datetime]]:
+        """Earliest window of ``duration`` with ``gpu_count`` GPUs free on any of ``server_ids``."""
+        width = -(-duration // self.slot)
+        with self._lock:
+            self._roll()
+            lo, hi = self._inner_range(start_time, end_time)
+            if not server_ids or hi - lo < width:
+                return None
+            free = ~self._occupied(server_ids, capacities, gpu_count, lo, hi)
+            origin = self.origin
+        
+        run = np.zeros((len(server_ids), hi - lo + 1), dtype=np.int32)
+        np.cumsum(free, axis=1, out=run[:, 1:])
+        fits = (run[:, width:] - run[:, :-width]) == width
+        columns = np.flatnonzero(fits.any(axis=0))
+        if not len(columns):
+            return None
+        column = int(columns[0])
+        row = int(np.flatnonzero(fits[:, column])[0])
+        return server_ids[row], origin + (lo + column) * self.slot
+
+availability_index = AvailabilityIndex(
+    slot_minutes=settings.AVAILABILITY_SLOT_MINUTES,
+    horizon_days=settings.AVAILABILITY_HORIZON_DAYS
+)
+event_bus.add_listener(availability_index.on_event)
\ No newline at end of file
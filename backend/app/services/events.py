@@ -0,0 +1,239 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+from app.models import models
+from app.utils.config import settings
+
+Event = Dict[str, Any]
+
+class EventBackend:
+    """Transport between publishers and this process's subscribers."""
+    
+    def start(self, deliver: Callable[[Event], None]):
+        raise NotImplementedError
+    
+    def stop(self):
+        pass
+    
+    def publish(self, event: Event):
+        raise NotImplementedError
+
+class LocalBackend(EventBackend):
+    """Delivers in-process only; enough for a single worker."""
+    
+    def __init__(self):
+        self._deliver: Optional[Callable[[Event], None]] = None
+    
+    def start(self, deliver: Callable[[Event], None]):
+        self._deliver = deliver
+    
+    def stop(self):
+        self._deliver = None
+    
+    def publish(self, event: Event):
+        if self._deliver is not None:
+            self._deliver(event)
+
+class SQLiteBackend(EventBackend):
+    """Shares events between workers on one host through a SQLite file.
+    
+    A stand-in for a real broker: publishers append rows, and every worker
+    polls for rows from other workers every ``poll_interval`` seconds.
+    Events published here are delivered locally right away. Rows older than
+    ``retention`` seconds are pruned.
+    """
+    
+    def __init__(self, path: str, poll_interval: float, retention: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._deliver: Optional[Callable[[Event], None]] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_id = 0
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, "
+                "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+    
+    def start(self, deliver: Callable[[Event], None]):
+        self._deliver = deliver
+        with self._lock:
+            self._last_id = self._connection().execute(
+                "SELECT COALESCE(MAX(id), 0) FROM events"
+            ).fetchone()[0]
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, name="event-bus-poller", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._deliver = None
+    
+    def publish(self, event: Event):
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO events (origin, payload, created_at) VALUES (?, ?, ?)",
+                (self.origin, json.dumps(event, ensure_ascii=False), time.time())
+            )
+        if self._deliver is not None:
+            self._deliver(event)
+    
+    def _poll(self):
+        last_prune = 0.0
+        while not self._stop_event.wait(self.poll_interval):
+            with self._lock:
+                conn = self._connection()
+                rows = conn.execute(
+                    "SELECT id, origin, payload FROM events WHERE id > ? ORDER BY id",
+                    (self._last_id,)
+                ).fetchall()
+                now = time.time()
+                if now - last_prune > self.retention:
+                    conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+                    last_prune = now
+            for event_id, origin, payload in rows:
+                self._last_id = event_id
+                if origin != self.origin and self._deliver is not None:
+                    self._deliver(json.loads(payload))
+
+class Subscription:
+    """One SSE client's queue, fed from any thread via its event loop."""
+    
+    def __init__(self, user_id: Optional[int], maxsize: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+    
+    def offer(self, event: Event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed; the subscriber is going away anyway.
+            pass
+    
+    def _put(self, event: Event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client: drop what it has not read and tell it to refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+    
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+class EventBus:
+    """Routes reservation events to the subscriptions of their owner.
+    
+    Subscriptions with ``user_id=None`` (admins) receive every reservation
+    event. Listeners are in-process callbacks that see every event,
+    whichever worker published it.
+    """
+    
+    def __init__(self, backend: EventBackend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[Optional[int], Set[Subscription]] = {}
+        self._listeners: List[Callable[[Event], None]] = []
+        self.published = 0
+        self.delivered = 0
+    
+    def start(self):
+        self.backend.start(self._dispatch)
+    
+    def stop(self):
+        self.backend.stop()
+    
+    def add_listener(self, listener: Callable[[Event], None]):
+        self._listeners.append(listener)
+    
+    def subscribe(self, user_id: Optional[int]) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+    
+    def publish(self, event: Event):
+        self.published += 1
+        self.backend.publish(event)
+    
+    def publish_reservations(self, *reservations: models.Reservation):
+        for reservation in reservations:
+            self.publish({
+                "type": "reservation",
+                "reservation_id": reservation.id,
+                "user_id": reservation.user_id,
+                "server_id": reservation.server_id,
+                "status": reservation.status.value,
+                "version": reservation.version,
+                "start_time": reservation.start_time.isoformat(),
+                "end_time": reservation.end_time.isoformat(),
+                "gpu_count": reservation.gpu_count,
+                "at": datetime.utcnow().isoformat()
+            })
+    
+    def _dispatch(self, event: Event):
+        for listener in self._listeners:
+            listener(event)
+        if "user_id" not in event:
+            return
+        with self._lock:
+            targets = list(self._subscriptions.get(event.get("user_id"), ()))
+            targets.extend(self._subscriptions.get(None, ()))
+        for subscription in targets:
+            subscription.offer(event)
+        self.delivered += len(targets)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "subscribers": subscribers,
+            "published": self.published,
+            "delivered": self.delivered
+        }
+
+def create_event_backend() -> EventBackend:
+    if settings.EVENTS_BACKEND == "local":
+        return LocalBackend()
+    if settings.EVENTS_BACKEND == "sqlite":
+        return SQLiteBackend(
+            settings.EVENTS_SQLITE_PATH,
+            settings.EVENTS_POLL_INTERVAL_SECONDS,
+            settings.EVENTS_RETENTION_SECONDS
+        )
+    raise ValueError(f"Unknown EVENTS_BACKEND: {settings.EVENTS_BACKEND}")
+
+event_bus = EventBus(create_event_backend(), settings.EVENTS_QUEUE_SIZE)
\ No newline at end of file
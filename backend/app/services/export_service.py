@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from app.models import models
+from app.models.database import engine
+from app.utils.config import settings
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "username",
+    "server_id",
+    "server_name",
+    "purpose",
+    "start_time",
+    "end_time",
+    "gpu_count",
+    "priority_score",
+    "status",
+    "created_at"
+)
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+class ReservationExporter:
+    """Streams reservation history straight from Core rows.
+    
+    Rows are fetched through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE and encoded batch by batch, so memory stays flat no
+    matter how many years are exported.
+    """
+    
+    def __init__(self, bind: Engine = engine):
+        self.bind = bind
+    
+    def _query(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        statuses: Optional[List[models.ReservationStatus]],
+        server_id: Optional[int]
+    ):
+        reservation = models.Reservation.__table__
+        user = models.User.__table__
+        server = models.GPUServer.__table__
+        
+        query = select(
+            reservation.c.id,
+            reservation.c.user_id,
+            user.c.username,
+            reservation.c.server_id,
+            server.c.name.label("server_name"),
+            reservation.c.purpose,
+            reservation.c.start_time,
+            reservation.c.end_time,
+            reservation.c.gpu_count,
+            reservation.c.priority_score,
+            reservation.c.status,
+            reservation.c.created_at
+        ).select_from(
+            reservation.join(user, reservation.c.user_id == user.c.id).join(
+                server, reservation.c.server_id == server.c.id
+            )
+        )
+        
+        if start:
+            query = query.where(reservation.c.end_time > start)
+        if end:
+            query = query.where(reservation.c.start_time < end)
+        if statuses:
+            query = query.where(reservation.c.status.in_(statuses))
+        if server_id is not None:
+            query = query.where(reservation.c.server_id == server_id)
+        
+        return query.order_by(reservation.c.start_time, reservation.c.id)
+    
+    def _batches(self, query) -> Iterator[list]:
+        with self.bind.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True,
+                yield_per=settings.EXPORT_BATCH_SIZE
+            ).execute(query)
+            for batch in result.partitions():
+                yield batch
+    
+    def iter_ndjson(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        statuses: Optional[List[models.ReservationStatus]] = None,
+        server_id: Optional[int] = None
+    ) -> Iterator[str]:
+        for batch in self._batches(self._query(start, end, statuses, server_id)):
+            yield "".join(
+                json.dumps(
+                    {column: _plain(value) for column, value in zip(EXPORT_COLUMNS, row)},
+                    ensure_ascii=False
+                ) + "\n"
+                for row in batch
+            )
+    
+    def iter_csv(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        statuses: Optional[List[models.ReservationStatus]] = None,
+        server_id: Optional[int] = None
+    ) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        
+        for batch in self._batches(self._query(start, end, statuses, server_id)):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_plain(value) for value in row] for row in batch)
+            yield buffer.getvalue()
+
+reservation_exporter = ReservationExporter()
\ No newline at end of file
@@ -0,0 +1,287 @@
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DEFAULT_DURATION = timedelta(hours=2)
+
+WEEKDAYS = "月火水木金土日"
+
+_FULL_DATE = re.compile(r"(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})日?")
+_MONTH_DAY = re.compile(r"(\d{1,2})(?:/|月)(\d{1,2})日?")
+_RELATIVE_DAY = re.compile(r"今日|本日|明後日|あさって|明日|あした")
+_WEEKDAY = re.compile(r"(来週|今週)?の?([月火水木金土日])曜日?")
+
+_TIME = (
+    r"(?:(午前|午後|朝|夜|夕方)\s*)?"
+    r"(\d{1,2})(?::(\d{2})|時(?!間)(?:(\d{1,2})分|(半))?)"
+)
+_TIME_RANGE = re.compile(_TIME + r"\s*(?:-|~|〜|から|より)\s*" + _TIME + r"(?:まで|の間)?")
+_HOUR_RANGE = re.compile(r"(?:(午前|午後|朝|夜|夕方)\s*)?(\d{1,2})\s*(?:-|~|〜)\s*(\d{1,2})時(?!間)(?:まで|の間)?")
+_SINGLE_TIME = re.compile(_TIME + r"(?:から|より)?")
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*時間(半)?(?:程度|ほど|くらい|ぐらい)?|(\d+)\s*分間?(?:程度|ほど|くらい|ぐらい)?")
+
+# Anything date/time-like left over after extraction means the request says
+# more than the rules understand, so it goes to the LLM instead.
+_UNRESOLVED = re.compile(r"[0-9日月週曜時分午朝夜昼夕年間半]")
+_LEADING_PARTICLES = re.compile(r"^(?:で|に|の|を|は|から|まで|より)+")
+_TRAILING_PARTICLES = re.compile(r"(?:で|に|の|を|は|から|まで|用に|用|のため|ために)+$")
+_RECURRENCE = re.compile(r"(毎日|毎週|隔週)")
+_RECURRENCE_SPAN = re.compile(r"[、,]?\s*(\d+)\s*(週間|日間|回)(?:分|続けて)?")
+_GPU_COUNT = re.compile(
+    r"gpu\s*(?:[x×*]|を|が)?\s*(\d+)\s*(?:枚|基|個|つ|台)"
+    r"|gpu\s*[x×*]\s*(\d+)"
+    # A count never continues a model number: "A100 GPU" is not 100 GPUs.
+    r"|(?<![a-z0-9])(\d+)\s*(?:枚|基|個)(?:の)?\s*(?:gpu)?"
+    r"|(?<![a-z0-9])(\d+)\s*gpus?(?![a-z0-9])",
+    re.IGNORECASE
+)
+_SEPARATORS = re.compile(r"[\s、。,.!?！？・]+")
+_WORD = re.compile(r"[a-z][a-z0-9_\-]*|[0-9]+[a-z][a-z0-9_\-]*", re.IGNORECASE)
+
+class FastParser:
+    """Rule-based parser for common Japanese booking phrasing.
+
+    Returns the same dict shape as AIService.parse_reservation_request, or
+    None when the request cannot be resolved with confidence.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def parse(
+        self,
+        natural_language_request: str,
+        server_names: Sequence[str] = (),
+        now: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        result = self._parse(natural_language_request, server_names, now or datetime.now())
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.attempts += 1
+            if result is None:
+                self.miss_seconds += elapsed
+            else:
+                self.hits += 1
+                self.hit_seconds += elapsed
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        misses = self.attempts - self.hits
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "misses": misses,
+            "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+            "avg_hit_ms": self.hit_seconds / self.hits * 1000 if self.hits else 0.0,
+            "avg_miss_ms": self.miss_seconds / misses * 1000 if misses else 0.0
+        }
+
+    def _parse(
+        self,
+        natural_language_request: str,
+        server_names: Sequence[str],
+        now: datetime
+    ) -> Optional[Dict[str, Any]]:
+        text = unicodedata.normalize("NFKC", natural_language_request)
+
+        gpu_count, text = take_gpu_count(text)
+        if gpu_count == 0:
+            return None
+        day, text = self._take_date(text, now.date())
+
+        start_clock = end_clock = None
+        hour_range = _HOUR_RANGE.search(text)
+        match = _TIME_RANGE.search(text)
+        if hour_range and not match:
+            period, start_hour, end_hour = hour_range.groups()
+            start_clock = self._clock(period, start_hour, None, None, None)
+            end_clock = self._clock(period, end_hour, None, None, None)
+            if start_clock is None or end_clock is None:
+                return None
+            text = self._cut(text, hour_range)
+        elif match:
+            start_clock = self._clock(*match.groups()[:5])
+            end_clock = self._clock(*match.groups()[5:])
+            if start_clock is None or end_clock is None:
+                return None
+            text = self._cut(text, match)
+        else:
+            match = _SINGLE_TIME.search(text)
+            if not match:
+                return None
+            start_clock = self._clock(*match.groups())
+            if start_clock is None:
+                return None
+            text = self._cut(text, match)
+
+        duration = DEFAULT_DURATION
+        match = _DURATION.search(text)
+        if match:
+            if end_clock is not None:
+                return None
+            hours, half, minutes = match.groups()
+            if hours is not None:
+                duration = timedelta(hours=float(hours) + (0.5 if half else 0))
+            else:
+                duration = timedelta(minutes=int(minutes))
+            if duration <= timedelta(0):
+                return None
+            text = self._cut(text, match)
+
+        server_preference, text = self._take_server(text, server_names)
+
+        purpose = self._purpose(text)
+        if _UNRESOLVED.search(purpose):
+            return None
+
+        if day is None:
+            day = now.date()
+            if datetime.combine(day, start_clock) <= now:
+                day += timedelta(days=1)
+        start_time = datetime.combine(day, start_clock)
+
+        if end_clock is not None:
+            end_time = datetime.combine(day, end_clock)
+            if end_time <= start_time:
+                end_time += timedelta(days=1)
+        else:
+            end_time = start_time + duration
+
+        return {
+            "purpose": purpose or natural_language_request,
+            "start_time": start_time,
+            "end_time": end_time,
+            "server_preference": server_preference,
+            "gpu_count": gpu_count or 1
+        }
+
+    def _cut(self, text: str, match: "re.Match") -> str:
+        return text[:match.start()] + " " + text[match.end():]
+
+    def _take_date(self, text: str, today: date):
+        match = _FULL_DATE.search(text)
+        if match:
+            try:
+                day = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            except ValueError:
+                return None, text
+            return day, self._cut(text, match)
+
+        match = _MONTH_DAY.search(text)
+        if match:
+            try:
+                day = date(today.year, int(match.group(1)), int(match.group(2)))
+            except ValueError:
+                return None, text
+            if day < today:
+                try:
+                    day = day.replace(year=today.year + 1)
+                except ValueError:
+                    return None, text
+            return day, self._cut(text, match)
+
+        match = _RELATIVE_DAY.search(text)
+        if match:
+            word = match.group()
+            offset = {"今日": 0, "本日": 0, "明日": 1, "あした": 1, "明後日": 2, "あさって": 2}[word]
+            return today + timedelta(days=offset), self._cut(text, match)
+
+        match = _WEEKDAY.search(text)
+        if match:
+            week, weekday = match.groups()
+            target = WEEKDAYS.index(weekday)
+            monday = today - timedelta(days=today.weekday())
+            if week == "来週":
+                day = monday + timedelta(days=7 + target)
+            elif week == "今週":
+                day = monday + timedelta(days=target)
+                if day < today:
+                    return None, text
+            else:
+                day = today + timedelta(days=(target - today.weekday()) % 7)
+            return day, self._cut(text, match)
+
+        return None, text
+
+    def _clock(self, period, hour, minute, minute_ja, half):
+        hour = int(hour)
+        minute = int(minute or minute_ja or 0) + (30 if half else 0)
+        if period in ("午後", "夜", "夕方") and hour < 12:
+            hour += 12
+        elif period == "午前" and hour == 12:
+            hour = 0
+        if hour == 24 and minute == 0:
+            return None
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            return None
+        return datetime.min.replace(hour=hour, minute=minute).time()
+
+    def _take_server(self, text: str, server_names: Sequence[str]):
+        names = [name.lower() for name in server_names]
+        lowered = text.lower()
+        for name in sorted(names, key=len, reverse=True):
+            i = lowered.find(name) if name else -1
+            if i >= 0:
+                return text[i:i + len(name)], text[:i] + " " + text[i + len(name):]
+        for match in _WORD.finditer(text):
+            word = match.group()
+            if any(word.lower() in name for name in names):
+                return word, self._cut(text, match)
+        return None, text
+
+    def _purpose(self, text: str) -> str:
+        fragments = []
+        for fragment in _SEPARATORS.split(text):
+            fragment = _LEADING_PARTICLES.sub("", fragment)
+            fragment = _TRAILING_PARTICLES.sub("", fragment)
+            if fragment:
+                fragments.append(fragment)
+        return " ".join(fragments)
+
+def take_gpu_count(text: str) -> Tuple[Optional[int], str]:
+    """Strip a GPU count such as "GPU 4枚" or "8GPU" from ``text``.
+
+    Returns (count, remaining text); count is None when none is given.
+    """
+    match = _GPU_COUNT.search(text)
+    if not match:
+        return None, text
+    count = int(next(group for group in match.groups() if group is not None))
+    return count, text[:match.start()] + " " + text[match.end():]
+
+def split_recurrence(text: str) -> Tuple[str, Optional[str], int, Optional[int]]:
+    """Strip a recurrence phrase such as "毎週 ... 4週間" from a request.
+
+    Returns (remaining text, frequency, interval, occurrences); frequency is
+    None when the text does not describe a series.
+    """
+    normalized = unicodedata.normalize("NFKC", text)
+    match = _RECURRENCE.search(normalized)
+    if not match:
+        return text, None, 1, None
+    frequency = "daily" if match.group(1) == "毎日" else "weekly"
+    interval = 2 if match.group(1) == "隔週" else 1
+    normalized = normalized[:match.start()] + normalized[match.end():]
+
+    occurrences = None
+    span = _RECURRENCE_SPAN.search(normalized)
+    if span:
+        amount, unit = int(span.group(1)), span.group(2)
+        if unit == "回":
+            occurrences = amount
+        elif unit == "週間":
+            occurrences = amount * 7 if frequency == "daily" else -(-amount // interval)
+        else:
+            occurrences = amount if frequency == "daily" else -(-amount // (7 * interval))
+        normalized = normalized[:span.start()] + " " + normalized[span.end():]
+    return normalized.strip(), frequency, interval, occurrences
+
+fast_parser = FastParser()
\ No newline at end of file
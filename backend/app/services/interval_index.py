@@ -0,0 +1,306 @@
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from sqlalchemy.orm import Session
+from app.models import models
+from app.services.events import event_bus
+
+ACTIVE_STATUSES = (
+    models.ReservationStatus.CONFIRMED,
+    models.ReservationStatus.PENDING,
+)
+
+Demand = Tuple[int, datetime, datetime, int]
+
+def _sweep(
+    intervals: Sequence[Demand],
+    start_time: datetime,
+    end_time: datetime
+) -> Iterator[Tuple[Dict[int, int], int]]:
+    """Yield the active intervals and their summed GPU demand per stretch.
+    
+    ``intervals`` are (reservation_id, start, end, gpu_count); each stretch
+    of [start_time, end_time) between interval edges is yielded once.
+    """
+    events = []
+    for reservation_id, entry_start, entry_end, gpu_count in intervals:
+        entry_start, entry_end = max(entry_start, start_time), min(entry_end, end_time)
+        if entry_start < entry_end:
+            events.append((entry_start, 1, reservation_id, gpu_count))
+            events.append((entry_end, 0, reservation_id, gpu_count))
+    # Ends sort before starts at the same instant: back-to-back bookings do not overlap.
+    events.sort()
+    
+    active: Dict[int, int] = {}
+    load = 0
+    for i, (at, is_start, reservation_id, gpu_count) in enumerate(events):
+        if is_start:
+            active[reservation_id] = gpu_count
+            load += gpu_count
+        else:
+            del active[reservation_id]
+            load -= gpu_count
+        if i + 1 < len(events) and events[i + 1][0] == at:
+            continue
+        yield active, load
+
+def peak_demand(intervals: Sequence[Demand], start_time: datetime, end_time: datetime) -> int:
+    return max((load for _, load in _sweep(intervals, start_time, end_time)), default=0)
+
+def capacity_conflicts(
+    intervals: Sequence[Demand],
+    start_time: datetime,
+    end_time: datetime,
+    gpu_count: int,
+    capacity: int
+) -> Set[int]:
+    """Ids of intervals running at some instant where adding ``gpu_count``
+    GPUs would exceed ``capacity``."""
+    conflicts: Set[int] = set()
+    for active, load in _sweep(intervals, start_time, end_time):
+        if load + gpu_count > capacity:
+            conflicts.update(active)
+    return conflicts
+
+class ServerTimeline:
+    """Sorted array of (start, reservation_id, end) for one GPU server.
+    
+    Overlap lookups bisect on start time. Because entries are not ordered by
+    end time, the search window is widened by the longest interval ever seen
+    on this server, which keeps lookups at O(log n + k).
+    """
+    
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.entries: List[Tuple[datetime, int, datetime]] = []
+        self.max_duration = timedelta(0)
+    
+    def add(self, reservation_id: int, start_time: datetime, end_time: datetime):
+        entry = (start_time, reservation_id, end_time)
+        i = bisect_left(self.entries, entry)
+        self.entries.insert(i, entry)
+        self.starts.insert(i, start_time)
+        if end_time - start_time > self.max_duration:
+            self.max_duration = end_time - start_time
+    
+    def remove(self, reservation_id: int, start_time: datetime, end_time: datetime):
+        entry = (start_time, reservation_id, end_time)
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+            del self.starts[i]
+    
+    def overlapping(self, start_time: datetime, end_time: datetime) -> List[int]:
+        lo = bisect_left(self.starts, start_time - self.max_duration)
+        hi = bisect_left(self.starts, end_time)
+        return [
+            reservation_id
+            for _, reservation_id, entry_end in self.entries[lo:hi]
+            if entry_end > start_time
+        ]
+
+Entry = Tuple[int, datetime, datetime, int]
+
+def load_active(db: Session, since: Optional[datetime] = None) -> Dict[int, Tuple[Entry, int]]:
+    """CONFIRMED/PENDING reservations still running after ``since``, as
+    {id: ((server_id, start, end, gpu_count), version)}."""
+    query = db.query(
+        models.Reservation.id,
+        models.Reservation.server_id,
+        models.Reservation.start_time,
+        models.Reservation.end_time,
+        models.Reservation.gpu_count,
+        models.Reservation.version
+    ).filter(
+        models.Reservation.status.in_(ACTIVE_STATUSES)
+    )
+    if since is not None:
+        query = query.filter(models.Reservation.end_time > since)
+    return {
+        row.id: ((row.server_id, row.start_time, row.end_time, row.gpu_count), row.version)
+        for row in query
+    }
+
+def reservation_change(reservation: models.Reservation) -> Tuple[int, int, Optional[Entry]]:
+    """(id, version, entry) for a reservation; entry is None unless it is active."""
+    entry = None
+    if reservation.status in ACTIVE_STATUSES:
+        entry = (reservation.server_id, reservation.start_time, reservation.end_time, reservation.gpu_count)
+    return reservation.id, reservation.version, entry
+
+def event_change(event: Dict) -> Optional[Tuple[int, int, Optional[Entry]]]:
+    """The same triple from an event_bus reservation event, or None for other events."""
+    if event.get("type") != "reservation" or "start_time" not in event:
+        return None
+    entry = None
+    if models.ReservationStatus(event["status"]) in ACTIVE_STATUSES:
+        entry = (
+            event["server_id"],
+            datetime.fromisoformat(event["start_time"]),
+            datetime.fromisoformat(event["end_time"]),
+            event["gpu_count"]
+        )
+    return event["reservation_id"], event["version"], entry
+
+class ReservationIndex:
+    """In-memory per-server index of CONFIRMED/PENDING reservations and their GPU demand.
+    
+    The index is per process; the database stays the source of truth and
+    ``check_consistency`` can be used to diff (and repair) the two. Changes
+    made by other workers arrive through on_event() when the event bus is
+    shared, and rebuild() runs every RESERVATION_INDEX_REFRESH_SECONDS as a
+    backstop. Each rebuild drops reservations that ended before it started
+    (``since``); windows starting earlier than that are not covered and
+    fall back to SQL. Removed reservations keep their version as a
+    tombstone so a late, older event cannot bring them back; tombstones
+    live until the rebuild after the one following their removal.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._timelines: Dict[int, ServerTimeline] = {}
+        self._entries: Dict[int, Entry] = {}
+        # Versions of indexed reservations and of tombstones.
+        self._versions: Dict[int, int] = {}
+        # Removals since the last rebuild, carried over by the next one.
+        self._tombstones: Dict[int, int] = {}
+        # Changes seen while a rebuild is reading the database, replayed over its result.
+        self._recording: Optional[Dict[int, Tuple[int, Optional[Entry]]]] = None
+        self.since: Optional[datetime] = None
+        self.ready = False
+    
+    def covers(self, start_time: datetime) -> bool:
+        return self.ready and (self.since is None or start_time >= self.since)
+    
+    def _replace(self, loaded: Dict[int, Tuple[Entry, int]], since: Optional[datetime]):
+        with self._lock:
+            recording, self._recording = self._recording or {}, None
+            for reservation_id, (version, entry) in recording.items():
+                current = loaded.get(reservation_id)
+                if current is not None and current[1] > version:
+                    continue
+                if entry is None or (since is not None and entry[2] <= since):
+                    loaded.pop(reservation_id, None)
+                else:
+                    loaded[reservation_id] = (entry, version)
+            timelines: Dict[int, ServerTimeline] = {}
+            for reservation_id, ((server_id, start_time, end_time, _), _) in loaded.items():
+                timelines.setdefault(server_id, ServerTimeline()).add(
+                    reservation_id, start_time, end_time
+                )
+            self._timelines = timelines
+            self._entries = {reservation_id: entry for reservation_id, (entry, _) in loaded.items()}
+            self._versions = {reservation_id: version for reservation_id, (_, version) in loaded.items()}
+            for reservation_id, version in self._tombstones.items():
+                if reservation_id not in loaded:
+                    self._versions[reservation_id] = version
+            self._tombstones = {}
+            self.since = since
+            self.ready = True
+    
+    def rebuild(self, db: Session):
+        with self._rebuild_lock:
+            since = datetime.now()
+            with self._lock:
+                self._recording = {}
+            try:
+                loaded = load_active(db, since)
+            except Exception:
+                with self._lock:
+                    self._recording = None
+                raise
+            self._replace(loaded, since)
+    
+    def _discard(self, reservation_id: int):
+        location = self._entries.pop(reservation_id, None)
+        if location:
+            server_id, start_time, end_time, _ = location
+            self._timelines[server_id].remove(reservation_id, start_time, end_time)
+    
+    def apply(self, reservation_id: int, version: int, entry: Optional[Entry]):
+        with self._lock:
+            if self._recording is not None:
+                self._recording[reservation_id] = (version, entry)
+            if self._versions.get(reservation_id, 0) > version:
+                # An older change delivered late by another worker.
+                return
+            self._discard(reservation_id)
+            self._versions[reservation_id] = version
+            if entry is None or (self.since is not None and entry[2] <= self.since):
+                self._tombstones[reservation_id] = version
+                return
+            self._tombstones.pop(reservation_id, None)
+            server_id, start_time, end_time, _ = entry
+            self._entries[reservation_id] = entry
+            self._timelines.setdefault(server_id, ServerTimeline()).add(
+                reservation_id, start_time, end_time
+            )
+    
+    def sync(self, reservation: models.Reservation):
+        self.apply(*reservation_change(reservation))
+    
+    def on_event(self, event: Dict):
+        change = event_change(event)
+        if change is not None:
+            self.apply(*change)
+    
+    def find_conflicts(
+        self,
+        server_id: int,
+        start_time: datetime,
+        end_time: datetime,
+        exclude_reservation_id: Optional[int] = None
+    ) -> List[int]:
+        with self._lock:
+            timeline = self._timelines.get(server_id)
+            if not timeline:
+                return []
+            ids = timeline.overlapping(start_time, end_time)
+        return [i for i in ids if i != exclude_reservation_id]
+    
+    def intervals(self, server_id: int, start_time: datetime, end_time: datetime) -> List[Demand]:
+        with self._lock:
+            timeline = self._timelines.get(server_id)
+            if not timeline:
+                return []
+            return [
+                (reservation_id,) + self._entries[reservation_id][1:]
+                for reservation_id in timeline.overlapping(start_time, end_time)
+            ]
+    
+    def peak_demand(self, server_id: int, start_time: datetime, end_time: datetime) -> int:
+        return peak_demand(self.intervals(server_id, start_time, end_time), start_time, end_time)
+    
+    def check_consistency(self, db: Session, repair: bool = False) -> dict:
+        since = self.since
+        expected = {
+            reservation_id: entry for reservation_id, (entry, _) in load_active(db, since).items()
+        }
+        with self._lock:
+            actual = dict(self._entries)
+        
+        missing = sorted(set(expected) - set(actual))
+        stale = sorted(set(actual) - set(expected))
+        mismatched = sorted(
+            i for i in set(expected) & set(actual) if expected[i] != actual[i]
+        )
+        consistent = not (missing or stale or mismatched)
+        
+        if repair and not consistent:
+            self.rebuild(db)
+        
+        return {
+            "consistent": consistent,
+            "indexed": len(actual),
+            "expected": len(expected),
+            "missing": missing,
+            "stale": stale,
+            "mismatched": mismatched,
+            "since": since,
+            "repaired": repair and not consistent
+        }
+
+reservation_index = ReservationIndex()
+event_bus.add_listener(reservation_index.on_event)
\ No newline at end of file
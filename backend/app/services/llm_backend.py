@@ -0,0 +1,384 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from app.services.fast_parser import take_gpu_count
+from app.utils.config import settings
+from app.utils.metrics import LLM_ATTEMPTS
+from app.utils.rate_limit import TokenBucket
+
+class LLMBackendError(Exception):
+    pass
+
+class LLMTimeoutError(LLMBackendError):
+    pass
+
+class LLMRateLimitedError(LLMBackendError):
+    pass
+
+class CircuitOpenError(LLMBackendError):
+    pass
+
+class LLMRejectedError(LLMBackendError):
+    """The upstream answered but refused the prompt; retrying will not help."""
+
+_TRANSIENT_GOOGLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+class LLMBackend:
+    """Text-in/text-out interface AIService talks to."""
+    
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+    
+    async def agenerate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, api_key: str, model_name: str):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+    
+    def generate(self, prompt: str) -> str:
+        try:
+            return self.model.generate_content(prompt).text
+        except _TRANSIENT_GOOGLE_ERRORS as e:
+            raise LLMBackendError(str(e)) from e
+        except (google_exceptions.GoogleAPIError, ValueError) as e:
+            # ValueError: the response was blocked and has no text.
+            raise LLMRejectedError(str(e)) from e
+    
+    async def agenerate(self, prompt: str) -> str:
+        try:
+            response = await self.model.generate_content_async(prompt)
+            return response.text
+        except _TRANSIENT_GOOGLE_ERRORS as e:
+            raise LLMBackendError(str(e)) from e
+        except (google_exceptions.GoogleAPIError, ValueError) as e:
+            raise LLMRejectedError(str(e)) from e
+
+_NOW_LINE = re.compile(r"現在の日時: (\d{4}-\d{2}-\d{2} \d{2}:\d{2})")
+_REQUEST_LINE = re.compile(r"リクエスト: (.*)")
+_PURPOSE_LINE = re.compile(r"利用目的: (.*)")
+_SCORE_LINE = re.compile(r"優先度スコア: (\d+)")
+_CONFLICT_BLOCK = re.compile(r"- id: (\d+)\s+目的: .*\s+優先度スコア: (\d+)")
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+class StubBackend(LLMBackend):
+    """Deterministic local stand-in for Gemini.
+    
+    Answers are derived from a hash of the prompt content, so the same
+    request always yields the same parse and priority. Latency (plus
+    optional jitter) and random failures can be injected to exercise the
+    reservation path offline.
+    """
+    
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _roll(self) -> float:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            raise LLMBackendError("stub backend: injected failure")
+        return delay
+    
+    def generate(self, prompt: str) -> str:
+        delay = self._roll()
+        if delay:
+            time.sleep(delay)
+        return self.respond(prompt)
+    
+    async def agenerate(self, prompt: str) -> str:
+        delay = self._roll()
+        if delay:
+            await asyncio.sleep(delay)
+        return self.respond(prompt)
+    
+    def respond(self, prompt: str) -> str:
+        if '"decisions"' in prompt:
+            new_score = int(_SCORE_LINE.search(prompt).group(1))
+            return json.dumps({"decisions": [
+                {"id": int(conflict_id), "recommend_new": new_score > int(score), "reason": "stub"}
+                for conflict_id, score in _CONFLICT_BLOCK.findall(prompt)
+            ]})
+        if "recommend_new" in prompt:
+            new_score, existing_score = (int(score) for score in _SCORE_LINE.findall(prompt)[:2])
+            return json.dumps({"recommend_new": new_score > existing_score, "reason": "stub"})
+        if "スコアのみ" in prompt:
+            return str(_digest(_PURPOSE_LINE.search(prompt).group(1)) % 101)
+        
+        request = _REQUEST_LINE.search(prompt).group(1).strip()
+        now = datetime.strptime(_NOW_LINE.search(prompt).group(1), "%Y-%m-%d %H:%M")
+        digest = _digest(request)
+        start_time = datetime.combine(now.date() + timedelta(days=1 + digest % 7), datetime.min.time())
+        start_time += timedelta(hours=8 + (digest >> 8) % 10)
+        end_time = start_time + timedelta(hours=1 + (digest >> 16) % 4)
+        result = {
+            "purpose": request,
+            "start_time": start_time.strftime("%Y-%m-%d %H:%M"),
+            "end_time": end_time.strftime("%Y-%m-%d %H:%M"),
+            "server_preference": None,
+            "gpu_count": take_gpu_count(request)[0] or 1
+        }
+        if "priority_reason" in prompt:
+            result["priority_score"] = _digest(request) % 101
+            result["priority_reason"] = "stub"
+        return json.dumps(result, ensure_ascii=False)
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+    
+    While open every call is refused; after ``reset_timeout`` seconds a
+    single probe is let through (half-open) and its outcome decides whether
+    the circuit closes again or stays open for another period.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+    
+    def release(self):
+        with self._lock:
+            self._probing = False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class ResilientBackend(LLMBackend):
+    """Wraps a backend with deadlines, retries, rate limiting and a circuit breaker.
+    
+    Each call gets ``deadline`` seconds in total, split into attempts of at
+    most ``timeout`` seconds separated by full-jitter exponential backoff.
+    Waiting for a rate-limit token counts against the same deadline, and
+    at most ``max_concurrency`` attempts are in flight per process. Every
+    failure surfaces as an ``LLMBackendError`` so callers can fall back.
+    """
+    
+    def __init__(
+        self,
+        backend: LLMBackend,
+        timeout: float,
+        deadline: float,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        rate_limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        max_concurrency: int
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _admit(self) -> float:
+        if not self.breaker.allow():
+            LLM_ATTEMPTS.labels("circuit_open").inc()
+            raise CircuitOpenError("LLM circuit breaker is open")
+        if self.rate_limiter.try_acquire():
+            return 0.0
+        return self.rate_limiter.time_until()
+    
+    def _rate_limited(self):
+        self.breaker.release()
+        LLM_ATTEMPTS.labels("rate_limited").inc()
+        raise LLMRateLimitedError("LLM rate limit would exceed the call deadline")
+    
+    def _outcome(self, error: Optional[BaseException]) -> Optional[BaseException]:
+        if error is None:
+            self.breaker.record_success()
+            LLM_ATTEMPTS.labels("success").inc()
+            return None
+        if isinstance(error, (LLMBackendError, ConnectionError)) and not isinstance(error, LLMRejectedError):
+            self.breaker.record_failure()
+            LLM_ATTEMPTS.labels("timeout" if isinstance(error, LLMTimeoutError) else "error").inc()
+            return error
+        # The upstream answered (or the backend itself is broken): retrying
+        # will not help and should not count against the upstream's health.
+        self.breaker.record_success()
+        LLM_ATTEMPTS.labels("rejected").inc()
+        if isinstance(error, LLMRejectedError):
+            raise error
+        raise LLMRejectedError(f"LLM request failed: {error!r}") from error
+    
+    def _next_delay(self, attempt: int, deadline: float, error: BaseException) -> float:
+        delay = self._backoff(attempt)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            raise LLMBackendError(f"LLM call failed after {attempt + 1} attempt(s): {error!r}") from error
+        return delay
+    
+    def generate(self, prompt: str) -> str:
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit()
+            while wait:
+                if time.monotonic() + wait >= deadline:
+                    self._rate_limited()
+                time.sleep(wait)
+                wait = 0.0 if self.rate_limiter.try_acquire() else self.rate_limiter.time_until()
+            future = self._executor.submit(self.backend.generate, prompt)
+            try:
+                text = future.result(timeout=min(self.timeout, deadline - time.monotonic()))
+                error = None
+            except FutureTimeoutError:
+                # Not the builtin TimeoutError before Python 3.11.
+                future.cancel()
+                error = LLMTimeoutError(f"LLM call exceeded {self.timeout}s")
+            except Exception as e:
+                error = e
+            if self._outcome(error) is None:
+                return text
+            time.sleep(self._next_delay(attempt, deadline, error))
+    
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._async_slots
+    
+    async def agenerate(self, prompt: str) -> str:
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit()
+            while wait:
+                if time.monotonic() + wait >= deadline:
+                    self._rate_limited()
+                await asyncio.sleep(wait)
+                wait = 0.0 if self.rate_limiter.try_acquire() else self.rate_limiter.time_until()
+            try:
+                async with self._slots():
+                    text = await asyncio.wait_for(
+                        self.backend.agenerate(prompt),
+                        timeout=min(self.timeout, deadline - time.monotonic())
+                    )
+                error = None
+            except asyncio.TimeoutError:
+                error = LLMTimeoutError(f"LLM call exceeded {self.timeout}s")
+            except Exception as e:
+                error = e
+            if self._outcome(error) is None:
+                return text
+            await asyncio.sleep(self._next_delay(attempt, deadline, error))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.opened,
+            "timeout_seconds": self.timeout,
+            "deadline_seconds": self.deadline,
+            "max_retries": self.max_retries,
+            "rate_per_minute": self.rate_limiter.rate * 60,
+            "max_concurrency": self.max_concurrency
+        }
+
+def create_backend() -> LLMBackend:
+    if settings.LLM_BACKEND == "stub":
+        backend = StubBackend(
+            latency=settings.STUB_LLM_LATENCY_SECONDS,
+            jitter=settings.STUB_LLM_JITTER_SECONDS,
+            failure_rate=settings.STUB_LLM_FAILURE_RATE,
+            seed=settings.STUB_LLM_SEED
+        )
+    elif settings.LLM_BACKEND == "gemini":
+        backend = GeminiBackend(settings.GEMINI_API_KEY, settings.LLM_MODEL)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND}")
+    if not settings.LLM_RESILIENCE_ENABLED:
+        return backend
+    return ResilientBackend(
+        backend,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        deadline=settings.LLM_DEADLINE_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+        rate_limiter=TokenBucket(
+            rate=settings.LLM_RATE_LIMIT_PER_MINUTE / 60,
+            capacity=settings.LLM_RATE_LIMIT_BURST
+        ),
+        breaker=CircuitBreaker(
+            settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            settings.LLM_BREAKER_RESET_SECONDS
+        ),
+        max_concurrency=settings.LLM_MAX_CONCURRENCY
+    )
\ No newline at end of file
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.models import models, schemas
+from app.models.database import SessionLocal
+from app.services.reservation_service import (
+    BookingChangedError,
+    ReservationService,
+    StaleReservationError,
+    processing_failure_reason
+)
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ReservationPipeline:
+    """Finishes priority scoring and conflict judgment off the request path.
+    
+    The POST handler only parses the request (and, in combined extraction
+    mode, scores it in the same call) and inserts a PENDING row; the rest is
+    queued here and handled by a small pool of asyncio workers. Jobs
+    for the same server are serialized so each reservation is judged against
+    the ones submitted before it, as in the synchronous path. A job that
+    fails is rejected with the reason rather than left PENDING.
+    
+    Unprocessed rows are recovered at startup and every
+    AI_PIPELINE_RECOVERY_SECONDS; with several worker processes each job
+    is claimed in the database first (ReservationService.claim_reservation)
+    so only one process judges it.
+    """
+    
+    def __init__(self, reservation_service: ReservationService):
+        self.reservation_service = reservation_service
+        self.ai_service = reservation_service.ai_service
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._in_flight: Dict[int, asyncio.Event] = {}
+        self._server_locks: Dict[int, asyncio.Lock] = {}
+        self._recovery: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(settings.AI_PIPELINE_WORKERS)
+        ]
+        await self._recover()
+        self._recovery = asyncio.create_task(self._recover_periodically())
+    
+    async def stop(self):
+        tasks = self._workers + ([self._recovery] if self._recovery else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._recovery = None
+    
+    async def _recover(self):
+        for reservation_id, server_id in await run_in_threadpool(self._load_unprocessed):
+            if reservation_id not in self._in_flight:
+                self._enqueue(reservation_id, server_id)
+    
+    async def _recover_periodically(self):
+        # Picks up jobs whose claiming process died after startup recovery ran.
+        while True:
+            await asyncio.sleep(settings.AI_PIPELINE_RECOVERY_SECONDS)
+            try:
+                await self._recover()
+            except Exception:
+                logger.exception("Failed to recover unprocessed reservations")
+    
+    def _load_unprocessed(self) -> List[Tuple[int, int]]:
+        db = SessionLocal()
+        try:
+            return [
+                (reservation.id, reservation.server_id)
+                for reservation in self.reservation_service.list_unprocessed_reservations(db)
+            ]
+        finally:
+            db.close()
+    
+    def _enqueue(self, reservation_id: int, server_id: int):
+        self._in_flight[reservation_id] = asyncio.Event()
+        self._queue.put_nowait((reservation_id, server_id))
+    
+    def is_processing(self, reservation_id: int) -> bool:
+        return reservation_id in self._in_flight
+    
+    async def submit(
+        self,
+        db: Session,
+        user_id: int,
+        reservation_data: schemas.ReservationCreate
+    ) -> models.Reservation:
+        server_names = await run_in_threadpool(
+            self.reservation_service.active_server_names, db
+        )
+        if settings.AI_COMBINED_EXTRACTION:
+            parsed_data = await self.ai_service.aextract_reservation(
+                reservation_data.natural_language_request, server_names
+            )
+            priority_score = parsed_data["priority_score"]
+        else:
+            parsed_data = await self.ai_service.aparse_reservation_request(
+                reservation_data.natural_language_request, server_names
+            )
+            priority_score = 50
+        
+        def create() -> models.Reservation:
+            reservation = self.reservation_service.create_pending_reservation(
+                db, user_id, reservation_data, parsed_data, priority_score
+            )
+            return self.reservation_service.get_reservation(db, reservation.id)
+        
+        reservation = await run_in_threadpool(create)
+        self._enqueue(reservation.id, reservation.server_id)
+        return reservation
+    
+    async def wait(self, reservation_id: int, timeout: float) -> bool:
+        event = self._in_flight.get(reservation_id)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def _worker(self):
+        while True:
+            reservation_id, server_id = await self._queue.get()
+            try:
+                lock = self._server_locks.setdefault(server_id, asyncio.Lock())
+                async with lock:
+                    await self._process(reservation_id)
+            except Exception as e:
+                logger.exception("Failed to process reservation %s", reservation_id)
+                # Settle it before waking pollers, so they see the final state.
+                await self._fail(reservation_id, processing_failure_reason(e))
+            finally:
+                event = self._in_flight.pop(reservation_id, None)
+                if event:
+                    event.set()
+                self._queue.task_done()
+    
+    async def _fail(self, reservation_id: int, reason: str):
+        def fail():
+            db = SessionLocal()
+            try:
+                self.reservation_service.fail_reservation(db, reservation_id, reason)
+            finally:
+                db.close()
+        
+        try:
+            await run_in_threadpool(fail)
+        except Exception:
+            logger.exception("Failed to reject reservation %s after a processing error", reservation_id)
+    
+    async def _process(self, reservation_id: int):
+        db = SessionLocal()
+        try:
+            if not await run_in_threadpool(
+                self.reservation_service.claim_reservation, db, reservation_id
+            ):
+                # Judged by another process, or no longer PENDING.
+                return
+            reservation = await run_in_threadpool(
+                self.reservation_service.get_reservation, db, reservation_id
+            )
+            if not reservation or reservation.status != models.ReservationStatus.PENDING:
+                return
+            
+            if not settings.AI_COMBINED_EXTRACTION:
+                reservation.priority_score = await self.ai_service.acalculate_priority(
+                    purpose=reservation.purpose,
+                    duration=(reservation.end_time - reservation.start_time).total_seconds() / 3600
+                )
+                await run_in_threadpool(db.commit)
+            
+            conflicts = await run_in_threadpool(
+                self.reservation_service.find_prior_conflicts, db, reservation
+            )
+            
+            for _ in range(settings.BOOKING_MAX_ATTEMPTS):
+                recommendations = await self.ai_service.ajudge_conflicts(reservation, conflicts)
+                judgments = self.reservation_service.until_first_loss(conflicts, recommendations)
+                try:
+                    await run_in_threadpool(
+                        self.reservation_service.apply_judgments, db, reservation, conflicts, judgments
+                    )
+                    return
+                except BookingChangedError as e:
+                    conflicts = e.conflicts
+            raise StaleReservationError("競合状況が変化し続けたため予約を確定できませんでした")
+        finally:
+            db.close()
\ No newline at end of file
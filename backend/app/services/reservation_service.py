@@ -1,15 +1,68 @@
-from datetime import datetime
-from typing import List, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import exists, insert, or_, update
 from app.models import models, schemas
 from app.services.ai_service import AIService
+from app.services.analytics import rollup_updater
+from app.services.availability import availability_index
+from app.services.events import event_bus
+from app.services.fast_parser import split_recurrence
+from app.services.interval_index import (
+    ACTIVE_STATUSES,
+    Demand,
+    capacity_conflicts,
+    peak_demand,
+    reservation_index
+)
+from app.utils.config import settings
+from app.utils.metrics import CONFLICT_CHECKS
+
+# Marks the reservations this process is judging, see claim_reservation.
+PROCESS_OWNER = uuid.uuid4().hex
+
+# An occurrence never displaces an earlier occurrence of its own series.
+SERIES_SIBLING_JUDGMENT = {"recommend_new": False, "reason": "同じ繰り返し予約の前の回と重なるため"}
+
+class StaleReservationError(Exception):
+    pass
+
+def processing_failure_reason(error: Exception) -> str:
+    if isinstance(error, StaleReservationError):
+        return str(error)
+    return "予約の処理中にエラーが発生しました"
+
+class BookingChangedError(Exception):
+    """The conflicts a booking was judged against changed before commit."""
+    
+    def __init__(self, conflicts: List[models.Reservation]):
+        super().__init__("競合する予約が変更されました")
+        self.conflicts = conflicts
 
 class ReservationService:
     def __init__(self):
         self.ai_service = AIService()
+        self.index = reservation_index
     
-    def check_conflicts(
+    def _use_index(self, start_time: datetime) -> bool:
+        return settings.RESERVATION_INDEX_ENABLED and self.index.covers(start_time)
+    
+    def notify_changed(self, *reservations: models.Reservation):
+        if settings.RESERVATION_INDEX_ENABLED:
+            for reservation in reservations:
+                self.index.sync(reservation)
+        if settings.AVAILABILITY_INDEX_ENABLED:
+            for reservation in reservations:
+                availability_index.sync(reservation)
+        if settings.EVENTS_ENABLED:
+            event_bus.publish_reservations(*reservations)
+        if settings.ANALYTICS_ENABLED and rollup_updater.running:
+            rollup_updater.enqueue(reservation.id for reservation in reservations)
+    
+    def _overlapping(
         self, 
         db: Session, 
         server_id: int, 
@@ -17,26 +70,21 @@ class ReservationService:
         end_time: datetime,
         exclude_reservation_id: Optional[int] = None
     ) -> List[models.Reservation]:
+        if self._use_index(start_time):
+            ids = self.index.find_conflicts(
+                server_id, start_time, end_time, exclude_reservation_id
+            )
+            if not ids:
+                return []
+            return db.query(models.Reservation).filter(
+                models.Reservation.id.in_(ids)
+            ).all()
+        
         query = db.query(models.Reservation).filter(
             models.Reservation.server_id == server_id,
-            models.Reservation.status.in_([
-                models.ReservationStatus.CONFIRMED,
-                models.ReservationStatus.PENDING
-            ]),
-            or_(
-                and_(
-                    models.Reservation.start_time <= start_time,
-                    models.Reservation.end_time > start_time
-                ),
-                and_(
-                    models.Reservation.start_time < end_time,
-                    models.Reservation.end_time >= end_time
-                ),
-                and_(
-                    models.Reservation.start_time >= start_time,
-                    models.Reservation.end_time <= end_time
-                )
-            )
+            models.Reservation.status.in_(ACTIVE_STATUSES),
+            models.Reservation.start_time < end_time,
+            models.Reservation.end_time > start_time
         )
         
         if exclude_reservation_id:
@@ -44,31 +92,209 @@ class ReservationService:
         
         return query.all()
     
+    def _server_capacity(self, db: Session, server_id: int) -> int:
+        server = db.get(models.GPUServer, server_id)
+        return (server.gpu_count or 1) if server else 1
+    
+    def _over_capacity(
+        self, 
+        db: Session, 
+        server_id: int, 
+        start_time: datetime, 
+        end_time: datetime,
+        gpu_count: int,
+        candidates: Sequence[models.Reservation]
+    ) -> List[models.Reservation]:
+        """The candidates that run while the server would be over capacity."""
+        if not candidates:
+            CONFLICT_CHECKS.labels("clear").inc()
+            return []
+        ids = capacity_conflicts(
+            [(c.id, c.start_time, c.end_time, c.gpu_count) for c in candidates],
+            start_time,
+            end_time,
+            gpu_count,
+            self._server_capacity(db, server_id)
+        )
+        CONFLICT_CHECKS.labels("conflict" if ids else "clear").inc()
+        return [c for c in candidates if c.id in ids]
+    
+    def check_conflicts(
+        self, 
+        db: Session, 
+        server_id: int, 
+        start_time: datetime, 
+        end_time: datetime,
+        exclude_reservation_id: Optional[int] = None,
+        gpu_count: int = 1
+    ) -> List[models.Reservation]:
+        overlapping = self._overlapping(
+            db, server_id, start_time, end_time, exclude_reservation_id
+        )
+        return self._over_capacity(
+            db, server_id, start_time, end_time, gpu_count, overlapping
+        )
+    
+    def get_reservation(self, db: Session, reservation_id: int) -> Optional[models.Reservation]:
+        return db.query(models.Reservation).options(
+            joinedload(models.Reservation.user),
+            joinedload(models.Reservation.server)
+        ).filter(models.Reservation.id == reservation_id).first()
+    
+    def active_server_names(self, db: Session) -> List[str]:
+        return [
+            name for (name,) in db.query(models.GPUServer.name).filter(
+                models.GPUServer.is_active == True
+            )
+        ]
+    
+    def _duration_hours(self, parsed_data: dict) -> float:
+        return (parsed_data["end_time"] - parsed_data["start_time"]).total_seconds() / 3600
+    
+    def _parse_request(self, db: Session, natural_language_request: str) -> Tuple[dict, int]:
+        server_names = self.active_server_names(db)
+        if settings.AI_COMBINED_EXTRACTION:
+            parsed_data = self.ai_service.extract_reservation(
+                natural_language_request, server_names
+            )
+            return parsed_data, parsed_data["priority_score"]
+        
+        parsed_data = self.ai_service.parse_reservation_request(
+            natural_language_request, server_names
+        )
+        priority_score = self.ai_service.calculate_priority(
+            purpose=parsed_data["purpose"],
+            duration=self._duration_hours(parsed_data)
+        )
+        return parsed_data, priority_score
+    
     def create_reservation(
         self, 
         db: Session, 
         user_id: int,
         reservation_data: schemas.ReservationCreate
     ) -> models.Reservation:
-        parsed_data = self.ai_service.parse_reservation_request(
-            reservation_data.natural_language_request
+        parsed_data, priority_score = self._parse_request(
+            db, reservation_data.natural_language_request
         )
         
-        server = self._select_best_server(db, parsed_data)
-        if not server:
-            raise ValueError("利用可能なサーバーがありません")
-        
-        conflicts = self.check_conflicts(
-            db, 
-            server.id, 
-            parsed_data["start_time"], 
-            parsed_data["end_time"]
+        new_reservation = self.create_pending_reservation(
+            db, user_id, reservation_data, parsed_data, priority_score
         )
         
-        priority_score = self.ai_service.calculate_priority(
-            purpose=parsed_data["purpose"],
-            duration=(parsed_data["end_time"] - parsed_data["start_time"]).total_seconds() / 3600
+        try:
+            conflicts = self.find_prior_conflicts(db, new_reservation)
+            self._handle_conflicts(db, new_reservation, conflicts)
+        except Exception as e:
+            self.fail_reservation(db, new_reservation.id, processing_failure_reason(e))
+            raise
+        
+        return new_reservation
+    
+    def create_reservation_series(
+        self, 
+        db: Session, 
+        user_id: int,
+        series_data: schemas.ReservationBatchCreate
+    ) -> List[models.Reservation]:
+        text, frequency, interval, occurrences = split_recurrence(
+            series_data.natural_language_request
         )
+        frequency = series_data.frequency or frequency
+        interval = series_data.interval or interval
+        occurrences = series_data.occurrences or occurrences
+        if not frequency or not occurrences:
+            raise ValueError("繰り返しの頻度と回数を指定してください")
+        if occurrences > settings.BATCH_MAX_OCCURRENCES:
+            raise ValueError(f"繰り返しは{settings.BATCH_MAX_OCCURRENCES}回までです")
+        
+        # Parsed and scored once; every occurrence shares purpose, priority and duration.
+        parsed_data, priority_score = self._parse_request(db, text)
+        step = timedelta(days=interval * (7 if frequency == "weekly" else 1))
+        
+        rows = []
+        planned: List[Tuple[int, Demand]] = []
+        for i in range(occurrences):
+            occurrence = dict(
+                parsed_data,
+                start_time=parsed_data["start_time"] + i * step,
+                end_time=parsed_data["end_time"] + i * step
+            )
+            # Earlier occurrences are not in the database yet but take room all the same.
+            server = self._select_best_server(db, occurrence, planned)
+            if not server:
+                raise ValueError("利用可能なサーバーがありません")
+            planned.append((server.id, (
+                -1 - i, occurrence["start_time"], occurrence["end_time"], parsed_data.get("gpu_count", 1)
+            )))
+            rows.append({
+                "user_id": user_id,
+                "server_id": server.id,
+                "natural_language_request": series_data.natural_language_request,
+                "purpose": parsed_data["purpose"],
+                "start_time": occurrence["start_time"],
+                "end_time": occurrence["end_time"],
+                "gpu_count": parsed_data.get("gpu_count", 1),
+                "priority_score": priority_score,
+                "status": models.ReservationStatus.PENDING,
+                "processing_owner": PROCESS_OWNER,
+                "claimed_at": datetime.utcnow()
+            })
+        
+        ids = db.scalars(
+            insert(models.Reservation).returning(
+                models.Reservation.id, sort_by_parameter_order=True
+            ),
+            rows
+        ).all()
+        db.commit()
+        
+        series = db.query(models.Reservation).filter(
+            models.Reservation.id.in_(ids)
+        ).order_by(models.Reservation.id).all()
+        self.notify_changed(*series)
+        
+        # Occurrences are settled in order, each against its own overlaps, which
+        # include the earlier occurrences as they stand after being settled.
+        series_ids = set(ids)
+        try:
+            for reservation in series:
+                conflicts = sorted(self.find_prior_conflicts(db, reservation), key=lambda conflict: conflict.id)
+                if not conflicts:
+                    self._handle_conflicts(db, reservation, conflicts, [])
+                    continue
+                others = [conflict for conflict in conflicts if conflict.id not in series_ids]
+                recommendations = dict(zip(
+                    (conflict.id for conflict in others),
+                    self.ai_service.judge_conflicts(reservation, others) if others else []
+                ))
+                judgments = self.until_first_loss(conflicts, [
+                    recommendations.get(conflict.id, SERIES_SIBLING_JUDGMENT) for conflict in conflicts
+                ])
+                self._handle_conflicts(db, reservation, conflicts, judgments)
+        except Exception as e:
+            for reservation_id in ids:
+                self.fail_reservation(db, reservation_id, processing_failure_reason(e))
+            raise
+        
+        return db.query(models.Reservation).options(
+            joinedload(models.Reservation.user),
+            joinedload(models.Reservation.server)
+        ).filter(
+            models.Reservation.id.in_(ids)
+        ).order_by(models.Reservation.id).populate_existing().all()
+    
+    def create_pending_reservation(
+        self, 
+        db: Session, 
+        user_id: int,
+        reservation_data: schemas.ReservationCreate,
+        parsed_data: dict,
+        priority_score: int = 50
+    ) -> models.Reservation:
+        server = self._select_best_server(db, parsed_data)
+        if not server:
+            raise ValueError("利用可能なサーバーがありません")
         
         new_reservation = models.Reservation(
             user_id=user_id,
@@ -77,77 +303,323 @@ class ReservationService:
             purpose=parsed_data["purpose"],
             start_time=parsed_data["start_time"],
             end_time=parsed_data["end_time"],
+            gpu_count=parsed_data.get("gpu_count", 1),
             priority_score=priority_score,
-            status=models.ReservationStatus.PENDING if not conflicts else models.ReservationStatus.PENDING
+            status=models.ReservationStatus.PENDING,
+            processing_owner=PROCESS_OWNER,
+            claimed_at=datetime.utcnow()
         )
         
         db.add(new_reservation)
         db.commit()
         db.refresh(new_reservation)
+        self.notify_changed(new_reservation)
         
-        if conflicts:
-            self._handle_conflicts(db, new_reservation, conflicts)
-        else:
-            new_reservation.status = models.ReservationStatus.CONFIRMED
+        return new_reservation
+    
+    def find_prior_conflicts(
+        self, 
+        db: Session, 
+        reservation: models.Reservation
+    ) -> List[models.Reservation]:
+        # Reservations submitted later are judged against this one when their own turn comes.
+        overlapping = self._overlapping(
+            db, 
+            reservation.server_id, 
+            reservation.start_time, 
+            reservation.end_time,
+            exclude_reservation_id=reservation.id
+        )
+        return self._over_capacity(
+            db,
+            reservation.server_id,
+            reservation.start_time,
+            reservation.end_time,
+            reservation.gpu_count,
+            [conflict for conflict in overlapping if conflict.id < reservation.id]
+        )
+    
+    def fail_reservation(
+        self, 
+        db: Session, 
+        reservation_id: int,
+        reason: str
+    ) -> Optional[models.Reservation]:
+        """Reject a reservation whose judging failed, so it does not stay PENDING.
+        
+        Left as is if it was judged (it has conflict records) or changed by
+        someone else in the meantime.
+        """
+        db.rollback()
+        reservation = db.get(models.Reservation, reservation_id, populate_existing=True)
+        if reservation is None or reservation.status != models.ReservationStatus.PENDING:
+            return reservation
+        judged = db.query(exists().where(
+            models.ReservationConflict.reservation_id == reservation_id
+        )).scalar()
+        if judged:
+            return reservation
+        reservation.status = models.ReservationStatus.REJECTED
+        reservation.rejection_reason = reason
+        try:
             db.commit()
+        except StaleDataError:
+            db.rollback()
+            return reservation
+        self.notify_changed(reservation)
+        return reservation
+    
+    def _claimable(self):
+        # Unowned, or held by a process that has not renewed its claim in time.
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.AI_PIPELINE_CLAIM_SECONDS)
+        return or_(
+            models.Reservation.processing_owner.is_(None),
+            models.Reservation.claimed_at < cutoff
+        )
+    
+    def list_unprocessed_reservations(self, db: Session) -> List[models.Reservation]:
+        """PENDING reservations never judged and not claimed by a live process."""
+        has_conflict_record = exists().where(
+            models.ReservationConflict.reservation_id == models.Reservation.id
+        )
+        return db.query(models.Reservation).filter(
+            models.Reservation.status == models.ReservationStatus.PENDING,
+            ~has_conflict_record,
+            self._claimable()
+        ).order_by(models.Reservation.id).all()
+    
+    def claim_reservation(self, db: Session, reservation_id: int) -> bool:
+        """Atomically take (or renew) the job of judging a PENDING reservation.
         
-        return new_reservation
+        Every worker process recovers unprocessed rows at startup; only the
+        one whose conditional UPDATE matches goes on to judge the row, so
+        it is not judged (and the LLM paid) once per process.
+        """
+        result = db.execute(
+            update(models.Reservation).where(
+                models.Reservation.id == reservation_id,
+                models.Reservation.status == models.ReservationStatus.PENDING,
+                or_(models.Reservation.processing_owner == PROCESS_OWNER, self._claimable())
+            ).values(
+                processing_owner=PROCESS_OWNER,
+                claimed_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
     
-    def _select_best_server(
+    def _peak_demands(
         self, 
         db: Session, 
-        parsed_data: dict
-    ) -> Optional[models.GPUServer]:
-        servers = db.query(models.GPUServer).filter(
-            models.GPUServer.is_active == True
+        server_ids: Sequence[int],
+        start_time: datetime, 
+        end_time: datetime,
+        planned: Sequence[Tuple[int, Demand]] = ()
+    ) -> Dict[int, int]:
+        extra = defaultdict(list)
+        for server_id, demand in planned:
+            extra[server_id].append(demand)
+        
+        if self._use_index(start_time):
+            return {
+                server_id: peak_demand(
+                    self.index.intervals(server_id, start_time, end_time) + extra[server_id],
+                    start_time,
+                    end_time
+                ) if extra[server_id] else self.index.peak_demand(server_id, start_time, end_time)
+                for server_id in server_ids
+            }
+        
+        rows = db.query(
+            models.Reservation.id,
+            models.Reservation.server_id,
+            models.Reservation.start_time,
+            models.Reservation.end_time,
+            models.Reservation.gpu_count
+        ).filter(
+            models.Reservation.server_id.in_(server_ids),
+            models.Reservation.status.in_(ACTIVE_STATUSES),
+            models.Reservation.start_time < end_time,
+            models.Reservation.end_time > start_time
         ).all()
+        intervals = defaultdict(list)
+        for row in rows:
+            intervals[row.server_id].append((row.id, row.start_time, row.end_time, row.gpu_count))
+        return {
+            server_id: peak_demand(intervals[server_id] + extra[server_id], start_time, end_time)
+            for server_id in server_ids
+        }
+    
+    def _rank_servers(
+        self, 
+        db: Session, 
+        start_time: datetime, 
+        end_time: datetime,
+        gpu_count: int = 1,
+        planned: Sequence[Tuple[int, Demand]] = ()
+    ) -> List[Tuple[models.GPUServer, bool]]:
+        """Best fit first: servers with room, fullest first, then the least overloaded."""
+        servers = [
+            server for server in db.query(models.GPUServer).filter(
+                models.GPUServer.is_active == True
+            ).order_by(models.GPUServer.id)
+            if (server.gpu_count or 1) >= gpu_count
+        ]
+        peaks = self._peak_demands(db, [server.id for server in servers], start_time, end_time, planned)
         
+        ranked = []
+        for server in servers:
+            spare = (server.gpu_count or 1) - peaks[server.id] - gpu_count
+            ranked.append((spare < 0, abs(spare), server.id, server))
+        ranked.sort(key=lambda row: row[:3])
+        return [(server, not over) for over, _, _, server in ranked]
+    
+    def _select_best_server(
+        self, 
+        db: Session, 
+        parsed_data: dict,
+        planned: Sequence[Tuple[int, Demand]] = ()
+    ) -> Optional[models.GPUServer]:
+        """``planned`` is (server_id, demand) of bookings about to be inserted."""
+        ranked = self._rank_servers(
+            db, 
+            parsed_data["start_time"], 
+            parsed_data["end_time"],
+            parsed_data.get("gpu_count", 1),
+            planned
+        )
         if parsed_data.get("server_preference"):
-            for server in servers:
+            for server, _ in sorted(ranked, key=lambda row: row[0].id):
                 if parsed_data["server_preference"].lower() in server.name.lower():
                     return server
         
-        for server in servers:
-            conflicts = self.check_conflicts(
-                db, 
-                server.id, 
-                parsed_data["start_time"], 
-                parsed_data["end_time"]
-            )
-            if not conflicts:
-                return server
-        
-        return servers[0] if servers else None
+        return ranked[0][0] if ranked else None
+    
+    def judge_conflicts(
+        self, 
+        new_reservation: models.Reservation,
+        conflicts: List[models.Reservation]
+    ) -> List[Tuple[models.Reservation, dict]]:
+        recommendations = self.ai_service.judge_conflicts(new_reservation, conflicts)
+        return self.until_first_loss(conflicts, recommendations)
+    
+    def until_first_loss(
+        self, 
+        conflicts: List[models.Reservation],
+        recommendations: List[dict]
+    ) -> List[Tuple[models.Reservation, dict]]:
+        judgments = []
+        for conflict, recommendation in zip(conflicts, recommendations):
+            judgments.append((conflict, recommendation))
+            if not recommendation["recommend_new"]:
+                break
+        return judgments
     
     def _handle_conflicts(
         self, 
         db: Session, 
         new_reservation: models.Reservation,
-        conflicts: List[models.Reservation]
+        conflicts: List[models.Reservation],
+        judgments: Optional[List[Tuple[models.Reservation, dict]]] = None
     ):
-        for conflict in conflicts:
-            recommendation = self.ai_service.judge_conflict(
-                new_reservation, 
-                conflict
-            )
+        for _ in range(settings.BOOKING_MAX_ATTEMPTS):
+            if judgments is None:
+                judgments = self.judge_conflicts(new_reservation, conflicts)
+            try:
+                self.apply_judgments(db, new_reservation, conflicts, judgments)
+                return
+            except BookingChangedError as e:
+                conflicts = e.conflicts
+                judgments = None
+        raise StaleReservationError("競合状況が変化し続けたため予約を確定できませんでした")
+    
+    def _lock_server(self, db: Session, server_id: int):
+        # Row lock held until commit; serializes booking commits per server.
+        db.execute(
+            update(models.GPUServer).where(
+                models.GPUServer.id == server_id
+            ).values(booking_version=models.GPUServer.booking_version + 1)
+        )
+    
+    def _load_prior_conflicts(
+        self, 
+        db: Session, 
+        reservation: models.Reservation
+    ) -> List[models.Reservation]:
+        # Always read from the database: the in-memory index is per process.
+        overlapping = db.query(models.Reservation).filter(
+            models.Reservation.server_id == reservation.server_id,
+            models.Reservation.status.in_(ACTIVE_STATUSES),
+            models.Reservation.start_time < reservation.end_time,
+            models.Reservation.end_time > reservation.start_time,
+            models.Reservation.id < reservation.id
+        ).order_by(models.Reservation.id).populate_existing().all()
+        return self._over_capacity(
+            db,
+            reservation.server_id,
+            reservation.start_time,
+            reservation.end_time,
+            reservation.gpu_count,
+            overlapping
+        )
+    
+    def apply_judgments(
+        self, 
+        db: Session, 
+        new_reservation: models.Reservation,
+        conflicts: List[models.Reservation],
+        judgments: List[Tuple[models.Reservation, dict]]
+    ):
+        """Commit judgments made against ``conflicts`` in one short transaction.
+        
+        The server row is locked first and the overlap re-checked; if the set
+        of prior conflicts changed since judging, BookingChangedError carries
+        the fresh set so the caller can judge again.
+        """
+        try:
+            self._lock_server(db, new_reservation.server_id)
+            db.refresh(new_reservation)
+            if new_reservation.status != models.ReservationStatus.PENDING:
+                db.rollback()
+                return
             
-            conflict_record = models.ReservationConflict(
-                reservation_id=new_reservation.id,
-                conflicting_reservation_id=conflict.id,
-                resolved=False
-            )
-            db.add(conflict_record)
+            current = self._load_prior_conflicts(db, new_reservation)
+            if [c.id for c in current] != sorted(c.id for c in conflicts):
+                raise self._booking_changed(db, new_reservation)
             
-            if recommendation["recommend_new"]:
-                conflict.status = models.ReservationStatus.PENDING_REJECTION
-                conflict.ai_judgment_reason = recommendation["reason"]
-            else:
-                new_reservation.status = models.ReservationStatus.REJECTED
-                new_reservation.ai_judgment_reason = recommendation["reason"]
-                new_reservation.rejection_reason = "優先度が低いため"
-                break
+            if not judgments:
+                new_reservation.status = models.ReservationStatus.CONFIRMED
+            
+            for conflict, recommendation in judgments:
+                conflict_record = models.ReservationConflict(
+                    reservation_id=new_reservation.id,
+                    conflicting_reservation_id=conflict.id,
+                    resolved=False
+                )
+                db.add(conflict_record)
+                
+                if recommendation["recommend_new"]:
+                    conflict.status = models.ReservationStatus.PENDING_REJECTION
+                    conflict.ai_judgment_reason = recommendation["reason"]
+                else:
+                    new_reservation.status = models.ReservationStatus.REJECTED
+                    new_reservation.ai_judgment_reason = recommendation["reason"]
+                    new_reservation.rejection_reason = "優先度が低いため"
+            
+            db.commit()
+        except StaleDataError:
+            raise self._booking_changed(db, new_reservation)
         
-        db.commit()
+        self.notify_changed(new_reservation, *(conflict for conflict, _ in judgments))
+    
+    def _booking_changed(
+        self, 
+        db: Session, 
+        new_reservation: models.Reservation
+    ) -> BookingChangedError:
+        db.rollback()
+        db.refresh(new_reservation)
+        return BookingChangedError(self._load_prior_conflicts(db, new_reservation))
     
     def confirm_rejection(
         self, 
@@ -155,7 +627,8 @@ class ReservationService:
         reservation_id: int,
         user_id: int,
         confirm: bool,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        version: Optional[int] = None
     ) -> models.Reservation:
         reservation = db.query(models.Reservation).filter(
             models.Reservation.id == reservation_id,
@@ -166,6 +639,12 @@ class ReservationService:
         if not reservation:
             raise ValueError("該当する予約が見つかりません")
         
+        if version is not None and version != reservation.version:
+            raise StaleReservationError("予約が他の操作で更新されています")
+        
+        self._lock_server(db, reservation.server_id)
+        changed = [reservation]
+        
         if confirm:
             reservation.status = models.ReservationStatus.CANCELLED
             reservation.rejection_reason = reason or "ユーザーが承認"
@@ -184,6 +663,7 @@ class ReservationService:
                 ).first()
                 if new_res and new_res.status == models.ReservationStatus.PENDING:
                     new_res.status = models.ReservationStatus.CONFIRMED
+                    changed.append(new_res)
         else:
             reservation.status = models.ReservationStatus.CONFIRMED
             
@@ -201,7 +681,13 @@ class ReservationService:
                 if new_res:
                     new_res.status = models.ReservationStatus.REJECTED
                     new_res.rejection_reason = "既存予約が優先されました"
+                    changed.append(new_res)
         
-        db.commit()
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise StaleReservationError("予約が他の操作で更新されています")
         db.refresh(reservation)
+        self.notify_changed(*changed)
         return reservation
\ No newline at end of file
@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from app.models import models
+from app.models.database import SessionLocal
+from app.services.interval_index import ServerTimeline, peak_demand
+from app.services.reservation_service import ReservationService, StaleReservationError
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+class _Job:
+    __slots__ = (
+        "id", "server_id", "start_time", "end_time", "gpu_count",
+        "status", "version", "gpu_type", "weight"
+    )
+    
+    def __init__(self, reservation: models.Reservation, gpu_type: Optional[str]):
+        self.id = reservation.id
+        self.server_id = reservation.server_id
+        self.start_time = reservation.start_time
+        self.end_time = reservation.end_time
+        self.gpu_count = reservation.gpu_count
+        self.status = reservation.status
+        self.version = reservation.version
+        self.gpu_type = gpu_type
+        hours = (reservation.end_time - reservation.start_time).total_seconds() / 3600
+        self.weight = (reservation.priority_score or 0) * hours * reservation.gpu_count
+
+class ScheduleSolver:
+    """Greedy weighted interval assignment followed by eviction search.
+    
+    Every open job is either placed on a server of its own GPU type with
+    enough free GPUs or left out. The objective is the priority-weighted
+    GPU-hours placed, minus
+    ``bump_penalty`` for each existing booking (PENDING_REJECTION) left out
+    and ``move_penalty`` for each job placed off its current server. Fixed
+    reservations occupy their servers and are never moved. The search stops
+    at a local optimum or when ``time_budget`` seconds have passed.
+    """
+    
+    def __init__(
+        self,
+        servers: Dict[int, Tuple[Optional[str], int]],
+        fixed: Sequence[models.Reservation],
+        jobs: Sequence[_Job],
+        bump_penalty: float,
+        move_penalty: float
+    ):
+        self.servers = servers
+        self.jobs = {job.id: job for job in jobs}
+        self.bump_penalty = bump_penalty
+        self.move_penalty = move_penalty
+        self.timelines = {server_id: ServerTimeline() for server_id in servers}
+        self.spans: Dict[int, Tuple[datetime, datetime, int]] = {
+            job.id: (job.start_time, job.end_time, job.gpu_count) for job in jobs
+        }
+        for reservation in fixed:
+            if reservation.server_id in self.timelines:
+                self.timelines[reservation.server_id].add(
+                    reservation.id, reservation.start_time, reservation.end_time
+                )
+                self.spans[reservation.id] = (
+                    reservation.start_time, reservation.end_time, reservation.gpu_count
+                )
+        self.assignment: Dict[int, Optional[int]] = {job.id: None for job in jobs}
+        self.total = self.value(self.assignment)
+        self.complete = True
+    
+    def _candidates(self, job: _Job) -> List[int]:
+        same_type = [
+            server_id for server_id, (gpu_type, capacity) in sorted(self.servers.items())
+            if gpu_type == job.gpu_type and capacity >= job.gpu_count
+        ]
+        if job.server_id in same_type:
+            same_type.remove(job.server_id)
+            return [job.server_id] + same_type
+        return same_type
+    
+    def _fits(self, job: _Job, server_id: int) -> bool:
+        intervals = [
+            (i,) + self.spans[i]
+            for i in self.timelines[server_id].overlapping(job.start_time, job.end_time)
+        ]
+        demand = peak_demand(intervals, job.start_time, job.end_time)
+        return demand + job.gpu_count <= self.servers[server_id][1]
+    
+    def _score(self, job: _Job, server_id: Optional[int]) -> float:
+        if server_id is None:
+            if job.status == models.ReservationStatus.PENDING_REJECTION:
+                return -self.bump_penalty
+            return 0.0
+        if server_id != job.server_id:
+            return job.weight - self.move_penalty
+        return job.weight
+    
+    def _place(self, job: _Job, server_id: int):
+        self.timelines[server_id].add(job.id, job.start_time, job.end_time)
+        self.assignment[job.id] = server_id
+        self.total += self._score(job, server_id) - self._score(job, None)
+    
+    def _unplace(self, job: _Job):
+        server_id = self.assignment[job.id]
+        self.timelines[server_id].remove(job.id, job.start_time, job.end_time)
+        self.assignment[job.id] = None
+        self.total += self._score(job, None) - self._score(job, server_id)
+    
+    def _first_fit(self, job: _Job) -> Optional[int]:
+        for server_id in self._candidates(job):
+            if self._fits(job, server_id):
+                return server_id
+        return None
+    
+    def value(self, assignment: Dict[int, Optional[int]]) -> float:
+        return sum(
+            self._score(self.jobs[job_id], server_id)
+            for job_id, server_id in assignment.items()
+        )
+    
+    def _try_evict(self, job: _Job, server_id: int) -> bool:
+        blocking = self.timelines[server_id].overlapping(job.start_time, job.end_time)
+        evicted = [self.jobs[i] for i in blocking if i in self.jobs]
+        if not evicted:
+            return False
+        
+        before = self.total
+        for other in evicted:
+            self._unplace(other)
+        if not self._fits(job, server_id):
+            for other in evicted:
+                self._place(other, server_id)
+            return False
+        self._place(job, server_id)
+        for other in sorted(evicted, key=lambda j: -j.weight):
+            target = self._first_fit(other)
+            if target is not None:
+                self._place(other, target)
+        
+        if self.total > before + 1e-9:
+            return True
+        
+        for other in evicted:
+            if self.assignment[other.id] is not None:
+                self._unplace(other)
+        self._unplace(job)
+        for other in evicted:
+            self._place(other, server_id)
+        return False
+    
+    def solve(self, time_budget: float) -> Dict[int, Optional[int]]:
+        deadline = time.perf_counter() + time_budget
+        order = sorted(
+            self.jobs.values(),
+            key=lambda j: (-j.weight, j.status != models.ReservationStatus.PENDING_REJECTION, j.id)
+        )
+        for job in order:
+            server_id = self._first_fit(job)
+            if server_id is not None:
+                self._place(job, server_id)
+        
+        improved = True
+        while improved:
+            improved = False
+            for job in order:
+                if self.assignment[job.id] is not None:
+                    continue
+                if time.perf_counter() > deadline:
+                    self.complete = False
+                    return self.assignment
+                if any(self._try_evict(job, server_id) for server_id in self._candidates(job)):
+                    improved = True
+        return self.assignment
+
+class ReservationScheduler:
+    """Periodically re-solves all open reservations into a proposed plan.
+    
+    Plans are only proposals: nothing changes until an admin applies the
+    latest one (or SCHEDULER_AUTO_APPLY is set). Applying re-checks the
+    version of every planned reservation and the booking_version of every
+    server an assignment leaves or lands on, so a plan is refused when a
+    booking was committed on one of those servers after it was computed;
+    bookings elsewhere do not invalidate it.
+    """
+    
+    def __init__(self, reservation_service: ReservationService):
+        self.reservation_service = reservation_service
+        self._lock = threading.Lock()
+        self._plan: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.SCHEDULER_INTERVAL_SECONDS)
+            try:
+                await run_in_threadpool(self._periodic)
+            except Exception:
+                logger.exception("Scheduled optimization failed")
+    
+    def _periodic(self):
+        db = SessionLocal()
+        try:
+            plan = self.plan(db)
+            if settings.SCHEDULER_AUTO_APPLY and plan["assignments"]:
+                self.apply(db, plan["plan_id"])
+        finally:
+            db.close()
+    
+    @property
+    def latest_plan(self) -> Optional[dict]:
+        return self._plan
+    
+    def _load_jobs(self, db: Session, servers: Dict[int, Tuple[Optional[str], int]]) -> List[_Job]:
+        # Unprocessed PENDING rows are still being judged and stay where they are.
+        has_conflict_record = exists().where(
+            models.ReservationConflict.reservation_id == models.Reservation.id
+        )
+        reservations = db.query(models.Reservation).filter(
+            or_(
+                models.Reservation.status == models.ReservationStatus.PENDING_REJECTION,
+                and_(
+                    models.Reservation.status == models.ReservationStatus.PENDING,
+                    has_conflict_record
+                )
+            )
+        ).order_by(models.Reservation.id).all()
+        return [
+            _Job(reservation, servers.get(reservation.server_id, (None, 0))[0])
+            for reservation in reservations
+        ]
+    
+    def _load_fixed(self, db: Session, jobs: List[_Job]) -> List[models.Reservation]:
+        if not jobs:
+            return []
+        return db.query(models.Reservation).filter(
+            models.Reservation.status.in_(
+                (models.ReservationStatus.CONFIRMED, models.ReservationStatus.PENDING)
+            ),
+            models.Reservation.id.notin_([job.id for job in jobs]),
+            models.Reservation.start_time < max(job.end_time for job in jobs),
+            models.Reservation.end_time > min(job.start_time for job in jobs)
+        ).all()
+    
+    def plan(self, db: Session, time_budget: Optional[float] = None) -> dict:
+        started = time.perf_counter()
+        servers = db.query(models.GPUServer).filter(
+            models.GPUServer.is_active == True
+        ).all()
+        capacities = {server.id: (server.gpu_type, server.gpu_count or 1) for server in servers}
+        jobs = self._load_jobs(db, capacities)
+        solver = ScheduleSolver(
+            capacities,
+            self._load_fixed(db, jobs),
+            jobs,
+            bump_penalty=settings.SCHEDULER_BUMP_PENALTY,
+            move_penalty=settings.SCHEDULER_MOVE_PENALTY
+        )
+        # What resolving every open conflict the way the AI judged it would give.
+        baseline = {
+            job.id: job.server_id if job.status == models.ReservationStatus.PENDING else None
+            for job in jobs
+        }
+        assignment = solver.solve(
+            settings.SCHEDULER_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+        )
+        
+        assignments = []
+        for job in jobs:
+            server_id = assignment[job.id]
+            assignments.append({
+                "reservation_id": job.id,
+                "version": job.version,
+                "current_server_id": job.server_id,
+                "proposed_server_id": server_id if server_id is not None else job.server_id,
+                "current_status": job.status,
+                "proposed_status": (
+                    models.ReservationStatus.CONFIRMED if server_id is not None
+                    else models.ReservationStatus.REJECTED
+                ),
+                "weight": round(job.weight, 2)
+            })
+        
+        touched = {item["current_server_id"] for item in assignments}
+        touched.update(item["proposed_server_id"] for item in assignments)
+        
+        plan = {
+            "plan_id": uuid.uuid4().hex,
+            "generated_at": datetime.utcnow(),
+            "objective": round(solver.value(assignment), 2),
+            "baseline_objective": round(solver.value(baseline), 2),
+            "complete": solver.complete,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "confirmed": sum(1 for server_id in assignment.values() if server_id is not None),
+            "rejected": sum(1 for server_id in assignment.values() if server_id is None),
+            "moved": sum(
+                1 for job in jobs
+                if assignment[job.id] is not None and assignment[job.id] != job.server_id
+            ),
+            "bumped": sum(
+                1 for job in jobs
+                if assignment[job.id] is None
+                and job.status == models.ReservationStatus.PENDING_REJECTION
+            ),
+            "assignments": assignments,
+            "server_versions": {
+                server.id: server.booking_version for server in servers if server.id in touched
+            }
+        }
+        with self._lock:
+            self._plan = plan
+        return plan
+    
+    def apply(self, db: Session, plan_id: str) -> List[models.Reservation]:
+        with self._lock:
+            plan = self._plan
+        if not plan or plan["plan_id"] != plan_id:
+            raise ValueError("該当するスケジュール案が見つかりません")
+        
+        server_versions = plan["server_versions"]
+        for server_id in sorted(server_versions):
+            self.reservation_service._lock_server(db, server_id)
+        current_versions = dict(
+            db.query(models.GPUServer.id, models.GPUServer.booking_version).filter(
+                models.GPUServer.id.in_(list(server_versions))
+            ).all()
+        )
+        if any(current_versions.get(i) != v + 1 for i, v in server_versions.items()):
+            db.rollback()
+            raise StaleReservationError("スケジュール案の作成後に予約が更新されています")
+        
+        planned = {item["reservation_id"]: item for item in plan["assignments"]}
+        reservations = db.query(models.Reservation).filter(
+            models.Reservation.id.in_(list(planned))
+        ).populate_existing().all()
+        if len(reservations) != len(planned) or any(
+            reservation.version != planned[reservation.id]["version"]
+            for reservation in reservations
+        ):
+            db.rollback()
+            raise StaleReservationError("スケジュール案の作成後に予約が更新されています")
+        
+        for reservation in reservations:
+            item = planned[reservation.id]
+            reservation.server_id = item["proposed_server_id"]
+            reservation.status = item["proposed_status"]
+            if item["proposed_status"] == models.ReservationStatus.REJECTED:
+                reservation.rejection_reason = "スケジュール最適化により割り当てできませんでした"
+        
+        conflicts = db.query(models.ReservationConflict).filter(
+            models.ReservationConflict.resolved == False,
+            or_(
+                models.ReservationConflict.reservation_id.in_(list(planned)),
+                models.ReservationConflict.conflicting_reservation_id.in_(list(planned))
+            )
+        ).all()
+        for conflict in conflicts:
+            conflict.resolved = True
+            conflict.resolution_method = "scheduler"
+        
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise StaleReservationError("スケジュール案の作成後に予約が更新されています")
+        
+        with self._lock:
+            if self._plan is plan:
+                self._plan = None
+        self.reservation_service.notify_changed(*reservations)
+        return reservations
\ No newline at end of file
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models import models, schemas
+from app.services.events import event_bus
+from app.utils.config import settings
+from app.utils.http_cache import EncodedBody
+
+class ServerCatalogCache:
+    """Versioned read cache of gpu_servers, encoded once per version.
+    
+    The write routes in routes/servers.py call invalidate(), which bumps the
+    version locally and, through the event bus, in other workers sharing
+    its backend. ``ttl_seconds`` bounds staleness when events do not reach
+    a worker (e.g. EVENTS_BACKEND=local with several workers). Encoded
+    bodies are kept in an LRU of ``max_encoded`` entries, since clients
+    choose the skip/limit pages that key them.
+    """
+    
+    def __init__(self, ttl_seconds: int, max_encoded: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_encoded = max_encoded
+        self.enabled = enabled
+        self.version = 0
+        self._lock = threading.Lock()
+        self._servers: Optional[Dict[int, Dict[str, Any]]] = None
+        self._loaded_at = 0.0
+        self._encoded: "OrderedDict[Tuple, EncodedBody]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def invalidate(self, broadcast: bool = True):
+        with self._lock:
+            self.version += 1
+            self._servers = None
+            self._encoded.clear()
+        if broadcast and settings.EVENTS_ENABLED:
+            event_bus.publish({"type": "server_catalog"})
+    
+    def on_event(self, event: Dict[str, Any]):
+        if event.get("type") == "server_catalog":
+            self.invalidate(broadcast=False)
+    
+    def _catalog(self, db: Session) -> Tuple[int, Dict[int, Dict[str, Any]]]:
+        with self._lock:
+            version, servers = self.version, self._servers
+            if servers is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                self.hits += 1
+                return version, servers
+            self.misses += 1
+        servers = {
+            server.id: schemas.GPUServer.model_validate(server).model_dump()
+            for server in db.query(models.GPUServer).order_by(models.GPUServer.id)
+        }
+        with self._lock:
+            # Keep the result only if no write invalidated it meanwhile.
+            if self.version == version:
+                self._encoded.clear()
+                self._servers = servers
+                self._loaded_at = time.monotonic()
+        return version, servers
+    
+    def _encode(self, version: int, key: Tuple, content: Any) -> EncodedBody:
+        with self._lock:
+            encoded = self._encoded.get((version, key))
+            if encoded is not None:
+                self._encoded.move_to_end((version, key))
+        if encoded is None:
+            encoded = EncodedBody.encode(content)
+            with self._lock:
+                if self.version == version:
+                    self._encoded[(version, key)] = encoded
+                    while len(self._encoded) > self.max_encoded:
+                        self._encoded.popitem(last=False)
+        return encoded
+    
+    def list_active(self, db: Session, skip: int, limit: int) -> EncodedBody:
+        if not self.enabled:
+            servers = db.query(models.GPUServer).filter(
+                models.GPUServer.is_active == True
+            ).order_by(models.GPUServer.id).offset(skip).limit(limit).all()
+            return EncodedBody.encode([schemas.GPUServer.model_validate(server).model_dump() for server in servers])
+        version, servers = self._catalog(db)
+        active = [server for server in servers.values() if server["is_active"]]
+        return self._encode(version, ("list", skip, limit), active[skip:skip + limit])
+    
+    def get(self, db: Session, server_id: int) -> Optional[EncodedBody]:
+        if not self.enabled:
+            server = db.get(models.GPUServer, server_id)
+            return EncodedBody.encode(schemas.GPUServer.model_validate(server).model_dump()) if server else None
+        version, servers = self._catalog(db)
+        server = servers.get(server_id)
+        if server is None:
+            return None
+        return self._encode(version, ("get", server_id), server)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "servers": len(self._servers or ()),
+            "encoded": len(self._encoded),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+server_catalog = ServerCatalogCache(
+    ttl_seconds=settings.SERVER_CATALOG_CACHE_TTL_SECONDS,
+    max_encoded=settings.SERVER_CATALOG_CACHE_MAX_ENCODED,
+    enabled=settings.SERVER_CATALOG_CACHE_ENABLED
+)
+event_bus.add_listener(server_catalog.on_event)
\ No newline at end of file
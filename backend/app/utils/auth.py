@@ -1,16 +1,67 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.models.database import get_db
+from starlette.concurrency import run_in_threadpool
+from app.models.database import SessionLocal
 from app.models import models, schemas
+from app.services.events import event_bus
 from app.utils.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the target cost makes verify_and_update flag hashes made
+# with any other cost, so changing AUTH_BCRYPT_ROUNDS rehashes on next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.AUTH_BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+
+class HashingBusyError(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+    
+    bcrypt releases the GIL, so a few threads use as many cores. Work that
+    cannot start within ``max_pending`` queued jobs is refused with
+    HashingBusyError instead of piling up behind a login storm, and the
+    event loop and the default request threadpool are never blocked.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.rejected = 0
+    
+    async def _run(self, func: Callable, *args) -> Any:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusyError("Too many concurrent password operations")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+    
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+password_hasher = PasswordHasher(settings.AUTH_HASH_WORKERS, settings.AUTH_HASH_MAX_PENDING)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -18,6 +69,69 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class LoginCache:
+    """Remembers recently verified credentials so repeat logins skip bcrypt.
+    
+    Entries are keyed by an HMAC of username and password under SECRET_KEY
+    (the password itself is never kept) and only match while the stored
+    hash is unchanged, so a password change or rehash invalidates them.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def _key(self, username: str, password: str) -> bytes:
+        message = f"{username}\0{password}".encode("utf-8")
+        return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).digest()
+    
+    def check(self, username: str, password: str, hashed_password: str) -> bool:
+        if not self.enabled:
+            return False
+        key = self._key(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time() or not hmac.compare_digest(entry[1], hashed_password):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+    
+    def add(self, username: str, password: str, hashed_password: str):
+        if not self.enabled:
+            return
+        key = self._key(username, password)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, hashed_password)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "hasher_rejected": password_hasher.rejected
+        }
+
+login_cache = LoginCache(
+    max_entries=settings.AUTH_LOGIN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_LOGIN_CACHE_TTL_SECONDS,
+    enabled=settings.AUTH_LOGIN_CACHE_ENABLED
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -28,7 +142,107 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+class PrincipalCache:
+    """Bounded TTL cache of verified bearer tokens to user principals.
+    
+    Entries never outlive the token's own expiry. The cache is per process;
+    invalidate_user also reaches the other workers sharing the event bus
+    backend, like ServerCatalogCache.invalidate. AUTH_CACHE_TTL_SECONDS
+    bounds staleness when events do not reach a worker.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, schemas.User]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token: str) -> Optional[schemas.User]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._discard(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, token: str, principal: schemas.User, token_expires_at: float):
+        if not self.enabled:
+            return
+        expires_at = min(token_expires_at, time.time() + self.ttl_seconds)
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (expires_at, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+    
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[1].id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[1].id]
+    
+    def invalidate_user(self, user_id: int, broadcast: bool = True):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._discard(token)
+        if broadcast and settings.EVENTS_ENABLED:
+            # Not "user_id": the bus would route that to the user's SSE streams.
+            event_bus.publish({"type": "principal", "principal_id": user_id})
+    
+    def on_event(self, event: Dict[str, Any]):
+        if event.get("type") == "principal":
+            self.invalidate_user(event["principal_id"], broadcast=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "users": len(self._tokens_by_user),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+principal_cache = PrincipalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    enabled=settings.AUTH_CACHE_ENABLED
+)
+event_bus.add_listener(principal_cache.on_event)
+
+def _load_principal(username: str) -> Optional[schemas.User]:
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == username).first()
+        return schemas.User.model_validate(user) if user else None
+    finally:
+        db.close()
+
+async def _authenticate(token: str) -> schemas.User:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -37,17 +251,71 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        # Scoped tokens (stream tickets) are not access tokens.
+        if username is None or "scope" in payload:
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    # The database stays authoritative for the role; the claim is informational.
+    user = await run_in_threadpool(_load_principal, token_data.username)
+    if user is None:
+        raise credentials_exception
+    principal_cache.set(token, user, payload.get("exp", time.time()))
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.User:
+    return await _authenticate(token)
+
+STREAM_SCOPE = "stream"
+
+def create_stream_ticket(user: schemas.User) -> str:
+    """Short-lived token that only opens event streams.
+    
+    EventSource cannot send headers, so the credential has to travel in the
+    query string, where it lands in access logs and browser history; a
+    ticket expires after EVENTS_TICKET_SECONDS and is refused as a bearer
+    token, unlike the access token it replaces there.
+    """
+    return create_access_token(
+        {"sub": user.username, "scope": STREAM_SCOPE},
+        expires_delta=timedelta(seconds=settings.EVENTS_TICKET_SECONDS)
+    )
+
+async def _authenticate_ticket(ticket: str) -> schemas.User:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(ticket, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    username = payload.get("sub")
+    if username is None or payload.get("scope") != STREAM_SCOPE:
+        raise credentials_exception
+    user = await run_in_threadpool(_load_principal, username)
     if user is None:
         raise credentials_exception
     return user
 
+async def get_stream_user(
+    ticket: Optional[str] = Query(None),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme)
+) -> schemas.User:
+    # The query string only takes tickets from create_stream_ticket, never access tokens.
+    if bearer:
+        return await _authenticate(bearer)
+    if ticket:
+        return await _authenticate_ticket(ticket)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 async def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
     return current_user
 
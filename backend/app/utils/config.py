@@ -2,11 +2,103 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 class Settings(BaseSettings):
-    GEMINI_API_KEY: str
+    GEMINI_API_KEY: str = ""
     DATABASE_URL: str = "sqlite:///./gpu_reservation.db"
+    # Per process: a multi-worker deployment opens up to
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_BCRYPT_ROUNDS: int = 12
+    AUTH_HASH_WORKERS: int = 4
+    AUTH_HASH_MAX_PENDING: int = 64
+    AUTH_LOGIN_CACHE_ENABLED: bool = True
+    AUTH_LOGIN_CACHE_TTL_SECONDS: int = 900
+    AUTH_LOGIN_CACHE_MAX_ENTRIES: int = 10000
+    METRICS_ENABLED: bool = True
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.01
+    PROFILING_HEADER_ENABLED: bool = False
+    PROFILING_HEADER_SECRET: str = ""
+    PROFILING_MAX_PER_MINUTE: int = 6
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_MAX_STORED: int = 50
+    PROFILING_MAX_SECONDS: float = 30
+    RESERVATION_INDEX_ENABLED: bool = True
+    RESERVATION_INDEX_REFRESH_SECONDS: float = 300
+    BOOKING_MAX_ATTEMPTS: int = 3
+    BATCH_MAX_OCCURRENCES: int = 52
+    AVAILABILITY_INDEX_ENABLED: bool = True
+    AVAILABILITY_SLOT_MINUTES: int = 15
+    AVAILABILITY_HORIZON_DAYS: int = 90
+    AVAILABILITY_INDEX_REFRESH_SECONDS: float = 300
+    EXPORT_BATCH_SIZE: int = 1000
+    SERVER_CATALOG_CACHE_ENABLED: bool = True
+    SERVER_CATALOG_CACHE_TTL_SECONDS: int = 300
+    SERVER_CATALOG_CACHE_MAX_ENCODED: int = 64
+    GZIP_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    EVENTS_ENABLED: bool = True
+    EVENTS_BACKEND: str = "local"
+    EVENTS_SQLITE_PATH: str = "./events.db"
+    EVENTS_POLL_INTERVAL_SECONDS: float = 0.25
+    EVENTS_RETENTION_SECONDS: float = 300
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 15
+    EVENTS_TICKET_SECONDS: int = 30
+    ANALYTICS_ENABLED: bool = True
+    ANALYTICS_BATCH_SIZE: int = 100
+    ANALYTICS_MAX_HOURLY_DAYS: int = 31
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INTERVAL_SECONDS: int = 300
+    SCHEDULER_TIME_BUDGET_SECONDS: float = 2.0
+    SCHEDULER_AUTO_APPLY: bool = False
+    SCHEDULER_BUMP_PENALTY: float = 50.0
+    SCHEDULER_MOVE_PENALTY: float = 1.0
+    AI_PIPELINE_ENABLED: bool = True
+    AI_COMBINED_EXTRACTION: bool = True
+    AI_BATCH_JUDGE: bool = True
+    AI_JUDGE_CONCURRENCY: int = 4
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_PATH: str = "./ai_cache.db"
+    AI_CACHE_MAX_ENTRIES: int = 10000
+    AI_CACHE_TTL_SECONDS: int = 86400
+    AI_CACHE_PRIORITY_TTL_SECONDS: int = 30 * 86400
+    AI_CACHE_MEMORY_ENTRIES: int = 1024
+    AI_CACHE_TOUCH_FLUSH_SECONDS: float = 30.0
+    FAST_PARSER_ENABLED: bool = True
+    LLM_BACKEND: str = "gemini"
+    LLM_MODEL: str = "gemini-pro"
+    STUB_LLM_LATENCY_SECONDS: float = 0.0
+    STUB_LLM_JITTER_SECONDS: float = 0.0
+    STUB_LLM_FAILURE_RATE: float = 0.0
+    STUB_LLM_SEED: int = 0
+    AI_PIPELINE_WORKERS: int = 4
+    AI_PIPELINE_CLAIM_SECONDS: int = 300
+    AI_PIPELINE_RECOVERY_SECONDS: float = 60
+    LLM_RESILIENCE_ENABLED: bool = True
+    LLM_TIMEOUT_SECONDS: float = 10.0
+    LLM_DEADLINE_SECONDS: float = 20.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_BACKOFF_BASE_SECONDS: float = 0.5
+    LLM_BACKOFF_MAX_SECONDS: float = 4.0
+    LLM_RATE_LIMIT_PER_MINUTE: float = 60
+    LLM_RATE_LIMIT_BURST: int = 10
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,64 @@
+import gzip
+import hashlib
+from typing import Any, Dict, Optional
+import orjson
+from fastapi import Request, Response
+from app.utils.config import settings
+
+class EncodedBody:
+    """A JSON body encoded once, with its ETag and (lazily) its gzip form."""
+    
+    __slots__ = ("body", "etag", "_gzipped")
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._gzipped: Optional[bytes] = None
+    
+    @classmethod
+    def encode(cls, content: Any) -> "EncodedBody":
+        return cls(orjson.dumps(content))
+    
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=settings.GZIP_LEVEL)
+        return self._gzipped
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison: W/"x" matches "x".
+    return "*" in candidates or etag in (
+        candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates
+    )
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+def json_response(
+    request: Request,
+    content: Any = None,
+    encoded: Optional[EncodedBody] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serve JSON with an ETag, answering 304 when the client's copy is current.
+    
+    Bodies of at least GZIP_MIN_SIZE bytes are gzipped for clients that
+    accept it. Pass ``encoded`` to reuse a body cached by the caller.
+    """
+    encoded = encoded or EncodedBody.encode(content)
+    response_headers = {
+        "ETag": encoded.etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding, Authorization",
+        **(headers or {})
+    }
+    if _etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=response_headers)
+    body = encoded.body
+    if len(body) >= settings.GZIP_MIN_SIZE and _accepts_gzip(request):
+        body = encoded.gzipped
+        response_headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=response_headers)
\ No newline at end of file
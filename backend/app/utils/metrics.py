@@ -0,0 +1,182 @@
+import functools
+import inspect
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued while serving one request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries while serving one request",
+    ["method", "route"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by statement type",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+AI_CALL_LATENCY = Histogram(
+    "ai_call_duration_seconds",
+    "AIService call latency, including cache and fast-parser hits",
+    ["method", "outcome"],
+)
+CONFLICT_CHECKS = Counter(
+    "reservation_conflict_checks_total",
+    "Capacity conflict checks by result",
+    ["result"],
+)
+
+LLM_ATTEMPTS = Counter(
+    "llm_backend_attempts_total",
+    "LLM backend attempts by outcome, including calls refused by the rate limiter or breaker",
+    ["outcome"],
+)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK"}
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+    
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+_request_stats: ContextVar[Optional[_RequestStats]] = ContextVar("request_stats", default=None)
+_ai_fallback: ContextVar[Optional[List[bool]]] = ContextVar("ai_fallback", default=None)
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip()[:8].split(None, 1)
+    operation = word[0].upper() if word else ""
+    return operation if operation in _OPERATIONS else "OTHER"
+
+def instrument_engine(engine: Engine):
+    """Time every statement and attribute it to the current request, if any."""
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_LATENCY.labels(_operation(statement)).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+def record_ai_fallback():
+    flag = _ai_fallback.get()
+    if flag is not None:
+        flag[0] = True
+
+def timed_ai_call(method: str) -> Callable:
+    """Observe an AIService method, labelled "fallback" if it used a default."""
+    
+    def observe(started: float, flag: List[bool]):
+        outcome = "fallback" if flag[0] else "success"
+        AI_CALL_LATENCY.labels(method, outcome).observe(time.perf_counter() - started)
+    
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                flag = [False]
+                token = _ai_fallback.set(flag)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _ai_fallback.reset(token)
+                    observe(started, flag)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            flag = [False]
+            token = _ai_fallback.set(flag)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _ai_fallback.reset(token)
+                observe(started, flag)
+        return wrapper
+    
+    return decorator
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and DB usage per route template.
+    
+    Routes are labelled by their path template (``/api/reservations/{reservation_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self._templates: Dict[Callable, str] = {}
+    
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            template = next(
+                (
+                    route.path for route in scope["app"].routes
+                    if getattr(route, "endpoint", None) is endpoint
+                ),
+                "unmatched"
+            )
+            self._templates[endpoint] = template
+        return template
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = [500]
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            method = scope["method"]
+            route = self._route(scope)
+            REQUEST_LATENCY.labels(method, route, str(status[0])).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+
+def render_metrics() -> bytes:
+    # Under several worker processes, aggregate the per-process files instead.
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
\ No newline at end of file
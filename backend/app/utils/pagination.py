@@ -0,0 +1,15 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+def encode_cursor(start_time: datetime, reservation_id: int) -> str:
+    raw = f"{start_time.isoformat()}|{reservation_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        start_time, reservation_id = raw.split("|")
+        return datetime.fromisoformat(start_time), int(reservation_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("不正なカーソルです") from e
\ No newline at end of file
@@ -0,0 +1,358 @@
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.config import settings
+from app.utils.rate_limit import TokenBucket
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_current: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+Frame = Tuple[str, str, int]
+
+def _worker_context(frame) -> Optional[Context]:
+    # anyio's worker threads run each job as ``context.run(func, *args)``
+    # inside WorkerThread.run; that frame's ``context`` is the copy of the
+    # submitting request's context.
+    if frame.f_code.co_name == "run" and "anyio" in frame.f_code.co_filename:
+        context = frame.f_locals.get("context")
+        if isinstance(context, Context):
+            return context
+    return None
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of the threads currently serving one request.
+    
+    A thread counts while the request's own coroutine frame (``root``) is
+    on its stack, which on the event loop excludes concurrent requests, or
+    while it is a threadpool worker running a job submitted from the
+    request's context. Other threads, and stacks without a frame under
+    ``app/``, are dropped.
+    """
+    
+    def __init__(self, interval: float, session: "ProfileSession", root):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.session = session
+        self.root = root
+        self.samples: List[Tuple[int, float, Tuple[Frame, ...]]] = []
+        self._stop_event = threading.Event()
+    
+    def _serves_request(self, frame) -> bool:
+        while frame is not None:
+            if frame is self.root:
+                return True
+            context = _worker_context(frame)
+            if context is not None:
+                return context.get(_current) is self.session
+            frame = frame.f_back
+        return False
+    
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or not self._serves_request(frame):
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                    in_app = in_app or code.co_filename.startswith(_APP_ROOT)
+                    frame = frame.f_back
+                if in_app:
+                    self.samples.append((thread_id, now, tuple(reversed(stack))))
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class ProfileSession:
+    """State of one profiled request; finished at most once."""
+    
+    def __init__(self, profile_id: str, started: float):
+        self.profile_id = profile_id
+        self.started = started
+        self.statements: List[Tuple[str, float, float]] = []
+        self.sampler: Optional[_Sampler] = None
+        self.finished = False
+
+def _speedscope(
+    name: str,
+    started: float,
+    ended: float,
+    samples: List[Tuple[int, float, Tuple[Frame, ...]]],
+    statements: List[Tuple[str, float, float]],
+    interval: float
+) -> Dict[str, Any]:
+    frames: List[Dict[str, Any]] = []
+    frame_index: Dict[Frame, int] = {}
+    
+    def index(frame: Frame) -> int:
+        i = frame_index.get(frame)
+        if i is None:
+            i = frame_index[frame] = len(frames)
+            function, path, line = frame
+            frames.append({"name": function, "file": path, "line": line})
+        return i
+    
+    by_thread: Dict[int, List[Tuple[float, Tuple[Frame, ...]]]] = {}
+    for thread_id, at, stack in samples:
+        by_thread.setdefault(thread_id, []).append((at, stack))
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    
+    profiles = []
+    for thread_id, thread_samples in by_thread.items():
+        profiles.append({
+            "type": "sampled",
+            "name": f"{names.get(thread_id, 'thread')} ({thread_id})",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": ended - started,
+            "samples": [[index(frame) for frame in stack] for _, stack in thread_samples],
+            "weights": [interval] * len(thread_samples)
+        })
+    
+    if statements:
+        events = []
+        for statement, at, duration in statements:
+            frame = index((" ".join(statement.split())[:200], "sql", 0))
+            events.append({"type": "O", "frame": frame, "at": at - started})
+            events.append({"type": "C", "frame": frame, "at": at - started + duration})
+        profiles.append({
+            "type": "evented",
+            "name": "SQL",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": ended - started,
+            "events": events
+        })
+    
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "gpu-reservation-profiler",
+        "shared": {"frames": frames},
+        "profiles": profiles
+    }
+
+class RequestProfiler:
+    """Opt-in, rate-limited profiling of single requests.
+    
+    A request is profiled when it sends ``X-Profile: <PROFILING_HEADER_SECRET>``
+    (only with PROFILING_HEADER_ENABLED and a secret set) or when the admin
+    toggle is on and it wins the ``sample_rate`` draw. The middleware runs
+    before authentication, so the header is checked against the shared
+    secret rather than trusted. Header and sampled requests draw from
+    separate per-minute budgets, and only one request is profiled at a
+    time. Profiles are kept in memory per process.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.PROFILING_ENABLED
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self._budget = TokenBucket(
+            rate=settings.PROFILING_MAX_PER_MINUTE / 60,
+            capacity=settings.PROFILING_MAX_PER_MINUTE
+        )
+        self._header_budget = TokenBucket(
+            rate=settings.PROFILING_MAX_PER_MINUTE / 60,
+            capacity=settings.PROFILING_MAX_PER_MINUTE
+        )
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.skipped = 0
+    
+    def configure(self, enabled: bool, sample_rate: Optional[float] = None):
+        self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "header_enabled": self.header_enabled,
+            "max_per_minute": settings.PROFILING_MAX_PER_MINUTE,
+            "stored": len(self._profiles),
+            "skipped": self.skipped
+        }
+    
+    @property
+    def header_enabled(self) -> bool:
+        return settings.PROFILING_HEADER_ENABLED and bool(settings.PROFILING_HEADER_SECRET)
+    
+    def _header_requested(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if not self.header_enabled:
+            return False
+        secret = settings.PROFILING_HEADER_SECRET.encode()
+        return any(
+            key == PROFILE_HEADER and hmac.compare_digest(value, secret) for key, value in headers
+        )
+    
+    def wants(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if self._header_requested(headers):
+            budget = self._header_budget
+        elif self.enabled and random.random() < self.sample_rate:
+            budget = self._budget
+        else:
+            return False
+        if not budget.try_acquire():
+            self.skipped += 1
+            return False
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return False
+        return True
+    
+    def begin(self, profile_id: str, started: float, root) -> ProfileSession:
+        """Start sampling; ``root`` is the frame of the coroutine serving the request."""
+        session = ProfileSession(profile_id, started)
+        session.sampler = _Sampler(settings.PROFILING_INTERVAL_MS / 1000, session, root)
+        session.sampler.start()
+        return session
+    
+    def finish(
+        self,
+        session: ProfileSession,
+        method: str,
+        path: str,
+        status: int,
+        keep: bool = True,
+        truncated: bool = False
+    ):
+        """Stop sampling and store the profile (unless ``keep`` is False).
+        
+        Called again for an already finished session it does nothing, so a
+        request cut off at PROFILING_MAX_SECONDS can still call it when it ends.
+        """
+        if session.finished:
+            return
+        session.finished = True
+        try:
+            sampler = session.sampler
+            sampler.stop()
+            if not keep:
+                self.skipped += 1
+                return
+            ended = time.perf_counter()
+            statements = list(session.statements)
+            interval = settings.PROFILING_INTERVAL_MS / 1000
+            name = f"{method} {path}"
+            self._store(session.profile_id, {
+                "id": session.profile_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round((ended - session.started) * 1000, 2),
+                "truncated": truncated,
+                "samples": len(sampler.samples),
+                "sql_statements": len(statements),
+                "sql_ms": round(sum(duration for _, _, duration in statements) * 1000, 2),
+                "created_at": datetime.utcnow(),
+                "speedscope": _speedscope(
+                    name, session.started, ended, sampler.samples, statements, interval
+                )
+            })
+        finally:
+            self._busy.release()
+    
+    def _store(self, profile_id: str, profile: Dict[str, Any]):
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > settings.PROFILING_MAX_STORED:
+                self._profiles.popitem(last=False)
+    
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {key: value for key, value in profile.items() if key != "speedscope"}
+            for profile in reversed(profiles)
+        ]
+    
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+def capture_sql(engine: Engine):
+    """Record statements (and timings) issued while a profiled request runs."""
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        session = _current.get()
+        if session is not None and not session.finished:
+            conn.info["profile_query_start"] = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        session = _current.get()
+        started = conn.info.pop("profile_query_start", None)
+        if session is not None and not session.finished and started is not None:
+            session.statements.append((statement, started, time.perf_counter() - started))
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that profiles the requests RequestProfiler picks.
+    
+    Server-Sent Event streams are never profiled: they would hold the single
+    profiling slot for as long as the client stays connected. Any other
+    response is cut off after PROFILING_MAX_SECONDS.
+    """
+    
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.wants(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        
+        method, path = scope["method"], scope["path"]
+        status = [500]
+        session = self.profiler.begin(uuid.uuid4().hex[:12], time.perf_counter(), sys._getframe())
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                if any(
+                    key.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for key, value in headers
+                ):
+                    self.profiler.finish(session, method, path, status[0], keep=False)
+                else:
+                    message["headers"] = headers + [(PROFILE_ID_HEADER, session.profile_id.encode())]
+            await send(message)
+        
+        cutoff = asyncio.get_running_loop().call_later(
+            settings.PROFILING_MAX_SECONDS,
+            lambda: self.profiler.finish(session, method, path, status[0], truncated=True)
+        )
+        token = _current.set(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            cutoff.cancel()
+            self.profiler.finish(session, method, path, status[0])
+
+request_profiler = RequestProfiler()
\ No newline at end of file
@@ -0,0 +1,75 @@
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Literal, Optional, Type
+from pydantic import BaseModel
+from app.models import schemas
+
+ReservationView = Literal["full", "compact", "ids"]
+
+class ModelSerializer:
+    """Dumps ORM objects to dicts shaped like ``schema`` without validating them.
+    
+    The field list is read from the schema once and compiled into a single
+    attrgetter, so each row costs one C call plus a dict build instead of
+    a pydantic validation. Rows come from the database through the ORM, so
+    their types already match the schema; the output is meant for orjson,
+    which encodes datetimes and enums the same way pydantic's JSON mode does.
+    Nested objects are dumped once per call to many() and shared between
+    the rows that reference them.
+    """
+    
+    def __init__(self, schema: Type[BaseModel], nested: Optional[Dict[str, "ModelSerializer"]] = None):
+        self.schema = schema
+        self.nested = nested or {}
+        self.fields = tuple(name for name in schema.model_fields if name not in self.nested)
+        getter = attrgetter(*self.fields)
+        # attrgetter returns a bare value rather than a tuple for one field.
+        self._values = getter if len(self.fields) > 1 else lambda obj: (getter(obj),)
+    
+    def one(self, obj: Any, memo: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        row = dict(zip(self.fields, self._values(obj)))
+        for name, serializer in self.nested.items():
+            row[name] = serializer.shared(getattr(obj, name), memo)
+        return row
+    
+    def shared(self, obj: Any, memo: Optional[Dict[int, Dict[str, Any]]]) -> Dict[str, Any]:
+        if memo is None:
+            return self.one(obj)
+        # The session's identity map hands out one object per row, so id() is stable here.
+        row = memo.get(id(obj))
+        if row is None:
+            row = memo[id(obj)] = self.one(obj, memo)
+        return row
+    
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        memo: Dict[int, Dict[str, Any]] = {}
+        return [self.one(obj, memo) for obj in objs]
+
+user_serializer = ModelSerializer(schemas.User)
+server_serializer = ModelSerializer(schemas.GPUServer)
+reservation_serializer = ModelSerializer(
+    schemas.Reservation,
+    nested={"user": user_serializer, "server": server_serializer}
+)
+reservation_summary_serializer = ModelSerializer(schemas.ReservationSummary)
+user_summary_serializer = ModelSerializer(schemas.UserSummary)
+server_summary_serializer = ModelSerializer(schemas.GPUServerSummary)
+
+def serialize_reservations(reservations: List[Any], view: ReservationView = "full") -> Any:
+    """Reservation list in the given view.
+    
+    ``full`` is List[schemas.Reservation]. ``compact`` is a
+    schemas.ReservationPage whose users and servers appear once each in side
+    tables; ``ids`` is the same page without the side tables.
+    """
+    if view == "full":
+        return reservation_serializer.many(reservations)
+    page = {"reservations": reservation_summary_serializer.many(reservations)}
+    if view == "compact":
+        users = {reservation.user_id: reservation.user for reservation in reservations}
+        servers = {reservation.server_id: reservation.server for reservation in reservations}
+        page["users"] = user_summary_serializer.many(users.values())
+        page["servers"] = server_summary_serializer.many(servers.values())
+    else:
+        page["users"] = []
+        page["servers"] = []
+    return page
\ No newline at end of file
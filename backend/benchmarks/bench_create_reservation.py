@@ -0,0 +1,64 @@
+"""Model calls and wall time per ReservationService.create_reservation.
+
+Runs the synchronous booking path against an in-memory SQLite database with
+the stub LLM backend sleeping for a fixed latency, once with the two-call
+parse + priority path and once with the combined extraction call.
+
+    cd backend && python -m benchmarks.bench_create_reservation --requests 50 --latency 0.2
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["AI_CACHE_ENABLED"] = "false"
+
+from app.models import models, schemas
+from app.models.database import Base, SessionLocal, engine
+from app.services.llm_backend import StubBackend
+from app.services.reservation_service import ReservationService
+from app.utils.config import settings
+
+def run(combined: bool, requests: int, latency: float, servers: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    settings.AI_COMBINED_EXTRACTION = combined
+    settings.RESERVATION_INDEX_ENABLED = False
+    random.seed(0)
+    
+    db = SessionLocal()
+    user = models.User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.add_all(models.GPUServer(name=f"gpu-{i}", gpu_count=8) for i in range(servers))
+    db.commit()
+    
+    service = ReservationService()
+    backend = StubBackend(latency=latency)
+    service.ai_service.backend = backend
+    
+    started = time.perf_counter()
+    for i in range(requests):
+        service.create_reservation(
+            db, user.id, schemas.ReservationCreate(natural_language_request=f"学習 {random.random()}")
+        )
+    elapsed = time.perf_counter() - started
+    db.close()
+    return backend.calls / requests, elapsed / requests * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated model latency (s)")
+    parser.add_argument("--servers", type=int, default=4)
+    args = parser.parse_args()
+    
+    print(f"{'mode':<10} {'model calls/req':>16} {'wall ms/req':>12}")
+    for label, combined in (("two-call", False), ("combined", True)):
+        calls, wall_ms = run(combined, args.requests, args.latency, args.servers)
+        print(f"{label:<10} {calls:>16.2f} {wall_ms:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Serialization throughput for reservation list responses.
+
+Loads N reservations (with their users and servers) from an in-memory SQLite
+database once, then times each way of turning them into a JSON body:
+
+    pydantic+json   TypeAdapter(List[Reservation]) validate + dump, stdlib json
+                    (the previous response_model path)
+    pydantic+orjson the same validation, encoded with orjson
+    full            app.utils.serializers, same payload as above, orjson
+    compact         slim rows plus deduplicated user/server side tables
+    ids             slim rows only
+
+    cd backend && python -m benchmarks.bench_serialization --sizes 100 10000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.orm import joinedload
+
+from app.models import models, schemas
+from app.models.database import Base, SessionLocal, engine
+from app.utils.serializers import serialize_reservations
+
+adapter = TypeAdapter(List[schemas.Reservation])
+
+def pydantic_json(reservations) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(reservations, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def pydantic_orjson(reservations) -> bytes:
+    return orjson.dumps(adapter.dump_python(adapter.validate_python(reservations, from_attributes=True)))
+
+ENCODERS = {
+    "pydantic+json": pydantic_json,
+    "pydantic+orjson": pydantic_orjson,
+    "full": lambda reservations: orjson.dumps(serialize_reservations(reservations, "full")),
+    "compact": lambda reservations: orjson.dumps(serialize_reservations(reservations, "compact")),
+    "ids": lambda reservations: orjson.dumps(serialize_reservations(reservations, "ids"))
+}
+
+def seed(size: int, users: int, servers: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    random.seed(0)
+    
+    db = SessionLocal()
+    db.add_all(
+        models.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x")
+        for i in range(users)
+    )
+    db.add_all(models.GPUServer(name=f"gpu-{i}", gpu_type="A100", gpu_count=8) for i in range(servers))
+    db.flush()
+    base = datetime(2024, 1, 1)
+    statuses = list(models.ReservationStatus)
+    for i in range(size):
+        start = base + timedelta(hours=random.randrange(24 * 365))
+        db.add(models.Reservation(
+            user_id=random.randrange(users) + 1,
+            server_id=random.randrange(servers) + 1,
+            natural_language_request=f"明日{i % 24}時から2時間 学習ジョブ",
+            purpose="学習ジョブ",
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+            gpu_count=random.choice((1, 2, 4, 8)),
+            priority_score=random.randrange(101),
+            status=random.choice(statuses),
+            ai_judgment_reason="締め切りが近い研究のため優先度高"
+        ))
+    db.commit()
+    db.close()
+
+def load(size: int):
+    db = SessionLocal()
+    reservations = db.query(models.Reservation).options(
+        joinedload(models.Reservation.user),
+        joinedload(models.Reservation.server)
+    ).order_by(models.Reservation.start_time, models.Reservation.id).limit(size).all()
+    return db, reservations
+
+def measure(encode: Callable, reservations, min_time: float) -> float:
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        encode(reservations)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / runs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--servers", type=int, default=8)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to repeat each case")
+    args = parser.parse_args()
+    
+    seed(max(args.sizes), args.users, args.servers)
+    for size in args.sizes:
+        db, reservations = load(size)
+        # The fast path must produce the exact body the pydantic path does.
+        assert ENCODERS["full"](reservations) == ENCODERS["pydantic+orjson"](reservations)
+        assert orjson.loads(ENCODERS["full"](reservations)) == json.loads(ENCODERS["pydantic+json"](reservations))
+        
+        print(f"\n{len(reservations)} reservations")
+        print(f"{'encoder':<16} {'ms/list':>10} {'rows/s':>12} {'bytes':>10} {'speedup':>8}")
+        baseline = None
+        for label, encode in ENCODERS.items():
+            per_call = measure(encode, reservations, args.min_time)
+            baseline = baseline or per_call
+            print(
+                f"{label:<16} {per_call * 1000:>10.2f} {len(reservations) / per_call:>12,.0f} "
+                f"{len(encode(reservations)):>10,} {baseline / per_call:>7.1f}x"
+            )
+        db.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Concurrent booking load test against /api/reservations.
+
+Drives POST /api/reservations/ with an asyncio + httpx client and reports
+p50/p95/p99 latency, throughput and errors. Without --url the app is served
+in-process over ASGI with the stub LLM backend and a fresh SQLite database,
+so it runs fully offline:
+
+    cd backend && python -m benchmarks.load_reservations --requests 2000 --concurrency 200 --latency 0.3
+
+With --url it targets a running server instead (which should itself be
+started with LLM_BACKEND=stub to stay offline). --wait also long-polls the
+status endpoint and reports the time until each booking was judged.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def summary(label: str, values: List[float]) -> str:
+    return "{:<10} p50 {:>8.1f} ms  p95 {:>8.1f} ms  p99 {:>8.1f} ms  max {:>8.1f} ms".format(
+        label,
+        percentile(values, 50) * 1000,
+        percentile(values, 95) * 1000,
+        percentile(values, 99) * 1000,
+        max(values, default=0.0) * 1000
+    )
+
+async def register(client: httpx.AsyncClient, username: str, role: str = "user") -> dict:
+    password = "loadtest"
+    response = await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password,
+        "role": role
+    })
+    response.raise_for_status()
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def setup(client: httpx.AsyncClient, args) -> List[dict]:
+    run_id = uuid.uuid4().hex[:8]
+    admin = await register(client, f"load-admin-{run_id}", role="admin")
+    for i in range(args.servers):
+        response = await client.post("/api/servers/", headers=admin, json={
+            "name": f"load-{run_id}-{i}",
+            "gpu_type": "A100",
+            "gpu_count": 8
+        })
+        response.raise_for_status()
+    return [await register(client, f"load-user-{run_id}-{i}") for i in range(args.users)]
+
+async def book(
+    client: httpx.AsyncClient,
+    headers: dict,
+    text: str,
+    wait: bool,
+    results: dict
+):
+    started = time.perf_counter()
+    try:
+        response = await client.post("/api/reservations/", headers=headers, json={
+            "natural_language_request": text
+        })
+    except httpx.HTTPError as e:
+        results["errors"][type(e).__name__] += 1
+        return
+    results["post"].append(time.perf_counter() - started)
+    results["status"][response.status_code] += 1
+    if response.status_code >= 400:
+        return
+    
+    reservation_id = response.json()["id"]
+    while wait:
+        try:
+            status_response = await client.get(
+                f"/api/reservations/{reservation_id}/status", headers=headers, params={"wait": 25}
+            )
+        except httpx.HTTPError as e:
+            results["errors"][type(e).__name__] += 1
+            return
+        if status_response.status_code != 200:
+            results["errors"][f"status {status_response.status_code}"] += 1
+            return
+        body = status_response.json()
+        if not body["processing"]:
+            results["done"].append(time.perf_counter() - started)
+            results["outcome"][body["reservation"]["status"]] += 1
+            return
+
+async def drive(client: httpx.AsyncClient, args) -> dict:
+    users = await setup(client, args)
+    results = {
+        "post": [],
+        "done": [],
+        "status": Counter(),
+        "outcome": Counter(),
+        "errors": Counter()
+    }
+    semaphore = asyncio.Semaphore(args.concurrency)
+    
+    async def one(i: int):
+        async with semaphore:
+            await book(client, users[i % len(users)], f"負荷試験ジョブ {i}", args.wait, results)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    results["elapsed"] = time.perf_counter() - started
+    return results
+
+async def run_in_process(args) -> dict:
+    from app.main import app
+    
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await drive(client, args)
+    finally:
+        await app.router.shutdown()
+
+async def run_remote(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await drive(client, args)
+
+def configure_in_process(args):
+    os.environ.setdefault("GEMINI_API_KEY", "loadtest")
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["STUB_LLM_JITTER_SECONDS"] = str(args.jitter)
+    os.environ["STUB_LLM_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["AI_CACHE_ENABLED"] = "false"
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.database}"
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(args.database + suffix):
+            os.remove(args.database + suffix)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--servers", type=int, default=8)
+    parser.add_argument("--wait", action="store_true", help="long-poll until each booking is judged")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency (in-process only)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="stub LLM jitter (in-process only)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="stub LLM failure rate (in-process only)")
+    parser.add_argument("--database", default="./loadtest.db", help="SQLite file (in-process only)")
+    args = parser.parse_args(argv)
+    
+    if args.url:
+        results = asyncio.run(run_remote(args))
+    else:
+        configure_in_process(args)
+        results = asyncio.run(run_in_process(args))
+    
+    completed = len(results["post"])
+    print(f"requests   {args.requests}  concurrency {args.concurrency}  elapsed {results['elapsed']:.2f} s")
+    print(f"throughput {completed / results['elapsed']:.1f} req/s")
+    print(summary("POST", results["post"]))
+    if args.wait:
+        print(summary("judged", results["done"]))
+        print("outcome    " + ", ".join(f"{k}: {v}" for k, v in sorted(results["outcome"].items())))
+    print("status     " + ", ".join(f"{k}: {v}" for k, v in sorted(results["status"].items())))
+    if results["errors"]:
+        print("errors     " + ", ".join(f"{k}: {v}" for k, v in results["errors"].most_common()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["AI_CACHE_ENABLED"] = "false"
+os.environ["EVENTS_BACKEND"] = "local"
+os.environ["LLM_BACKEND"] = "stub"
+
+import pytest
+from app.models.database import Base, SessionLocal, engine
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
\ No newline at end of file
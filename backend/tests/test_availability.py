@@ -0,0 +1,62 @@
+from datetime import timedelta
+import pytest
+from app.services.availability import AvailabilityIndex
+
+def test_late_older_event_does_not_revive_removed_reservation(db):
+    index = AvailabilityIndex(slot_minutes=60, horizon_days=2)
+    index.rebuild(db)
+    start, _ = index.horizon()
+    start += timedelta(hours=10)
+    end = start + timedelta(hours=2)
+    
+    index.apply(1, 3, None)
+    index.apply(1, 2, (1, start, end, 4))
+    assert index.free_slots([1], [4], start, end, gpu_count=4) == {1: [(start, end)]}
+
+@pytest.fixture
+def grid(db):
+    index = AvailabilityIndex(slot_minutes=60, horizon_days=2)
+    index.rebuild(db)
+    return index
+
+def at(index, hour):
+    return index.horizon()[0] + timedelta(hours=hour)
+
+def test_free_slots_leave_out_full_slots(grid):
+    grid.apply(1, 1, (1, at(grid, 10), at(grid, 12), 4))
+    assert grid.free_slots([1], [4], at(grid, 8), at(grid, 14)) == {
+        1: [(at(grid, 8), at(grid, 10)), (at(grid, 12), at(grid, 14))]
+    }
+
+def test_free_slots_count_gpus(grid):
+    grid.apply(1, 1, (1, at(grid, 10), at(grid, 12), 2))
+    assert grid.free_slots([1], [4], at(grid, 8), at(grid, 14), gpu_count=2) == {1: [(at(grid, 8), at(grid, 14))]}
+    assert grid.free_slots([1], [4], at(grid, 8), at(grid, 14), gpu_count=3) == {
+        1: [(at(grid, 8), at(grid, 10)), (at(grid, 12), at(grid, 14))]
+    }
+
+def test_partial_slots_count_as_busy(grid):
+    grid.apply(1, 1, (1, at(grid, 10.5), at(grid, 11), 1))
+    assert grid.free_slots([1], [1], at(grid, 9), at(grid, 12)) == {
+        1: [(at(grid, 9), at(grid, 10)), (at(grid, 11), at(grid, 12))]
+    }
+
+def test_unknown_server_is_free(grid):
+    assert grid.free_slots([7], [1], at(grid, 9), at(grid, 12)) == {7: [(at(grid, 9), at(grid, 12))]}
+
+def test_removal_frees_slots(grid):
+    grid.apply(1, 1, (1, at(grid, 10), at(grid, 12), 1))
+    grid.apply(1, 2, None)
+    assert grid.free_slots([1], [1], at(grid, 10), at(grid, 12)) == {1: [(at(grid, 10), at(grid, 12))]}
+
+def test_first_fit_finds_earliest_window(grid):
+    grid.apply(1, 1, (1, at(grid, 8), at(grid, 12), 1))
+    grid.apply(2, 1, (2, at(grid, 8), at(grid, 10), 1))
+    assert grid.first_fit([1, 2], [1, 1], at(grid, 8), at(grid, 20), timedelta(hours=2)) == (2, at(grid, 10))
+    assert grid.first_fit([1], [1], at(grid, 8), at(grid, 20), timedelta(hours=2)) == (1, at(grid, 12))
+
+def test_first_fit_needs_whole_window(grid):
+    grid.apply(1, 1, (1, at(grid, 9), at(grid, 10), 1))
+    grid.apply(2, 1, (1, at(grid, 11), at(grid, 12), 1))
+    assert grid.first_fit([1], [1], at(grid, 8), at(grid, 12), timedelta(hours=2)) is None
+    assert grid.first_fit([1], [2], at(grid, 8), at(grid, 12), timedelta(hours=2)) == (1, at(grid, 8))
\ No newline at end of file
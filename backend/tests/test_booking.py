@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import models
+from app.services.reservation_service import (
+    BookingChangedError,
+    ReservationService,
+    StaleReservationError
+)
+from app.utils.config import settings
+
+START = datetime(2099, 1, 1, 10, 0)
+END = START + timedelta(hours=2)
+
+WIN = {"recommend_new": True, "reason": "新しい予約を優先"}
+LOSE = {"recommend_new": False, "reason": "既存の予約を優先"}
+
+@pytest.fixture
+def service():
+    return ReservationService()
+
+@pytest.fixture
+def server(db):
+    db.add(models.User(username="user", email="user@example.com", hashed_password="x"))
+    server = models.GPUServer(name="gpu-01", gpu_type="A100", gpu_count=1)
+    db.add(server)
+    db.commit()
+    return server
+
+def reserve(db, server, status=models.ReservationStatus.PENDING):
+    reservation = models.Reservation(
+        user_id=1,
+        server_id=server.id,
+        natural_language_request="学習",
+        purpose="学習",
+        start_time=START,
+        end_time=END,
+        status=status
+    )
+    db.add(reservation)
+    db.commit()
+    return reservation
+
+def test_no_conflicts_confirms(db, server, service):
+    new = reserve(db, server)
+    service.apply_judgments(db, new, [], [])
+    assert new.status == models.ReservationStatus.CONFIRMED
+
+def test_winning_judgment_marks_existing_for_rejection(db, server, service):
+    existing = reserve(db, server, models.ReservationStatus.CONFIRMED)
+    new = reserve(db, server)
+    service.apply_judgments(db, new, [existing], [(existing, WIN)])
+    assert existing.status == models.ReservationStatus.PENDING_REJECTION
+    assert new.status == models.ReservationStatus.PENDING
+    assert [c.conflicting_reservation_id for c in new.conflicts] == [existing.id]
+
+def test_losing_judgment_rejects_new(db, server, service):
+    existing = reserve(db, server, models.ReservationStatus.CONFIRMED)
+    new = reserve(db, server)
+    service.apply_judgments(db, new, [existing], [(existing, LOSE)])
+    assert existing.status == models.ReservationStatus.CONFIRMED
+    assert new.status == models.ReservationStatus.REJECTED
+
+def test_changed_conflicts_raise_with_fresh_set(db, server, service):
+    existing = reserve(db, server, models.ReservationStatus.CONFIRMED)
+    new = reserve(db, server)
+    # Judged before ``existing`` was visible.
+    with pytest.raises(BookingChangedError) as raised:
+        service.apply_judgments(db, new, [], [])
+    assert [c.id for c in raised.value.conflicts] == [existing.id]
+    assert new.status == models.ReservationStatus.PENDING
+    assert new.conflicts == []
+
+def test_changed_conflicts_are_judged_again(db, server, service, monkeypatch):
+    existing = reserve(db, server, models.ReservationStatus.CONFIRMED)
+    new = reserve(db, server)
+    judged = []
+    
+    def judge_conflicts(reservation, conflicts):
+        judged.append([c.id for c in conflicts])
+        return [LOSE for _ in conflicts]
+    
+    monkeypatch.setattr(service.ai_service, "judge_conflicts", judge_conflicts)
+    service._handle_conflicts(db, new, [], [])
+    assert judged == [[existing.id]]
+    assert new.status == models.ReservationStatus.REJECTED
+
+def test_gives_up_after_max_attempts(db, server, service, monkeypatch):
+    new = reserve(db, server)
+    attempts = []
+    
+    def apply_judgments(db, reservation, conflicts, judgments):
+        attempts.append(1)
+        raise BookingChangedError([])
+    
+    monkeypatch.setattr(service, "apply_judgments", apply_judgments)
+    with pytest.raises(StaleReservationError):
+        service._handle_conflicts(db, new, [], [])
+    assert len(attempts) == settings.BOOKING_MAX_ATTEMPTS
\ No newline at end of file
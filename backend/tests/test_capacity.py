@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+from app.services.interval_index import capacity_conflicts, peak_demand
+
+T0 = datetime(2099, 1, 1, 10, 0)
+
+def hours(n: float) -> datetime:
+    return T0 + timedelta(hours=n)
+
+def test_peak_demand_sums_overlapping_intervals():
+    intervals = [(1, hours(0), hours(4), 2), (2, hours(1), hours(3), 3), (3, hours(2), hours(5), 1)]
+    assert peak_demand(intervals, hours(0), hours(5)) == 6
+    assert peak_demand(intervals, hours(3), hours(5)) == 3
+
+def test_back_to_back_intervals_do_not_overlap():
+    intervals = [(1, hours(0), hours(2), 4), (2, hours(2), hours(4), 4)]
+    assert peak_demand(intervals, hours(0), hours(4)) == 4
+    assert capacity_conflicts(intervals, hours(0), hours(4), 4, 8) == set()
+
+def test_window_edges_are_exclusive():
+    intervals = [(1, hours(0), hours(2), 8)]
+    assert peak_demand(intervals, hours(2), hours(3)) == 0
+    assert capacity_conflicts(intervals, hours(2), hours(3), 8, 8) == set()
+
+def test_empty_window_has_no_demand():
+    assert peak_demand([], hours(0), hours(1)) == 0
+
+def test_capacity_conflicts_only_where_capacity_is_exceeded():
+    intervals = [(1, hours(0), hours(2), 4), (2, hours(1), hours(3), 2), (3, hours(3), hours(4), 4)]
+    # 4 + 2 + 3 > 8 only while 1 and 2 overlap; 4 + 3 fits at hours 3-4.
+    assert capacity_conflicts(intervals, hours(0), hours(4), 3, 8) == {1, 2}
+    assert capacity_conflicts(intervals, hours(0), hours(4), 5, 8) == {1, 2, 3}
+    assert capacity_conflicts(intervals, hours(0), hours(4), 2, 8) == set()
\ No newline at end of file
@@ -0,0 +1,23 @@
+from datetime import datetime
+import pytest
+from app.services.fast_parser import FastParser, take_gpu_count
+
+NOW = datetime(2024, 5, 1, 9, 0)
+
+@pytest.mark.parametrize("text, count", [
+    ("A100 GPUで学習", None),
+    ("V100 GPU", None),
+    ("h100 gpu", None),
+    ("GPU 2枚", 2),
+    ("2 GPUs", 2),
+    ("8GPU", 8),
+    ("A100 GPU 4枚", 4),
+    ("4枚のGPU", 4),
+])
+def test_take_gpu_count(text, count):
+    assert take_gpu_count(text)[0] == count
+
+def test_model_number_is_not_a_gpu_count():
+    result = FastParser().parse("明日10時から4時間 A100 GPUで学習", ["gpu-a100-01"], NOW)
+    assert result["gpu_count"] == 1
+    assert result["server_preference"] == "A100"
\ No newline at end of file
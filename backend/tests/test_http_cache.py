@@ -0,0 +1,43 @@
+import gzip
+from starlette.requests import Request
+from app.utils.config import settings
+from app.utils.http_cache import EncodedBody, json_response
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+def test_etag_is_stable_for_same_body():
+    assert EncodedBody.encode({"a": 1}).etag == EncodedBody.encode({"a": 1}).etag
+    assert EncodedBody.encode({"a": 1}).etag != EncodedBody.encode({"a": 2}).etag
+
+def test_first_request_gets_body_and_etag():
+    response = json_response(request(), {"a": 1})
+    assert response.status_code == 200
+    assert response.body == b'{"a":1}'
+    assert response.headers["etag"] == EncodedBody.encode({"a": 1}).etag
+
+def test_matching_etag_answers_304():
+    etag = EncodedBody.encode({"a": 1}).etag
+    for header in (etag, "W/" + etag, '"other", ' + etag, "*"):
+        response = json_response(request(if_none_match=header), {"a": 1})
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == etag
+
+def test_stale_etag_gets_new_body():
+    etag = EncodedBody.encode({"a": 1}).etag
+    response = json_response(request(if_none_match=etag), {"a": 2})
+    assert response.status_code == 200
+    assert response.body == b'{"a":2}'
+
+def test_large_bodies_are_gzipped_when_accepted():
+    content = ["x" * settings.GZIP_MIN_SIZE]
+    response = json_response(request(accept_encoding="gzip, br"), content)
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == EncodedBody.encode(content).body
+    assert "content-encoding" not in json_response(request(), content).headers
\ No newline at end of file
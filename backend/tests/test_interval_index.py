@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from app.services import interval_index
+from app.services.interval_index import ReservationIndex
+
+START = datetime(2099, 1, 1, 10, 0)
+END = START + timedelta(hours=2)
+
+def test_late_older_event_does_not_revive_removed_reservation():
+    index = ReservationIndex()
+    index.apply(1, 3, None)
+    index.apply(1, 2, (1, START, END, 1))
+    assert index.find_conflicts(1, START, END) == []
+    assert index.intervals(1, START, END) == []
+
+def test_newer_change_replaces_older():
+    index = ReservationIndex()
+    index.apply(1, 1, (1, START, END, 1))
+    index.apply(1, 2, (2, START, END, 4))
+    assert index.find_conflicts(1, START, END) == []
+    assert index.intervals(2, START, END) == [(1, START, END, 4)]
+
+def test_older_change_is_ignored():
+    index = ReservationIndex()
+    index.apply(1, 2, (1, START, END, 2))
+    index.apply(1, 1, (1, START, END + timedelta(hours=1), 8))
+    assert index.intervals(1, START, END) == [(1, START, END, 2)]
+
+def test_tombstone_survives_next_rebuild_only():
+    index = ReservationIndex()
+    index.apply(1, 3, None)
+    index._replace({}, None)
+    index.apply(1, 2, (1, START, END, 1))
+    assert index.intervals(1, START, END) == []
+    index._replace({}, None)
+    index.apply(1, 2, (1, START, END, 1))
+    assert index.intervals(1, START, END) == [(1, START, END, 1)]
+
+def test_changes_during_rebuild_are_replayed(db, monkeypatch):
+    index = ReservationIndex()
+    stale = {1: ((1, START, END, 1), 1), 2: ((1, START, END, 1), 1)}
+    
+    def load_active(db, since):
+        # Other workers commit while the rows are being read.
+        index.apply(1, 2, None)
+        index.apply(3, 1, (1, START, END, 2))
+        return dict(stale)
+    
+    monkeypatch.setattr(interval_index, "load_active", load_active)
+    index.rebuild(db)
+    assert sorted(index.intervals(1, START, END)) == [(2, START, END, 1), (3, START, END, 2)]
+    index.apply(1, 1, (1, START, END, 1))
+    assert index.find_conflicts(1, START, END) == [2, 3]
\ No newline at end of file
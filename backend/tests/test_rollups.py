@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import models
+from app.services.analytics import RollupUpdater
+
+START = datetime(2099, 1, 1, 22, 0)
+
+@pytest.fixture
+def updater():
+    return RollupUpdater()
+
+@pytest.fixture
+def reservation(db):
+    db.add(models.User(username="user", email="user@example.com", hashed_password="x"))
+    db.add(models.GPUServer(name="gpu-01", gpu_type="A100", gpu_count=8))
+    reservation = models.Reservation(
+        user_id=1,
+        server_id=1,
+        natural_language_request="学習",
+        purpose="モデルの学習",
+        start_time=START,
+        end_time=START + timedelta(hours=4),
+        gpu_count=2,
+        priority_score=70,
+        status=models.ReservationStatus.PENDING
+    )
+    db.add(reservation)
+    db.commit()
+    return reservation
+
+def rollups(db, granularity="day", dimension="server"):
+    rollup = models.UtilizationRollup
+    return {
+        row.bucket_start: (row.gpu_hours, row.reservations, row.confirmed, row.cancelled, row.priority_sum)
+        for row in db.query(rollup).filter(rollup.granularity == granularity, rollup.dimension == dimension)
+    }
+
+def test_new_reservation_is_counted_once(db, updater, reservation):
+    updater.apply(db, [reservation.id])
+    updater.apply(db, [reservation.id])
+    assert rollups(db) == {START.replace(hour=0): (0.0, 1, 0, 0, 70)}
+
+def test_confirmed_gpu_hours_spread_over_buckets(db, updater, reservation):
+    updater.apply(db, [reservation.id])
+    reservation.status = models.ReservationStatus.CONFIRMED
+    db.commit()
+    updater.apply(db, [reservation.id])
+    # 22:00-02:00 with 2 GPUs: 4 GPU-hours on each day.
+    assert rollups(db) == {
+        START.replace(hour=0): (4.0, 1, 1, 0, 70),
+        START.replace(hour=0) + timedelta(days=1): (4.0, 0, 0, 0, 0)
+    }
+    hourly = rollups(db, "hour")
+    assert len(hourly) == 4
+    assert all(gpu_hours == 2.0 for gpu_hours, *_ in hourly.values())
+
+def test_status_change_moves_counts(db, updater, reservation):
+    reservation.status = models.ReservationStatus.CONFIRMED
+    db.commit()
+    updater.apply(db, [reservation.id])
+    reservation.status = models.ReservationStatus.CANCELLED
+    db.commit()
+    updater.apply(db, [reservation.id])
+    assert rollups(db) == {
+        START.replace(hour=0): (0.0, 1, 0, 1, 70),
+        START.replace(hour=0) + timedelta(days=1): (0.0, 0, 0, 0, 0)
+    }
+
+def test_rebuild_matches_incremental(db, updater, reservation):
+    reservation.status = models.ReservationStatus.CONFIRMED
+    db.commit()
+    updater.apply(db, [reservation.id])
+    incremental = rollups(db)
+    assert not updater.needs_rebuild(db)
+    assert updater.rebuild(db) == 1
+    assert rollups(db) == incremental
+    assert updater.rebuild(db, only_if_needed=True) is None
\ No newline at end of file
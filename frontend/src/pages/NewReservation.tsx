@@ -17,9 +17,10 @@ const NewReservation: React.FC = () => {
     setLoading(true);
 
     try {
-      await reservationAPI.createReservation({
+      const created = await reservationAPI.createReservation({
         natural_language_request: request,
       });
+      await reservationAPI.waitForReservation(created.id);
       setSuccess(true);
       setTimeout(() => navigate('/reservations'), 2000);
     } catch (err: any) {
@@ -10,6 +10,9 @@ const PendingRejections: React.FC = () => {
 
   useEffect(() => {
     fetchPendingRejections();
+    return reservationAPI.subscribeEvents(() => {
+      fetchPendingRejections();
+    });
   }, []);
 
   const fetchPendingRejections = async () => {
@@ -23,15 +26,21 @@ const PendingRejections: React.FC = () => {
     }
   };
 
-  const handleConfirmRejection = async (id: number, confirm: boolean) => {
+  const handleConfirmRejection = async (reservation: Reservation, confirm: boolean) => {
     try {
-      await reservationAPI.confirmRejection(id, {
+      await reservationAPI.confirmRejection(reservation.id, {
         confirm,
         reason: confirm ? 'ユーザーが承認しました' : 'ユーザーが拒否しました',
+        version: reservation.version,
       });
       await fetchPendingRejections();
-    } catch (err) {
-      alert('処理に失敗しました');
+    } catch (err: any) {
+      if (err.response?.status === 409) {
+        alert('予約が他の操作で更新されました。最新の状態を表示します');
+        await fetchPendingRejections();
+      } else {
+        alert('処理に失敗しました');
+      }
     }
   };
 
@@ -86,13 +95,13 @@ const PendingRejections: React.FC = () => {
               <div className="action-buttons">
                 <button
                   className="btn btn-danger"
-                  onClick={() => handleConfirmRejection(reservation.id, true)}
+                  onClick={() => handleConfirmRejection(reservation, true)}
                 >
                   キャンセルを承認
                 </button>
                 <button
                   className="btn btn-secondary"
-                  onClick={() => handleConfirmRejection(reservation.id, false)}
+                  onClick={() => handleConfirmRejection(reservation, false)}
                 >
                   キャンセルを拒否
                 </button>
@@ -94,6 +94,11 @@ const Reservations: React.FC = () => {
                   <p>{new Date(reservation.end_time).toLocaleString()}</p>
                 </div>
                 
+                <div className="detail-item">
+                  <strong>GPU数:</strong>
+                  <p>{reservation.gpu_count}</p>
+                </div>
+                
                 <div className="detail-item">
                   <strong>優先度スコア:</strong>
                   <p>{reservation.priority_score}</p>
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { LoginResponse, User, Reservation, ReservationCreate, ReservationConfirmRejection, GPUServer } from '../types';
+import { LoginResponse, User, Reservation, ReservationCreate, ReservationConfirmRejection, ReservationProcessingStatus, ReservationEvent, StreamTicket, GPUServer } from '../types';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
@@ -67,6 +67,13 @@ export const reservationAPI = {
     return response.data;
   },
 
+  waitForReservation: async (id: number, wait: number = 25): Promise<ReservationProcessingStatus> => {
+    const response = await api.get<ReservationProcessingStatus>(`/api/reservations/${id}/status`, {
+      params: { wait },
+    });
+    return response.data;
+  },
+
   cancelReservation: async (id: number): Promise<void> => {
     await api.delete(`/api/reservations/${id}`);
   },
@@ -75,6 +82,41 @@ export const reservationAPI = {
     const response = await api.post<Reservation>(`/api/reservations/${id}/confirm-rejection`, data);
     return response.data;
   },
+
+  // EventSource cannot send the Authorization header, so each connection
+  // opens with a short-lived ticket instead of the access token.
+  subscribeEvents: (onEvent: (event: ReservationEvent) => void): (() => void) => {
+    let source: EventSource | null = null;
+    let closed = false;
+    const handle = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+    const connect = async () => {
+      let ticket: StreamTicket;
+      try {
+        const response = await api.post<StreamTicket>('/api/reservations/events/ticket');
+        ticket = response.data;
+      } catch (err) {
+        if (!closed) setTimeout(connect, 3000);
+        return;
+      }
+      if (closed) return;
+      source = new EventSource(
+        `${API_URL}/api/reservations/events?ticket=${encodeURIComponent(ticket.ticket)}`
+      );
+      source.addEventListener('reservation', handle as EventListener);
+      source.addEventListener('resync', handle as EventListener);
+      source.onerror = () => {
+        // The browser retries with the same URL, whose ticket may have expired.
+        if (closed) return;
+        source?.close();
+        setTimeout(connect, 3000);
+      };
+    };
+    connect();
+    return () => {
+      closed = true;
+      source?.close();
+    };
+  },
 };
 
 export const serverAPI = {
@@ -11,6 +11,11 @@ export interface LoginResponse {
   token_type: string;
 }
 
+export interface StreamTicket {
+  ticket: string;
+  expires_in: number;
+}
+
 export interface GPUServer {
   id: number;
   name: string;
@@ -21,6 +26,19 @@ export interface GPUServer {
   created_at: string;
 }
 
+export interface ReservationEvent {
+  type: 'reservation' | 'resync';
+  reservation_id?: number;
+  user_id?: number;
+  server_id?: number;
+  status?: Reservation['status'];
+  version?: number;
+  start_time?: string;
+  end_time?: string;
+  gpu_count?: number;
+  at?: string;
+}
+
 export interface Reservation {
   id: number;
   user_id: number;
@@ -29,16 +47,23 @@ export interface Reservation {
   purpose?: string;
   start_time: string;
   end_time: string;
+  gpu_count: number;
   priority_score: number;
   status: 'pending' | 'confirmed' | 'rejected' | 'cancelled' | 'pending_rejection';
   ai_judgment_reason?: string;
   rejection_reason?: string;
   created_at: string;
   updated_at: string;
+  version: number;
   user: User;
   server: GPUServer;
 }
 
+export interface ReservationProcessingStatus {
+  processing: boolean;
+  reservation: Reservation;
+}
+
 export interface ReservationCreate {
   natural_language_request: string;
 }
@@ -46,4 +71,5 @@ export interface ReservationCreate {
 export interface ReservationConfirmRejection {
   confirm: boolean;
   reason?: string;
+  version?: number;
 }
\ No newline at end of file